@@ -1,13 +1,31 @@
 from dataclasses import dataclass
-from typing import Dict, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 import math
 
+import numpy as np
+
+from .asterix48_uap import (
+    DEFAULT_PLAN,
+    MANDATORY_MASK,
+    RecordPlan,
+    optional_masks,
+    plan_for_fspec,
+    plan_for_mask,
+    read_fspec,
+    record_mask,
+)
+
 
 CAT = 48
 
 RANGE_SCALE_M = 2.0
 XY_SCALE_M = 4.0
 
+HEADER_LEN = 3
+MAX_BLOCK_LEN = 0xFFFF
+RECORD_LEN = DEFAULT_PLAN.size
+MESSAGE_LEN = HEADER_LEN + RECORD_LEN
+
 
 @dataclass
 class Asterix48Data:
@@ -20,70 +38,12 @@ class Asterix48Data:
     y_m: float
     track_number: int
     rcs_dbsm: float
-
-
-def _clamp(value: int, min_value: int, max_value: int) -> int:
-    return max(min_value, min(max_value, value))
-
-
-def _encode_time_of_day(time_s: float) -> bytes:
-    value = int(round(time_s * 128.0)) & 0xFFFFFF
-    return value.to_bytes(3, "big")
-
-
-def _decode_time_of_day(data: bytes) -> float:
-    return int.from_bytes(data, "big") / 128.0
-
-
-def _encode_polar(range_m: float, azimuth_deg: float) -> bytes:
-    rho = int(round(range_m / RANGE_SCALE_M))
-    rho = _clamp(rho, 0, 0xFFFF)
-    theta = int(round((azimuth_deg % 360.0) / 360.0 * 65535))
-    theta = _clamp(theta, 0, 0xFFFF)
-    return rho.to_bytes(2, "big") + theta.to_bytes(2, "big")
-
-
-def _decode_polar(data: bytes) -> Tuple[float, float]:
-    rho = int.from_bytes(data[:2], "big") * RANGE_SCALE_M
-    theta = int.from_bytes(data[2:4], "big") / 65535.0 * 360.0
-    return rho, theta
-
-
-def _encode_cartesian(x_m: float, y_m: float) -> bytes:
-    x = int(round(x_m / XY_SCALE_M))
-    y = int(round(y_m / XY_SCALE_M))
-    x = _clamp(x, -32768, 32767)
-    y = _clamp(y, -32768, 32767)
-    return x.to_bytes(2, "big", signed=True) + y.to_bytes(2, "big", signed=True)
-
-
-def _decode_cartesian(data: bytes) -> Tuple[float, float]:
-    x = int.from_bytes(data[:2], "big", signed=True) * XY_SCALE_M
-    y = int.from_bytes(data[2:4], "big", signed=True) * XY_SCALE_M
-    return x, y
-
-
-def _encode_track_number(track_number: int) -> bytes:
-    value = _clamp(track_number, 0, 0xFFFF)
-    return value.to_bytes(2, "big")
-
-
-def _decode_track_number(data: bytes) -> int:
-    return int.from_bytes(data, "big")
-
-
-def _encode_rcs(rcs_dbsm: float) -> bytes:
-    rcs_int = int(round(rcs_dbsm))
-    rcs_int = _clamp(rcs_int, -64, 63)
-    rcs_byte = rcs_int + 64
-    return bytes([0x40, rcs_byte])
-
-
-def _decode_rcs(data: bytes) -> float:
-    if not data:
-        return 0.0
-    rcs_byte = data[1]
-    return float(rcs_byte - 64)
+    report_descriptor: Optional[int] = None
+    mode3a: Optional[int] = None
+    flight_level: Optional[float] = None
+    ground_speed_mps: Optional[float] = None
+    heading_deg: Optional[float] = None
+    aircraft_address: Optional[int] = None
 
 
 def rcs_m2_to_dbsm(rcs_m2: float) -> float:
@@ -97,31 +57,10 @@ def rcs_dbsm_to_m2(rcs_dbsm: float) -> float:
 
 
 def encode_record(record: Asterix48Data) -> bytes:
-    fspec = 0
-    payload = bytearray()
-
-    fspec |= 1 << 6
-    payload.extend(bytes([record.sac & 0xFF, record.sic & 0xFF]))
-
-    fspec |= 1 << 5
-    payload.extend(_encode_time_of_day(record.time_of_day_s))
-
-    fspec |= 1 << 4
-    payload.extend(_encode_polar(record.range_m, record.azimuth_deg))
-
-    fspec |= 1 << 3
-    payload.extend(_encode_cartesian(record.x_m, record.y_m))
-
-    fspec |= 1 << 2
-    payload.extend(_encode_track_number(record.track_number))
-
-    fspec |= 1 << 1
-    payload.extend(_encode_rcs(record.rcs_dbsm))
-
-    fspec_byte = fspec & 0x7F
-    length = 1 + 2 + 1 + len(payload)
-    header = bytes([CAT]) + length.to_bytes(2, "big") + bytes([fspec_byte])
-    return header + bytes(payload)
+    values = vars(record)
+    payload = plan_for_mask(record_mask(values)).pack(values)
+    length = HEADER_LEN + len(payload)
+    return bytes([CAT]) + length.to_bytes(2, "big") + payload
 
 
 def decode_record(message: bytes) -> Dict[str, float]:
@@ -133,32 +72,186 @@ def decode_record(message: bytes) -> Dict[str, float]:
     if total_len != len(message):
         raise ValueError("Length mismatch")
 
-    fspec = message[3]
-    offset = 4
+    fspec, offset = read_fspec(message, HEADER_LEN, total_len)
     data: Dict[str, float] = {}
+    plan_for_fspec(fspec).unpack_from(message, offset, total_len, data)
+    return data
 
-    if fspec & (1 << 6):
-        data["sac"] = message[offset]
-        data["sic"] = message[offset + 1]
-        offset += 2
-    if fspec & (1 << 5):
-        data["time_of_day_s"] = _decode_time_of_day(message[offset : offset + 3])
-        offset += 3
-    if fspec & (1 << 4):
-        rho, theta = _decode_polar(message[offset : offset + 4])
-        data["range_m"] = rho
-        data["azimuth_deg"] = theta
-        offset += 4
-    if fspec & (1 << 3):
-        x, y = _decode_cartesian(message[offset : offset + 4])
-        data["x_m"] = x
-        data["y_m"] = y
-        offset += 4
-    if fspec & (1 << 2):
-        data["track_number"] = _decode_track_number(message[offset : offset + 2])
-        offset += 2
-    if fspec & (1 << 1):
-        data["rcs_dbsm"] = _decode_rcs(message[offset : offset + 2])
-        offset += 2
 
-    return data
+def rcs_m2_to_dbsm_array(rcs_m2) -> np.ndarray:
+    rcs_m2 = np.asarray(rcs_m2, dtype=np.float64)
+    positive = rcs_m2 > 0
+    return np.where(positive, 10.0 * np.log10(np.where(positive, rcs_m2, 1.0)), -64.0)
+
+
+def _block_spans(lengths: np.ndarray, max_block_len: int) -> List[Tuple[int, int]]:
+    limit = min(max_block_len, MAX_BLOCK_LEN) - HEADER_LEN
+    if len(lengths) and lengths.max() > limit:
+        raise ValueError("Block length too small for one record")
+    ends = np.cumsum(lengths)
+    spans = []
+    start = 0
+    used = 0
+    while start < len(lengths):
+        end = int(np.searchsorted(ends, used + limit, side="right"))
+        spans.append((start, end))
+        used = int(ends[end - 1])
+        start = end
+    return spans
+
+
+def _pack_uniform(plan: RecordPlan, columns: Dict[str, Any], count: int, max_block_len: Optional[int]):
+    per_block = 1 if max_block_len is None else (min(max_block_len, MAX_BLOCK_LEN) - HEADER_LEN) // plan.size
+    if per_block < 1:
+        raise ValueError("Block length too small for one record")
+    records = np.zeros(count, dtype=plan.dtype)
+    plan.fill(records, columns, None, count)
+    raw = records.view(np.uint8)
+
+    full = count // per_block
+    rest = count - full * per_block
+    stride = HEADER_LEN + per_block * plan.size
+    buffer = bytearray(count * plan.size + (full + (1 if rest else 0)) * HEADER_LEN)
+    target = np.frombuffer(buffer, dtype=np.uint8)
+    if full:
+        blocks = target[: full * stride].reshape(full, stride)
+        blocks[:, 0] = CAT
+        blocks[:, 1] = stride >> 8
+        blocks[:, 2] = stride & 0xFF
+        blocks[:, HEADER_LEN:] = raw[: full * per_block * plan.size].reshape(full, -1)
+    spans: List[Tuple[int, int, int]] = [(index * stride, (index + 1) * stride, per_block) for index in range(full)]
+    if rest:
+        offset = full * stride
+        length = HEADER_LEN + rest * plan.size
+        buffer[offset] = CAT
+        buffer[offset + 1 : offset + 3] = length.to_bytes(2, "big")
+        target[offset + HEADER_LEN : offset + length] = raw[full * per_block * plan.size :]
+        spans.append((offset, offset + length, rest))
+    return buffer, spans
+
+
+def _pack_mixed(masks, columns: Dict[str, Any], count: int, max_block_len: Optional[int]):
+    pattern = np.full(count, MANDATORY_MASK, dtype=np.int64)
+    for item, present in masks:
+        pattern |= present.astype(np.int64) << item.frn
+    patterns, inverse = np.unique(pattern, return_inverse=True)
+    plans = [plan_for_mask(int(mask)) for mask in patterns]
+    lengths = np.array([plan.size for plan in plans], dtype=np.int64)[inverse]
+
+    if max_block_len is None:
+        record_spans = [(index, index + 1) for index in range(count)]
+    else:
+        record_spans = _block_spans(lengths, max_block_len)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    block_of = np.zeros(count, dtype=np.int64)
+    for index, (start, end) in enumerate(record_spans):
+        block_of[start:end] = index
+    offsets = starts + HEADER_LEN * (block_of + 1)
+
+    buffer = bytearray(int(lengths.sum()) + HEADER_LEN * len(record_spans))
+    target = np.frombuffer(buffer, dtype=np.uint8)
+    for index, plan in enumerate(plans):
+        rows = np.flatnonzero(inverse == index)
+        records = np.zeros(len(rows), dtype=plan.dtype)
+        plan.fill(records, columns, rows, len(rows))
+        target[offsets[rows, None] + np.arange(plan.size)] = records.view(np.uint8).reshape(len(rows), plan.size)
+
+    spans: List[Tuple[int, int, int]] = []
+    for start, end in record_spans:
+        begin = int(offsets[start]) - HEADER_LEN
+        length = int(offsets[end - 1] + lengths[end - 1]) - begin
+        buffer[begin] = CAT
+        buffer[begin + 1 : begin + 3] = length.to_bytes(2, "big")
+        spans.append((begin, begin + length, end - start))
+    return buffer, spans
+
+
+def _pack_records(columns: Dict[str, Any], max_block_len: Optional[int]) -> Tuple[bytearray, List[Tuple[int, int, int]]]:
+    count = len(np.asarray(columns["range_m"]))
+    masks = optional_masks(columns, count)
+    if not masks:
+        return _pack_uniform(DEFAULT_PLAN, columns, count, max_block_len)
+    if all(present.all() for _, present in masks):
+        mask = MANDATORY_MASK | sum(1 << item.frn for item, _ in masks)
+        return _pack_uniform(plan_for_mask(mask), columns, count, max_block_len)
+    return _pack_mixed(masks, columns, count, max_block_len)
+
+
+def encode_blocks(max_block_len: int = MAX_BLOCK_LEN, **columns) -> List[Tuple[memoryview, int]]:
+    buffer, spans = _pack_records(columns, max_block_len)
+    view = memoryview(buffer)
+    return [(view[start:end], records) for start, end, records in spans]
+
+
+def encode_columns(
+    sac,
+    sic,
+    time_of_day_s,
+    range_m,
+    azimuth_deg,
+    x_m,
+    y_m,
+    track_number,
+    rcs_dbsm,
+    max_block_len: int = MAX_BLOCK_LEN,
+    **optional,
+) -> List[memoryview]:
+    blocks = encode_blocks(
+        max_block_len,
+        sac=sac,
+        sic=sic,
+        time_of_day_s=time_of_day_s,
+        range_m=range_m,
+        azimuth_deg=azimuth_deg,
+        x_m=x_m,
+        y_m=y_m,
+        track_number=track_number,
+        rcs_dbsm=rcs_dbsm,
+        **optional,
+    )
+    return [block for block, _ in blocks]
+
+
+def encode_messages(
+    sac,
+    sic,
+    time_of_day_s,
+    range_m,
+    azimuth_deg,
+    x_m,
+    y_m,
+    track_number,
+    rcs_dbsm,
+    **optional,
+) -> bytearray:
+    buffer, _ = _pack_records(
+        dict(
+            sac=sac,
+            sic=sic,
+            time_of_day_s=time_of_day_s,
+            range_m=range_m,
+            azimuth_deg=azimuth_deg,
+            x_m=x_m,
+            y_m=y_m,
+            track_number=track_number,
+            rcs_dbsm=rcs_dbsm,
+            **optional,
+        ),
+        None,
+    )
+    return buffer
+
+
+def encode_data_block(records: Sequence[Asterix48Data], max_block_len: int = MAX_BLOCK_LEN) -> List[memoryview]:
+    return encode_columns(
+        sac=[r.sac for r in records],
+        sic=[r.sic for r in records],
+        time_of_day_s=[r.time_of_day_s for r in records],
+        range_m=[r.range_m for r in records],
+        azimuth_deg=[r.azimuth_deg for r in records],
+        x_m=[r.x_m for r in records],
+        y_m=[r.y_m for r in records],
+        track_number=[r.track_number for r in records],
+        rcs_dbsm=[r.rcs_dbsm for r in records],
+        max_block_len=max_block_len,
+    )
@@ -0,0 +1,264 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import BinaryIO, Dict, Iterator, List, Tuple
+import mmap
+import socket
+
+import numpy as np
+
+from .asterix48 import CAT, HEADER_LEN, MAX_BLOCK_LEN
+from .asterix48_uap import COLUMNS, RecordPlan, missing_columns, plan_for_fspec, read_fspec
+
+
+DEFAULT_CHUNK_BYTES = 8 * 1024 * 1024
+
+VECTOR_MIN_RECORDS = 16
+RUN_PROBE_MAX = 65536
+
+MISSING = tuple((name, np.nan if np.issubdtype(np.dtype(dtype), np.floating) else -1) for name, dtype in COLUMNS)
+
+
+@dataclass
+class DecodeIssue:
+    offset: int
+    reason: str
+
+
+@dataclass
+class Asterix48Columns:
+    sac: np.ndarray
+    sic: np.ndarray
+    time_of_day_s: np.ndarray
+    range_m: np.ndarray
+    azimuth_deg: np.ndarray
+    x_m: np.ndarray
+    y_m: np.ndarray
+    track_number: np.ndarray
+    rcs_dbsm: np.ndarray
+    report_descriptor: np.ndarray
+    mode3a: np.ndarray
+    flight_level: np.ndarray
+    ground_speed_mps: np.ndarray
+    heading_deg: np.ndarray
+    aircraft_address: np.ndarray
+    issues: List[DecodeIssue] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.range_m)
+
+    @classmethod
+    def empty(cls) -> "Asterix48Columns":
+        return cls(**{name: np.zeros(0, dtype=dtype) for name, dtype in COLUMNS})
+
+    @classmethod
+    def concat(cls, parts: List["Asterix48Columns"]) -> "Asterix48Columns":
+        if not parts:
+            return cls.empty()
+        if len(parts) == 1:
+            return parts[0]
+        columns = {name: np.concatenate([getattr(p, name) for p in parts]) for name, _ in COLUMNS}
+        issues = [issue for part in parts for issue in part.issues]
+        return cls(**columns, issues=issues)
+
+
+class _Builder:
+    def __init__(self) -> None:
+        self.parts: List[Dict[str, np.ndarray]] = []
+        self.rows: Dict[str, list] = {name: [] for name, _ in COLUMNS}
+        self.issues: List[DecodeIssue] = []
+
+    def _flush_rows(self) -> None:
+        if not self.rows["sac"]:
+            return
+        self.parts.append({name: np.array(self.rows[name], dtype=dtype) for name, dtype in COLUMNS})
+        self.rows = {name: [] for name, _ in COLUMNS}
+
+    def add_records(self, plan: RecordPlan, records: np.ndarray) -> None:
+        self._flush_rows()
+        columns = plan.columns(records)
+        missing = [name for name, _ in COLUMNS if name not in columns]
+        if missing:
+            columns.update(missing_columns(len(records), missing))
+        self.parts.append({name: columns[name].astype(dtype, copy=False) for name, dtype in COLUMNS})
+
+    def add_row(self, row: Dict[str, float]) -> None:
+        for name, value in MISSING:
+            self.rows[name].append(row.get(name, value))
+
+    def build(self) -> Asterix48Columns:
+        self._flush_rows()
+        if not self.parts:
+            columns = Asterix48Columns.empty()
+        elif len(self.parts) == 1:
+            columns = Asterix48Columns(**self.parts[0])
+        else:
+            columns = Asterix48Columns(
+                **{name: np.concatenate([p[name] for p in self.parts]) for name, _ in COLUMNS}
+            )
+        columns.issues = self.issues
+        return columns
+
+
+def _decode_record_at(view, offset: int, end: int, row: Dict[str, float]) -> int:
+    fspec, offset = read_fspec(view, offset, end)
+    return plan_for_fspec(fspec).unpack_from(view, offset, end, row)
+
+
+@lru_cache(maxsize=256)
+def _message_dtype(plan: RecordPlan) -> np.dtype:
+    return np.dtype([("cat", "u1"), ("length", ">u2")] + [(name, plan.dtype[name]) for name in plan.dtype.names])
+
+
+def _decode_run(view, start: int, length: int, builder: _Builder) -> int:
+    size = len(view)
+    if start + 2 * length > size:
+        return 0
+    try:
+        fspec, body = read_fspec(view, start + HEADER_LEN, start + length)
+    except ValueError:
+        return 0
+    if view[start : body] != view[start + length : body + length]:
+        return 0
+    try:
+        plan = plan_for_fspec(fspec)
+    except ValueError:
+        return 0
+    if HEADER_LEN + plan.size != length:
+        return 0
+    dtype = _message_dtype(plan)
+    offset = start
+    probe = VECTOR_MIN_RECORDS
+    while True:
+        count = min((size - offset) // length, probe)
+        if count < 1:
+            break
+        records = np.frombuffer(view, dtype=dtype, count=count, offset=offset)
+        valid = (records["cat"] == CAT) & (records["length"] == length) & plan.matches(records)
+        run = count if valid.all() else int(np.argmin(valid))
+        if run:
+            builder.add_records(plan, records[:run])
+            offset += run * length
+        if run < count:
+            break
+        probe = min(probe * 4, RUN_PROBE_MAX)
+    return offset - start
+
+
+def _decode_block(view, start: int, end: int, base_offset: int, builder: _Builder) -> None:
+    body_len = end - start - HEADER_LEN
+    try:
+        plan = plan_for_fspec(read_fspec(view, start + HEADER_LEN, end)[0])
+    except ValueError:
+        plan = None
+    if plan is not None and body_len % plan.size == 0 and body_len // plan.size >= VECTOR_MIN_RECORDS:
+        records = np.frombuffer(view, dtype=plan.dtype, count=body_len // plan.size, offset=start + HEADER_LEN)
+        if plan.uniform(records):
+            builder.add_records(plan, records)
+            return
+
+    offset = start + HEADER_LEN
+    while offset < end:
+        row: Dict[str, float] = {}
+        try:
+            offset = _decode_record_at(view, offset, end, row)
+        except ValueError as exc:
+            builder.issues.append(DecodeIssue(offset=base_offset + offset, reason=str(exc)))
+            return
+        builder.add_row(row)
+
+
+def decode_buffer(data, base_offset: int = 0, final: bool = True) -> Tuple[Asterix48Columns, int]:
+    view = memoryview(data).cast("B")
+    size = len(view)
+    builder = _Builder()
+    offset = 0
+    while offset + HEADER_LEN <= size:
+        if view[offset] != CAT:
+            builder.issues.append(DecodeIssue(offset=base_offset + offset, reason="Invalid CAT"))
+            offset += 1
+            while offset < size and view[offset] != CAT:
+                offset += 1
+            continue
+        length = (view[offset + 1] << 8) | view[offset + 2]
+        if length < HEADER_LEN + 1:
+            builder.issues.append(DecodeIssue(offset=base_offset + offset, reason="Invalid block length"))
+            offset += 1
+            continue
+        if offset + length > size:
+            break
+        consumed = _decode_run(view, offset, length, builder)
+        if consumed:
+            offset += consumed
+            continue
+        _decode_block(view, offset, offset + length, base_offset, builder)
+        offset += length
+
+    if final and offset < size:
+        builder.issues.append(DecodeIssue(offset=base_offset + offset, reason="Truncated block"))
+        offset = size
+    columns = builder.build()
+    view.release()
+    return columns, offset
+
+
+def _block_boundary(view, start: int, limit: int) -> int:
+    offset = start
+    size = len(view)
+    while offset + HEADER_LEN <= size:
+        length = (view[offset + 1] << 8) | view[offset + 2]
+        if view[offset] != CAT or length < HEADER_LEN + 1:
+            return min(size, max(offset + 1, start + limit))
+        if offset + length - start > limit and offset > start:
+            return offset
+        offset += length
+    return size
+
+
+def iter_decode_buffer(data, chunk_bytes: int = DEFAULT_CHUNK_BYTES, base_offset: int = 0) -> Iterator[Asterix48Columns]:
+    view = memoryview(data).cast("B")
+    start = 0
+    size = len(view)
+    try:
+        while start < size:
+            end = min(size, _block_boundary(view, start, chunk_bytes))
+            columns, consumed = decode_buffer(view[start:end], base_offset=base_offset + start, final=end == size)
+            if consumed == 0:
+                columns.issues.append(DecodeIssue(offset=base_offset + start, reason="Unreadable data"))
+                consumed = 1
+            start += consumed
+            yield columns
+    finally:
+        view.release()
+
+
+def iter_decode_file(path: str, chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> Iterator[Asterix48Columns]:
+    with open(path, "rb") as handle:
+        if handle.seek(0, 2) == 0:
+            return
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield from iter_decode_buffer(mapped, chunk_bytes=chunk_bytes)
+
+
+def iter_decode_stream(stream: BinaryIO, chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> Iterator[Asterix48Columns]:
+    buffer = bytearray(max(chunk_bytes, MAX_BLOCK_LEN) + MAX_BLOCK_LEN)
+    filled = 0
+    base_offset = 0
+    while True:
+        if isinstance(stream, socket.socket):
+            read = stream.recv_into(memoryview(buffer)[filled:])
+        else:
+            read = stream.readinto(memoryview(buffer)[filled:])
+        final = not read
+        filled += read or 0
+        columns, consumed = decode_buffer(memoryview(buffer)[:filled], base_offset=base_offset, final=final)
+        if len(columns) or columns.issues:
+            yield columns
+        buffer[: filled - consumed] = buffer[consumed:filled]
+        filled -= consumed
+        base_offset += consumed
+        if final:
+            return
+
+
+def decode_file(path: str, chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> Asterix48Columns:
+    return Asterix48Columns.concat(list(iter_decode_file(path, chunk_bytes=chunk_bytes)))
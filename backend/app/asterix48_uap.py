@@ -0,0 +1,411 @@
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import struct
+
+import numpy as np
+
+
+FX = 0x01
+NM_M = 1852.0
+
+_SLOT_DTYPES = {1: "u1", 2: ">u2", 4: ">u4"}
+_SLOT_CODES = {1: "B", 2: "H", 4: "I"}
+
+
+@dataclass(frozen=True)
+class UapField:
+    name: str
+    size: int
+    mask: int = 0
+    signed: bool = False
+    integer: bool = False
+    num: float = 1.0
+    den: float = 1.0
+    wrap: float = 0.0
+    clip: bool = True
+    bias: int = 0
+    const: Optional[int] = None
+    dtype: Any = np.float64
+
+    @property
+    def value_mask(self) -> int:
+        return self.mask or (1 << (8 * self.size)) - 1
+
+    def _bounds(self) -> Tuple[int, int]:
+        width = self.value_mask + 1
+        if self.signed:
+            return -(width // 2), width // 2 - 1
+        return 0, width - 1
+
+    @property
+    def slots(self) -> Tuple[int, ...]:
+        return (1, 2) if self.size == 3 else (self.size,)
+
+    @cached_property
+    def encode(self) -> Callable[[Any], int]:
+        const, integer, wrap, num, den, clip = self.const, self.integer, self.wrap, self.num, self.den, self.clip
+        low, high = self._bounds()
+        value_mask = self.value_mask
+        bias = self.bias
+        masked = bool(self.bias or self.signed or not self.clip)
+
+        def encode(value) -> int:
+            if const is not None:
+                return const
+            if integer:
+                raw = int(value)
+            else:
+                value = float(value)
+                if wrap:
+                    value = value % wrap
+                raw = int(round(value / den * num))
+            if clip:
+                raw = max(low, min(high, raw))
+            return (raw + bias) & value_mask if masked else raw
+
+        return encode
+
+    def encode_array(self, values, count: int) -> np.ndarray:
+        if self.const is not None:
+            return np.full(count, self.const, dtype=np.int64)
+        if self.integer:
+            raw = np.asarray(values, dtype=np.int64)
+        else:
+            values = np.asarray(values, dtype=np.float64)
+            if self.wrap:
+                values = np.mod(values, self.wrap)
+            raw = np.rint(values / self.den * self.num)
+        if raw.ndim == 0:
+            raw = np.full(count, raw)
+        if self.clip:
+            raw = np.clip(raw, *self._bounds())
+        raw = raw.astype(np.int64)
+        if self.bias or self.signed or not self.clip:
+            raw = (raw + self.bias) & self.value_mask
+        return raw
+
+    @cached_property
+    def decode(self) -> Callable[[int], Any]:
+        value_mask, bias, signed, integer, num, den = self.value_mask, self.bias, self.signed, self.integer, self.num, self.den
+        half = value_mask >> 1
+
+        def decode(raw: int):
+            raw &= value_mask
+            if bias:
+                raw -= bias
+            elif signed and raw > half:
+                raw -= value_mask + 1
+            if integer:
+                return raw
+            return raw / num * den
+
+        return decode
+
+    def decode_array(self, raw: np.ndarray) -> np.ndarray:
+        raw = raw.astype(np.int64) & self.value_mask
+        if self.bias:
+            raw = raw - self.bias
+        elif self.signed:
+            raw = np.where(raw > self.value_mask >> 1, raw - (self.value_mask + 1), raw)
+        if self.integer:
+            return raw.astype(self.dtype)
+        return raw / self.num * self.den
+
+
+@dataclass(frozen=True)
+class UapItem:
+    frn: int
+    item_id: str
+    fields: Tuple[UapField, ...]
+    mandatory: bool = False
+    variable: bool = False
+
+    @property
+    def octet(self) -> int:
+        return (self.frn - 1) // 7
+
+    @property
+    def bit(self) -> int:
+        return 0x80 >> ((self.frn - 1) % 7)
+
+    @property
+    def columns(self) -> Tuple[UapField, ...]:
+        return tuple(field for field in self.fields if field.const is None)
+
+    def present(self, columns: Dict[str, Any], count: int) -> Optional[np.ndarray]:
+        mask = None
+        for field in self.columns:
+            values = columns.get(field.name)
+            if values is None:
+                return None
+            if field.integer:
+                valid = np.asarray(values) >= 0
+            else:
+                valid = ~np.isnan(np.asarray(values, dtype=np.float64))
+            valid = np.broadcast_to(valid, (count,))
+            mask = valid if mask is None else mask & valid
+        return mask
+
+
+UAP: Tuple[UapItem, ...] = (
+    UapItem(
+        1,
+        "I048/010",
+        (
+            UapField("sac", 1, integer=True, clip=False, dtype=np.int16),
+            UapField("sic", 1, integer=True, clip=False, dtype=np.int16),
+        ),
+        mandatory=True,
+    ),
+    UapItem(2, "I048/140", (UapField("time_of_day_s", 3, num=128.0, clip=False),), mandatory=True),
+    UapItem(
+        3,
+        "I048/020",
+        (UapField("report_descriptor", 1, mask=0xFE, integer=True, clip=False, dtype=np.int16),),
+        variable=True,
+    ),
+    UapItem(
+        4,
+        "I048/040",
+        (
+            UapField("range_m", 2, den=2.0),
+            UapField("azimuth_deg", 2, num=65535, den=360.0, wrap=360.0),
+        ),
+        mandatory=True,
+    ),
+    UapItem(5, "I048/070", (UapField("mode3a", 2, mask=0x0FFF, integer=True, clip=False, dtype=np.int16),)),
+    UapItem(6, "I048/090", (UapField("flight_level", 2, mask=0x3FFF, signed=True, num=4.0),)),
+    UapItem(
+        7,
+        "I048/130",
+        (
+            UapField("rcs_subfield", 1, const=0x40),
+            UapField("rcs_dbsm", 1, mask=0x7F, signed=True, bias=64),
+        ),
+        mandatory=True,
+    ),
+    UapItem(8, "I048/220", (UapField("aircraft_address", 3, integer=True, clip=False, dtype=np.int32),)),
+    UapItem(11, "I048/161", (UapField("track_number", 2, integer=True, dtype=np.int32),), mandatory=True),
+    UapItem(
+        12,
+        "I048/042",
+        (
+            UapField("x_m", 2, signed=True, den=4.0),
+            UapField("y_m", 2, signed=True, den=4.0),
+        ),
+        mandatory=True,
+    ),
+    UapItem(
+        13,
+        "I048/200",
+        (
+            UapField("ground_speed_mps", 2, num=16384.0, den=NM_M),
+            UapField("heading_deg", 2, num=65536.0, den=360.0, wrap=360.0, clip=False),
+        ),
+    ),
+)
+
+ITEMS_BY_FRN = {item.frn: item for item in UAP}
+MANDATORY_MASK = sum(1 << item.frn for item in UAP if item.mandatory)
+OPTIONAL_ITEMS = tuple(item for item in UAP if not item.mandatory)
+COLUMNS: Tuple[Tuple[str, Any], ...] = tuple(
+    (field.name, field.dtype) for item in sorted(UAP, key=lambda item: (not item.mandatory, item.frn)) for field in item.columns
+)
+
+_PRESENCE = tuple((1 << item.frn, tuple((field.name, field.integer) for field in item.columns)) for item in OPTIONAL_ITEMS)
+
+
+def fspec_bytes(frn_mask: int) -> bytes:
+    frns = [frn for frn in ITEMS_BY_FRN if frn_mask & (1 << frn)]
+    octets = bytearray(max(1, (max(frns, default=1) + 6) // 7))
+    for frn in frns:
+        item = ITEMS_BY_FRN[frn]
+        octets[item.octet] |= item.bit
+    for index in range(len(octets) - 1):
+        octets[index] |= FX
+    return bytes(octets)
+
+
+def frn_mask(fspec: bytes) -> int:
+    mask = 0
+    for index, octet in enumerate(fspec):
+        for position in range(7):
+            if octet & (0x80 >> position):
+                frn = index * 7 + position + 1
+                if frn not in ITEMS_BY_FRN:
+                    raise ValueError(f"Unsupported FSPEC item FRN {frn}")
+                mask |= 1 << frn
+    return mask
+
+
+class RecordPlan:
+    def __init__(self, mask: int) -> None:
+        self.mask = mask
+        self.items = tuple(item for item in UAP if mask & (1 << item.frn))
+        self.fspec = fspec_bytes(mask)
+        self.variable = any(item.variable for item in self.items)
+
+        slot_names: List[Tuple[str, str]] = [(f"fspec{index}", "u1") for index in range(len(self.fspec))]
+        codes = ["B"] * len(self.fspec)
+        self.fields: List[Tuple[UapField, Tuple[str, ...]]] = []
+        lead = None
+        for item in self.items:
+            if item.variable:
+                lead = len(self.fields)
+            for field_index, field in enumerate(item.fields):
+                names = tuple(f"{item.frn}_{field_index}_{slot}" for slot in range(len(field.slots)))
+                for name, size in zip(names, field.slots):
+                    slot_names.append((name, _SLOT_DTYPES[size]))
+                    codes.append(_SLOT_CODES[size])
+                self.fields.append((field, names))
+        self.dtype = np.dtype(slot_names)
+        self.struct = struct.Struct(">" + "".join(codes))
+        self.size = self.struct.size
+
+        if lead is None:
+            lead = len(self.fields)
+        split = len(self.fspec) + sum(len(names) for _, names in self.fields[:lead])
+        self.head = struct.Struct(">" + "".join(codes[len(self.fspec) : split]))
+        self.tail = struct.Struct(">" + "".join(codes[split + 1 :]))
+        self._extended: Optional[Tuple[str, Callable[[int], Any], str]] = None
+        if self.variable:
+            field, names = self.fields[lead]
+            self._extended = (field.name, field.decode, names[0])
+
+        self._encoders = tuple((field.name, field.encode, len(names) == 2) for field, names in self.fields)
+        self._head = self._field_decoders(self.fields[:lead])
+        self._tail = self._field_decoders(self.fields[lead + 1 :])
+
+    @staticmethod
+    def _field_decoders(fields) -> Tuple[Tuple[Optional[str], Callable[[int], Any], bool], ...]:
+        return tuple((None if field.const is not None else field.name, field.decode, len(names) == 2) for field, names in fields)
+
+    @staticmethod
+    def _unpack(layout: struct.Struct, decoders, view, offset: int, end: int, row: Dict[str, Any]) -> int:
+        if offset + layout.size > end:
+            raise ValueError("Record truncated")
+        raw = iter(layout.unpack_from(view, offset))
+        for name, decode, wide in decoders:
+            value = (next(raw) << 16) | next(raw) if wide else next(raw)
+            if name is not None:
+                row[name] = decode(value)
+        return offset + layout.size
+
+    def pack(self, values: Dict[str, Any]) -> bytes:
+        raw: List[int] = list(self.fspec)
+        for name, encode, wide in self._encoders:
+            value = encode(values.get(name))
+            if wide:
+                raw.append(value >> 16)
+                raw.append(value & 0xFFFF)
+            else:
+                raw.append(value)
+        return self.struct.pack(*raw)
+
+    def fill(self, records: np.ndarray, columns: Dict[str, Any], rows: Optional[np.ndarray], count: int) -> None:
+        for index, octet in enumerate(self.fspec):
+            records[f"fspec{index}"] = octet
+        for field, names in self.fields:
+            values = columns.get(field.name)
+            if rows is not None and values is not None and np.ndim(values):
+                values = np.asarray(values)[rows]
+            raw = field.encode_array(values, count)
+            if len(names) == 2:
+                records[names[0]] = raw >> 16
+                records[names[1]] = raw & 0xFFFF
+            else:
+                records[names[0]] = raw
+
+    def unpack_from(self, view, offset: int, end: int, row: Dict[str, Any]) -> int:
+        offset = self._unpack(self.head, self._head, view, offset, end, row)
+        if self._extended is None:
+            return offset
+        name, decode, _ = self._extended
+        if offset >= end:
+            raise ValueError("Record truncated")
+        octet = view[offset]
+        row[name] = decode(octet)
+        offset += 1
+        while octet & FX:
+            if offset >= end:
+                raise ValueError("Record truncated")
+            octet = view[offset]
+            offset += 1
+        return self._unpack(self.tail, self._tail, view, offset, end, row)
+
+    def columns(self, records: np.ndarray) -> Dict[str, np.ndarray]:
+        columns = {}
+        for field, names in self.fields:
+            if field.const is not None:
+                continue
+            if len(names) == 2:
+                raw = (records[names[0]].astype(np.int64) << 16) | records[names[1]]
+            else:
+                raw = records[names[0]]
+            columns[field.name] = field.decode_array(raw)
+        return columns
+
+    def matches(self, records: np.ndarray) -> np.ndarray:
+        valid = np.ones(len(records), dtype=bool)
+        for index, octet in enumerate(self.fspec):
+            valid &= records[f"fspec{index}"] == octet
+        if self._extended is not None:
+            valid &= (records[self._extended[2]] & FX) == 0
+        return valid
+
+    def uniform(self, records: np.ndarray) -> bool:
+        return bool(self.matches(records).all())
+
+
+@lru_cache(maxsize=None)
+def plan_for_mask(mask: int) -> RecordPlan:
+    return RecordPlan(mask)
+
+
+@lru_cache(maxsize=4096)
+def plan_for_fspec(fspec: bytes) -> RecordPlan:
+    return plan_for_mask(frn_mask(fspec))
+
+
+def read_fspec(view, offset: int, end: int) -> Tuple[bytes, int]:
+    start = offset
+    while True:
+        if offset >= end:
+            raise ValueError("FSPEC runs past end of block")
+        octet = view[offset]
+        offset += 1
+        if not octet & FX:
+            return bytes(view[start:offset]), offset
+
+
+def record_mask(values: Dict[str, Any]) -> int:
+    mask = MANDATORY_MASK
+    for bit, fields in _PRESENCE:
+        for name, integer in fields:
+            value = values.get(name)
+            if value is None or (value < 0 if integer else value != value):
+                break
+        else:
+            mask |= bit
+    return mask
+
+
+def optional_masks(columns: Dict[str, Any], count: int) -> List[Tuple[UapItem, np.ndarray]]:
+    masks = []
+    for item in OPTIONAL_ITEMS:
+        present = item.present(columns, count)
+        if present is not None and present.any():
+            masks.append((item, present))
+    return masks
+
+
+DEFAULT_PLAN = plan_for_mask(MANDATORY_MASK)
+
+
+def missing_columns(count: int, names: Sequence[str] = ()) -> Dict[str, np.ndarray]:
+    return {
+        name: np.full(count, np.nan if np.issubdtype(np.dtype(dtype), np.floating) else -1, dtype=dtype)
+        for name, dtype in COLUMNS
+        if not names or name in names
+    }
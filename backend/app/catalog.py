@@ -0,0 +1,151 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import threading
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+from . import db
+
+
+ProfileKey = Tuple[int, str]
+Snapshot = Tuple[List[Dict[str, Any]], Dict[ProfileKey, Dict[str, Any]]]
+
+LISTEN_RETRY_S = 5.0
+
+
+class PlatformCatalog:
+    def __init__(
+        self,
+        ttl_s: float = 300.0,
+        loader: Callable[[], List[Dict[str, Any]]] = db.get_platforms,
+    ) -> None:
+        self._ttl_s = ttl_s
+        self._loader = loader
+        self._platforms: Optional[List[Dict[str, Any]]] = None
+        self._profiles: Dict[ProfileKey, Dict[str, Any]] = {}
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._missed = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._loads = 0
+        self._hits = 0
+        self._invalidations = 0
+        self._listen_errors = 0
+
+    def _fresh(self) -> bool:
+        if self._platforms is None:
+            return False
+        return self._ttl_s <= 0 or time.monotonic() - self._loaded_at < self._ttl_s
+
+    def invalidate(self, _: str = "") -> None:
+        with self._lock:
+            self._generation += 1
+            self._platforms = None
+            self._profiles = {}
+            self._invalidations += 1
+
+    def _snapshot(self) -> Optional[Snapshot]:
+        with self._lock:
+            if not self._fresh():
+                return None
+            return self._platforms, self._profiles
+
+    def refresh(self) -> Snapshot:
+        with self._load_lock:
+            return self._load()
+
+    def _load(self) -> Snapshot:
+        snapshot = self._snapshot()
+        if snapshot is not None:
+            return snapshot
+        with self._lock:
+            generation = self._generation
+        platforms = self._loader()
+        profiles: Dict[ProfileKey, Dict[str, Any]] = {}
+        for platform in platforms:
+            for profile in platform["profiles"]:
+                profiles[(platform["id"], profile["profile_name"])] = {
+                    "platform_id": platform["id"],
+                    "platform_name": platform["name"],
+                    "category": platform["category"],
+                    "role": platform["role"],
+                    "platform_source_url": platform["source_url"],
+                    "profile_id": profile["id"],
+                    "profile_name": profile["profile_name"],
+                    "speed_mps": profile["speed_mps"],
+                    "altitude_m": profile["altitude_m"],
+                    "rcs_m2_est": profile["rcs_m2_est"],
+                    "rcs_quality": profile["rcs_quality"],
+                    "profile_source_url": profile["source_url"],
+                    "notes": profile["notes"],
+                }
+        with self._lock:
+            self._loads += 1
+            if generation == self._generation:
+                self._platforms = platforms
+                self._profiles = profiles
+                self._loaded_at = time.monotonic()
+        return platforms, profiles
+
+    async def _ensure(self) -> Snapshot:
+        snapshot = self._snapshot()
+        if snapshot is not None:
+            self._hits += 1
+            return snapshot
+        return await run_in_threadpool(self.refresh)
+
+    async def platforms(self) -> List[Dict[str, Any]]:
+        platforms, _ = await self._ensure()
+        return platforms
+
+    async def profile(self, platform_id: int, profile_name: str) -> Optional[Dict[str, Any]]:
+        _, profiles = await self._ensure()
+        return profiles.get((platform_id, profile_name))
+
+    async def profiles(self, keys: List[ProfileKey]) -> Dict[ProfileKey, Optional[Dict[str, Any]]]:
+        _, profiles = await self._ensure()
+        return {key: profiles.get(key) for key in keys}
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, name="catalog-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+        self._thread = None
+
+    def _listening(self) -> None:
+        if self._missed:
+            self._missed = False
+            self.invalidate()
+
+    def _listen(self) -> None:
+        while not self._stop.is_set():
+            try:
+                db.listen(db.CATALOG_CHANNEL, self.invalidate, self._stop, ready=self._listening)
+            except Exception:
+                self._listen_errors += 1
+                self._missed = True
+                self._stop.wait(LISTEN_RETRY_S)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cached": self._platforms is not None,
+            "age_s": time.monotonic() - self._loaded_at if self._platforms is not None else None,
+            "ttl_s": self._ttl_s,
+            "platforms": len(self._platforms or []),
+            "profiles": len(self._profiles) if self._platforms is not None else 0,
+            "loads": self._loads,
+            "hits": self._hits,
+            "invalidations": self._invalidations,
+            "listening": self._thread is not None and self._thread.is_alive(),
+            "listen_errors": self._listen_errors,
+        }
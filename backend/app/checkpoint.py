@@ -0,0 +1,299 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from .engine import CUSTOM_MOVING_COLUMNS, CUSTOM_STATIC_COLUMNS, TrackArrays
+from .frames import Frame
+from .simulator import TRACK_COLUMNS, CustomTrack, Simulator
+from .trajectory import SEGMENT_FIELDS, Trajectory
+
+
+MAGIC = b"PTCK"
+VERSION = 1
+SUFFIX = ".ptck"
+DEFAULT_NAME = "checkpoint" + SUFFIX
+
+CUSTOM_COLUMNS = CUSTOM_MOVING_COLUMNS + CUSTOM_STATIC_COLUMNS + ("track_id", "platform_id", "rcs_m2")
+
+_HEADER = struct.Struct("<4sHHI")
+
+
+def _align(size: int) -> int:
+    return (size + 7) & ~7
+
+
+@dataclass
+class Checkpoint:
+    frame_index: int
+    time_of_day_s: float
+    motion_enabled: bool
+    targets: Optional[Dict[str, np.ndarray]]
+    custom: Dict[str, np.ndarray]
+    platform_names: List[str]
+    profile_names: List[str]
+    trajectories: List[Optional[Trajectory]]
+    created_at: float = 0.0
+
+    @classmethod
+    def from_frame(cls, frame: Frame, include_targets: bool = True) -> "Checkpoint":
+        custom = frame.custom_columns()
+        platform_names, profile_names = frame.custom_names()
+        return cls(
+            frame_index=frame.frame_index,
+            time_of_day_s=frame.time_of_day_s,
+            motion_enabled=frame.motion_enabled,
+            targets={name: frame.columns[name] for name in TRACK_COLUMNS} if include_targets else None,
+            custom={name: custom[name] for name in CUSTOM_COLUMNS},
+            platform_names=list(platform_names),
+            profile_names=list(profile_names),
+            trajectories=frame.custom_trajectories(),
+            created_at=time.time(),
+        )
+
+    def _trajectory_columns(self) -> Dict[str, np.ndarray]:
+        scripted = [t for t in self.trajectories if t is not None]
+        segments = [segment for t in scripted for segment in t.segments]
+        return {
+            "segment_count": np.array([0 if t is None else len(t.segments) for t in self.trajectories], dtype=np.int64),
+            "start_s": np.array([np.nan if t is None or t.start_s is None else t.start_s for t in self.trajectories]),
+            "duration_s": np.array([0.0 if t is None else t.duration_s for t in self.trajectories]),
+            "segments": np.array(segments, dtype=np.float64).reshape(-1, len(SEGMENT_FIELDS)).ravel(),
+        }
+
+    def sections(self) -> List[Tuple[str, Dict[str, np.ndarray]]]:
+        sections = [("custom", self.custom), ("trajectory", self._trajectory_columns())]
+        if self.targets is not None:
+            sections.insert(0, ("targets", self.targets))
+        return sections
+
+    def custom_tracks(self) -> List[CustomTrack]:
+        custom = self.custom
+        rows = zip(*(custom[name].tolist() for name in CUSTOM_COLUMNS))
+        tracks = []
+        for values, platform_name, profile_name, trajectory in zip(
+            rows, self.platform_names, self.profile_names, self.trajectories
+        ):
+            row = dict(zip(CUSTOM_COLUMNS, values))
+            rcs_m2 = row.pop("rcs_m2")
+            tracks.append(
+                CustomTrack(
+                    platform_name=platform_name,
+                    profile_name=profile_name,
+                    rcs_m2=None if rcs_m2 != rcs_m2 else rcs_m2,
+                    trajectory=trajectory,
+                    **row,
+                )
+            )
+        return tracks
+
+    def restore(self, simulator: Simulator) -> None:
+        if self.targets is None:
+            simulator.populate()
+        simulator.restore(
+            frame_index=self.frame_index,
+            time_of_day_s=self.time_of_day_s,
+            motion_enabled=self.motion_enabled,
+            targets=None if self.targets is None else TrackArrays.from_columns(self.targets),
+            custom_tracks=self.custom_tracks(),
+        )
+
+
+def write_checkpoint(path: str, checkpoint: Checkpoint) -> int:
+    columns = []
+    offset = 0
+    for section, values in checkpoint.sections():
+        for name, array in values.items():
+            array = np.ascontiguousarray(array)
+            columns.append((section, name, array, offset))
+            offset += _align(array.nbytes)
+    meta = json.dumps(
+        {
+            "frame_index": checkpoint.frame_index,
+            "time_of_day_s": checkpoint.time_of_day_s,
+            "motion_enabled": checkpoint.motion_enabled,
+            "created_at": checkpoint.created_at,
+            "platform_names": checkpoint.platform_names,
+            "profile_names": checkpoint.profile_names,
+            "columns": [[section, name, array.dtype.str, len(array), start] for section, name, array, start in columns],
+        },
+        separators=(",", ":"),
+    ).encode("utf-8")
+    data_offset = _align(_HEADER.size + len(meta))
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as handle:
+        handle.write(_HEADER.pack(MAGIC, VERSION, 0, len(meta)))
+        handle.write(meta)
+        handle.write(bytes(data_offset - _HEADER.size - len(meta)))
+        for _, _, array, _ in columns:
+            handle.write(memoryview(array).cast("B"))
+            handle.write(bytes(_align(array.nbytes) - array.nbytes))
+        handle.flush()
+        os.fsync(handle.fileno())
+        size = handle.tell()
+    os.replace(temporary, path)
+    return size
+
+
+def read_checkpoint(path: str) -> Checkpoint:
+    with open(path, "rb") as handle:
+        if os.fstat(handle.fileno()).st_size < _HEADER.size:
+            raise ValueError("Checkpoint too short")
+        data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_COPY)
+    magic, version, _, meta_length = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Invalid checkpoint magic")
+    if version != VERSION:
+        raise ValueError(f"Unsupported checkpoint version {version}")
+    meta = json.loads(data[_HEADER.size : _HEADER.size + meta_length])
+    data_offset = _align(_HEADER.size + meta_length)
+    sections: Dict[str, Dict[str, np.ndarray]] = {}
+    for section, name, dtype, count, offset in meta["columns"]:
+        if data_offset + offset + count * np.dtype(dtype).itemsize > len(data):
+            raise ValueError("Checkpoint truncated")
+        sections.setdefault(section, {})[name] = np.frombuffer(data, dtype=dtype, count=count, offset=data_offset + offset)
+    return Checkpoint(
+        frame_index=meta["frame_index"],
+        time_of_day_s=meta["time_of_day_s"],
+        motion_enabled=meta["motion_enabled"],
+        targets=sections.get("targets"),
+        custom=sections["custom"],
+        platform_names=meta["platform_names"],
+        profile_names=meta["profile_names"],
+        trajectories=_trajectories(sections["trajectory"]),
+        created_at=meta["created_at"],
+    )
+
+
+def _trajectories(columns: Dict[str, np.ndarray]) -> List[Optional[Trajectory]]:
+    counts = columns["segment_count"].tolist()
+    if not any(counts):
+        return [None] * len(counts)
+    segments = columns["segments"].reshape(-1, len(SEGMENT_FIELDS)).tolist()
+    trajectories: List[Optional[Trajectory]] = []
+    first = 0
+    for count, start_s, duration_s in zip(counts, columns["start_s"].tolist(), columns["duration_s"].tolist()):
+        if not count:
+            trajectories.append(None)
+            continue
+        rows = tuple(tuple(row) for row in segments[first : first + count])
+        first += count
+        trajectories.append(
+            Trajectory(
+                segments=rows,
+                starts=tuple(row[0] for row in rows),
+                duration_s=duration_s,
+                start_s=None if start_s != start_s else start_s,
+            )
+        )
+    return trajectories
+
+
+def latest_checkpoint(directory: str) -> Optional[str]:
+    paths = glob.glob(os.path.join(glob.escape(directory), "*" + SUFFIX))
+    return max(paths, key=os.path.getmtime) if paths else None
+
+
+class Checkpointer:
+    def __init__(
+        self,
+        directory: str,
+        frame_source: Callable[[], Frame],
+        interval_s: float = 0.0,
+        include_targets: bool = True,
+    ) -> None:
+        self.directory = directory
+        self._frame_source = frame_source
+        self._interval_s = interval_s
+        self._include_targets = include_targets
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._written = 0
+        self._errors = 0
+        self._last_error: Optional[str] = None
+        self._last: Optional[Dict[str, Any]] = None
+        self.restored: Optional[Dict[str, Any]] = None
+
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self._interval_s <= 0 or self.running():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="checkpointer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30.0)
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval_s):
+            try:
+                self.write()
+            except (OSError, ValueError):
+                pass
+
+    def write(self, name: str = DEFAULT_NAME) -> Dict[str, Any]:
+        with self._lock:
+            started = time.perf_counter()
+            path = os.path.join(self.directory, name)
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                checkpoint = Checkpoint.from_frame(self._frame_source(), self._include_targets)
+                size = write_checkpoint(path, checkpoint)
+            except (OSError, ValueError) as exc:
+                self._errors += 1
+                self._last_error = str(exc)
+                raise
+            self._written += 1
+            self._last = {
+                "path": path,
+                "frame_index": checkpoint.frame_index,
+                "time_of_day_s": checkpoint.time_of_day_s,
+                "targets": 0 if checkpoint.targets is None else len(checkpoint.targets["range_m"]),
+                "custom_tracks": len(checkpoint.platform_names),
+                "bytes": size,
+                "elapsed_s": time.perf_counter() - started,
+            }
+            return self._last
+
+    def restore(self, simulator: Simulator, path: str) -> Optional[Dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            checkpoint = read_checkpoint(path)
+            checkpoint.restore(simulator)
+        except (OSError, ValueError, KeyError) as exc:
+            self._errors += 1
+            self._last_error = f"restore {path}: {exc}"
+            return None
+        self.restored = {
+            "path": path,
+            "frame_index": checkpoint.frame_index,
+            "time_of_day_s": checkpoint.time_of_day_s,
+            "elapsed_s": time.perf_counter() - started,
+        }
+        return self.restored
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running(),
+            "directory": self.directory,
+            "interval_s": self._interval_s,
+            "written": self._written,
+            "errors": self._errors,
+            "last_error": self._last_error,
+            "last": self._last,
+            "restored": self.restored,
+        }
@@ -0,0 +1,215 @@
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, List, Sequence, Tuple, Union
+import struct
+
+import numpy as np
+
+from .frames import Frame
+
+
+MAGIC = b"PTSC"
+VERSION = 2
+MEDIA_TYPE = "application/vnd.phoenix.columnar"
+
+FLAG_MOTION_ENABLED = 0x0001
+
+_HEADER = struct.Struct("<4sHHQdIIII")
+_STRING_LEN = struct.Struct("<I")
+
+TARGET_COLUMNS = (
+    ("range_m", "<f4"),
+    ("azimuth_deg", "<f4"),
+    ("x_m", "<f4"),
+    ("y_m", "<f4"),
+    ("rcs_m2", "<f4"),
+    ("radial_velocity_mps", "<f4"),
+    ("track_number", "<u4"),
+    ("sector_deg", "<u2"),
+)
+
+CUSTOM_COLUMNS = (
+    ("range_m", "<f4"),
+    ("azimuth_deg", "<f4"),
+    ("x_m", "<f4"),
+    ("y_m", "<f4"),
+    ("altitude_m", "<f4"),
+    ("heading_deg", "<f4"),
+    ("speed_mps", "<f4"),
+    ("rcs_m2", "<f4"),
+    ("time_of_day_s", "<f4"),
+    ("track_id", "<u4"),
+    ("platform_id", "<u4"),
+    ("platform_name", "<u4"),
+    ("profile_name", "<u4"),
+)
+
+
+@dataclass
+class ColumnarFrame:
+    frame_index: int
+    time_of_day_s: float
+    prf_hz: int
+    motion_enabled: bool
+    targets: Dict[str, np.ndarray]
+    custom: Dict[str, np.ndarray]
+    strings: List[str]
+
+
+def _align(size: int) -> int:
+    return (size + 7) & ~7
+
+
+def _columns_size(layout: Sequence[Tuple[str, str]], count: int) -> int:
+    return sum(_align(count * np.dtype(dtype).itemsize) for _, dtype in layout)
+
+
+def _write_columns(buffer: bytearray, offset: int, layout, values: Dict[str, np.ndarray], count: int) -> int:
+    for name, dtype in layout:
+        column = np.ndarray(count, dtype=dtype, buffer=buffer, offset=offset)
+        column[:] = values[name]
+        offset += _align(column.nbytes)
+    return offset
+
+
+def _read_columns(view, offset: int, layout, count: int) -> Tuple[Dict[str, np.ndarray], int]:
+    columns = {}
+    for name, dtype in layout:
+        column = np.frombuffer(view, dtype=dtype, count=count, offset=offset)
+        columns[name] = column
+        offset += _align(column.nbytes)
+    return columns, offset
+
+
+def encode(
+    frame_index: int,
+    time_of_day_s: float,
+    prf_hz: int,
+    motion_enabled: bool,
+    targets: Dict[str, np.ndarray],
+    custom: Dict[str, np.ndarray],
+    strings: Sequence[str],
+) -> bytearray:
+    target_count = len(targets["range_m"])
+    custom_count = len(custom["range_m"])
+    encoded_strings = [s.encode("utf-8") for s in strings]
+    string_size = sum(_STRING_LEN.size + len(s) for s in encoded_strings)
+
+    size = (
+        _align(_HEADER.size)
+        + _columns_size(TARGET_COLUMNS, target_count)
+        + _columns_size(CUSTOM_COLUMNS, custom_count)
+        + string_size
+    )
+    buffer = bytearray(size)
+    _HEADER.pack_into(
+        buffer,
+        0,
+        MAGIC,
+        VERSION,
+        FLAG_MOTION_ENABLED if motion_enabled else 0,
+        frame_index,
+        time_of_day_s,
+        prf_hz,
+        target_count,
+        custom_count,
+        len(encoded_strings),
+    )
+    offset = _align(_HEADER.size)
+    offset = _write_columns(buffer, offset, TARGET_COLUMNS, targets, target_count)
+    offset = _write_columns(buffer, offset, CUSTOM_COLUMNS, custom, custom_count)
+    for value in encoded_strings:
+        _STRING_LEN.pack_into(buffer, offset, len(value))
+        offset += _STRING_LEN.size
+        buffer[offset : offset + len(value)] = value
+        offset += len(value)
+    return buffer
+
+
+def decode(data) -> ColumnarFrame:
+    view = memoryview(data).cast("B")
+    if len(view) < _HEADER.size:
+        raise ValueError("Columnar frame too short")
+    magic, version, flags, frame_index, time_of_day_s, prf_hz, target_count, custom_count, string_count = (
+        _HEADER.unpack_from(view, 0)
+    )
+    if magic != MAGIC:
+        raise ValueError("Invalid columnar magic")
+    if version != VERSION:
+        raise ValueError(f"Unsupported columnar version {version}")
+    expected = (
+        _align(_HEADER.size)
+        + _columns_size(TARGET_COLUMNS, target_count)
+        + _columns_size(CUSTOM_COLUMNS, custom_count)
+    )
+    if len(view) < expected:
+        raise ValueError("Columnar frame truncated")
+
+    offset = _align(_HEADER.size)
+    targets, offset = _read_columns(view, offset, TARGET_COLUMNS, target_count)
+    custom, offset = _read_columns(view, offset, CUSTOM_COLUMNS, custom_count)
+    strings: List[str] = []
+    for _ in range(string_count):
+        (length,) = _STRING_LEN.unpack_from(view, offset)
+        offset += _STRING_LEN.size
+        strings.append(bytes(view[offset : offset + length]).decode("utf-8"))
+        offset += length
+    return ColumnarFrame(
+        frame_index=frame_index,
+        time_of_day_s=time_of_day_s,
+        prf_hz=prf_hz,
+        motion_enabled=bool(flags & FLAG_MOTION_ENABLED),
+        targets=targets,
+        custom=custom,
+        strings=strings,
+    )
+
+
+def encode_frame(frame: Frame) -> bytearray:
+    strings: Dict[str, int] = {}
+
+    def intern(value: str) -> int:
+        return strings.setdefault(value, len(strings))
+
+    columns = frame.custom_columns()
+    platform_names, profile_names = frame.custom_names()
+    custom = {
+        "range_m": columns["range_m"],
+        "azimuth_deg": columns["azimuth_deg"],
+        "x_m": columns["x_m"],
+        "y_m": columns["y_m"],
+        "altitude_m": columns["altitude_m"],
+        "heading_deg": columns["heading_deg"],
+        "speed_mps": columns["speed_mps"],
+        "rcs_m2": columns["rcs_m2"],
+        "time_of_day_s": frame.custom_times(),
+        "track_id": columns["track_id"],
+        "platform_id": columns["platform_id"],
+        "platform_name": [intern(name) for name in platform_names],
+        "profile_name": [intern(name) for name in profile_names],
+    }
+    return encode(
+        frame_index=frame.frame_index,
+        time_of_day_s=frame.time_of_day_s,
+        prf_hz=frame.prf_hz,
+        motion_enabled=frame.motion_enabled,
+        targets=frame.columns,
+        custom=custom,
+        strings=list(strings),
+    )
+
+
+def frame_bytes(frame: Frame) -> bytes:
+    return frame.encoded("columnar", lambda: bytes(encode_frame(frame)))
+
+
+def write_frame(target: Union[str, BinaryIO], frame: Frame) -> int:
+    data = frame_bytes(frame)
+    if isinstance(target, str):
+        with open(target, "wb") as handle:
+            return handle.write(data)
+    return target.write(data)
+
+
+def read_frame(path: str) -> ColumnarFrame:
+    with open(path, "rb") as handle:
+        return decode(handle.read())
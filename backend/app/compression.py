@@ -0,0 +1,50 @@
+from typing import Optional, Tuple
+import gzip
+import time
+
+from . import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+ENCODINGS: Tuple[str, ...] = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+    wildcard = weights.get("*", 0.0)
+    best = None
+    best_weight = 0.0
+    for encoding in ENCODINGS:
+        weight = weights.get(encoding, wildcard)
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    started = time.perf_counter()
+    if encoding == "br":
+        value = brotli.compress(data, quality=BROTLI_QUALITY)
+    else:
+        value = gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    metrics.FRAME_BUILD_SECONDS.labels(encoding).observe(time.perf_counter() - started)
+    return value
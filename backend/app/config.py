@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 from typing import List, Tuple
+import json
 import os
 
 
@@ -26,6 +27,44 @@ def _parse_float_range(value: str, default: Tuple[float, float]) -> Tuple[float,
     return (_parse_float(parts[0], default[0]), _parse_float(parts[1], default[1]))
 
 
+@dataclass
+class SiteConfig:
+    name: str
+    sac: int
+    sic: int
+    x_m: float
+    y_m: float
+    max_range_km: float
+    targets_per_sector: int
+    random_seed: int
+
+
+def _parse_sites(value: str, max_range_km: float, targets_per_sector: int, random_seed: int) -> List[SiteConfig]:
+    if not value or not value.strip():
+        return []
+    entries = json.loads(value)
+    if not isinstance(entries, list):
+        raise ValueError("SITES must be a JSON array")
+    sites = []
+    for index, entry in enumerate(entries):
+        sites.append(
+            SiteConfig(
+                name=str(entry.get("name", f"site{index + 1}")),
+                sac=int(entry.get("sac", 1)),
+                sic=int(entry.get("sic", index + 1)),
+                x_m=float(entry.get("x_m", 0.0)),
+                y_m=float(entry.get("y_m", 0.0)),
+                max_range_km=float(entry.get("max_range_km", max_range_km)),
+                targets_per_sector=int(entry.get("targets_per_sector", targets_per_sector)),
+                random_seed=int(entry.get("seed", random_seed + index)),
+            )
+        )
+    names = [site.name for site in sites]
+    if len(set(names)) != len(names):
+        raise ValueError("SITES names must be unique")
+    return sites
+
+
 @dataclass
 class Settings:
     prf_hz: int
@@ -35,6 +74,38 @@ class Settings:
     rcs_m2_range: Tuple[float, float]
     allowed_origins: List[str]
     random_seed: int
+    sim_engine: str
+    stream_max_hz: float
+    state_history_frames: int
+    tick_hz: float
+    udp_target: str
+    udp_scan_period_s: float
+    udp_mtu: int
+    udp_multicast_ttl: int
+    udp_multicast_interface: str
+    recording_dir: str
+    catalog_ttl_s: float
+    spatial_range_bin_m: float
+    scan_rotation_s: float
+    scan_beamwidth_deg: float
+    sites: List[SiteConfig]
+    custom_track_site: str
+    shard_processes: int
+    profiler_hz: float
+    detection_enabled: bool
+    detection_snr_db: float
+    detection_reference_range_km: float
+    detection_pfa: float
+    detection_swerling: int
+    detection_range_sigma_m: float
+    detection_azimuth_sigma_deg: float
+    detection_clutter_per_sector: float
+    scenario_file: str
+    scenario_dir: str
+    compress_min_bytes: int
+    checkpoint_dir: str
+    checkpoint_interval_s: float
+    checkpoint_restore: bool
 
     @classmethod
     def from_env(cls) -> "Settings":
@@ -46,6 +117,44 @@ class Settings:
         allowed_origins_raw = os.getenv("ALLOWED_ORIGINS", "http://localhost:5173")
         allowed_origins = [o.strip() for o in allowed_origins_raw.split(",") if o.strip()]
         random_seed = _parse_int(os.getenv("SIM_SEED"), 42)
+        sim_engine = os.getenv("SIM_ENGINE", "numpy").strip().lower()
+        if sim_engine not in ("numpy", "python"):
+            sim_engine = "numpy"
+        stream_max_hz = _parse_float(os.getenv("STREAM_MAX_HZ"), 20.0)
+        tick_hz = _parse_float(os.getenv("TICK_HZ"), 50.0)
+        udp_target = os.getenv("ASTERIX_UDP_TARGET", "").strip()
+        udp_scan_period_s = _parse_float(os.getenv("ASTERIX_SCAN_PERIOD_S"), 4.0)
+        udp_mtu = _parse_int(os.getenv("ASTERIX_UDP_MTU"), 1500)
+        udp_multicast_ttl = _parse_int(os.getenv("ASTERIX_UDP_TTL"), 1)
+        udp_multicast_interface = os.getenv("ASTERIX_UDP_INTERFACE", "").strip()
+        recording_dir = os.getenv("RECORDING_DIR", "recordings")
+        catalog_ttl_s = _parse_float(os.getenv("CATALOG_TTL_S"), 300.0)
+        scan_rotation_s = _parse_float(os.getenv("SCAN_ROTATION_S"), 0.0)
+        scan_beamwidth_deg = min(360.0, max(0.0, _parse_float(os.getenv("SCAN_BEAMWIDTH_DEG"), 1.4)))
+        spatial_range_bin_m = max(1.0, _parse_float(os.getenv("SPATIAL_RANGE_BIN_M"), 1000.0))
+        state_history_frames = max(1, _parse_int(os.getenv("STATE_HISTORY_FRAMES"), 16))
+        profiler_hz = max(0.0, _parse_float(os.getenv("PROFILER_HZ"), 0.0))
+        sites = _parse_sites(os.getenv("SITES"), max_range_km, targets_per_sector, random_seed)
+        custom_track_site = os.getenv("CUSTOM_TRACK_SITE", "").strip() or (sites[0].name if sites else "")
+        if sites and custom_track_site not in [site.name for site in sites]:
+            raise ValueError("CUSTOM_TRACK_SITE must name one of SITES")
+        detection_enabled = _parse_int(os.getenv("DETECTION_ENABLED"), 0) != 0
+        detection_snr_db = _parse_float(os.getenv("DETECTION_SNR_DB"), 13.0)
+        detection_reference_range_km = max(0.001, _parse_float(os.getenv("DETECTION_REFERENCE_RANGE_KM"), 100.0))
+        detection_pfa = min(0.5, max(1e-12, _parse_float(os.getenv("DETECTION_PFA"), 1e-6)))
+        detection_swerling = _parse_int(os.getenv("DETECTION_SWERLING"), 1)
+        if detection_swerling not in (0, 1):
+            detection_swerling = 1
+        detection_range_sigma_m = max(0.0, _parse_float(os.getenv("DETECTION_RANGE_SIGMA_M"), 50.0))
+        detection_azimuth_sigma_deg = max(0.0, _parse_float(os.getenv("DETECTION_AZIMUTH_SIGMA_DEG"), 0.1))
+        detection_clutter_per_sector = max(0.0, _parse_float(os.getenv("DETECTION_CLUTTER_PER_SECTOR"), 1.0))
+        scenario_file = os.getenv("SCENARIO_FILE", "").strip()
+        scenario_dir = os.getenv("SCENARIO_DIR", "scenarios")
+        checkpoint_dir = os.getenv("CHECKPOINT_DIR", "checkpoints")
+        checkpoint_interval_s = max(0.0, _parse_float(os.getenv("CHECKPOINT_INTERVAL_S"), 0.0))
+        checkpoint_restore = _parse_int(os.getenv("CHECKPOINT_RESTORE"), 1) != 0
+        compress_min_bytes = max(0, _parse_int(os.getenv("COMPRESS_MIN_BYTES"), 1024))
+        shard_processes = max(1, _parse_int(os.getenv("SHARD_PROCESSES"), min(len(sites), os.cpu_count() or 1) or 1))
         return cls(
             prf_hz=prf_hz,
             sector_step_deg=sector_step_deg,
@@ -54,4 +163,36 @@ class Settings:
             rcs_m2_range=rcs_m2_range,
             allowed_origins=allowed_origins,
             random_seed=random_seed,
+            sim_engine=sim_engine,
+            stream_max_hz=stream_max_hz,
+            state_history_frames=state_history_frames,
+            tick_hz=tick_hz,
+            udp_target=udp_target,
+            udp_scan_period_s=udp_scan_period_s,
+            udp_mtu=udp_mtu,
+            udp_multicast_ttl=udp_multicast_ttl,
+            udp_multicast_interface=udp_multicast_interface,
+            recording_dir=recording_dir,
+            catalog_ttl_s=catalog_ttl_s,
+            spatial_range_bin_m=spatial_range_bin_m,
+            scan_rotation_s=scan_rotation_s,
+            scan_beamwidth_deg=scan_beamwidth_deg,
+            sites=sites,
+            custom_track_site=custom_track_site,
+            shard_processes=shard_processes,
+            profiler_hz=profiler_hz,
+            detection_enabled=detection_enabled,
+            detection_snr_db=detection_snr_db,
+            detection_reference_range_km=detection_reference_range_km,
+            detection_pfa=detection_pfa,
+            detection_swerling=detection_swerling,
+            detection_range_sigma_m=detection_range_sigma_m,
+            detection_azimuth_sigma_deg=detection_azimuth_sigma_deg,
+            detection_clutter_per_sector=detection_clutter_per_sector,
+            scenario_file=scenario_file,
+            scenario_dir=scenario_dir,
+            compress_min_bytes=compress_min_bytes,
+            checkpoint_dir=checkpoint_dir,
+            checkpoint_interval_s=checkpoint_interval_s,
+            checkpoint_restore=checkpoint_restore,
         )
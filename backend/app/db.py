@@ -1,8 +1,22 @@
-from typing import Any, Dict, List, Optional
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
 import os
+import select
+import threading
 
 import psycopg2
+import psycopg2.extensions
 import psycopg2.extras
+import psycopg2.pool
+
+from . import metrics
+
+
+CATALOG_CHANNEL = "platform_catalog"
+
+_pool: Optional[psycopg2.pool.ThreadedConnectionPool] = None
+_pool_slots: Optional[threading.BoundedSemaphore] = None
+_pool_lock = threading.Lock()
 
 
 def _get_database_url() -> str:
@@ -12,10 +26,80 @@ def _get_database_url() -> str:
     )
 
 
+def _get_pool_size(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, default)))
+    except ValueError:
+        return default
+
+
 def get_connection():
     return psycopg2.connect(_get_database_url())
 
 
+def get_pool() -> psycopg2.pool.ThreadedConnectionPool:
+    global _pool, _pool_slots
+    with _pool_lock:
+        if _pool is None or _pool.closed:
+            min_size = _get_pool_size("DB_POOL_MIN", 1)
+            max_size = max(min_size, _get_pool_size("DB_POOL_MAX", 8))
+            _pool = psycopg2.pool.ThreadedConnectionPool(min_size, max_size, _get_database_url())
+            _pool_slots = threading.BoundedSemaphore(max_size)
+        return _pool
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None and not _pool.closed:
+            _pool.closeall()
+        _pool = None
+
+
+@contextmanager
+def pooled_connection() -> Iterator[Any]:
+    pool = get_pool()
+    slots = _pool_slots
+    slots.acquire()
+    try:
+        conn = pool.getconn()
+        broken = False
+        try:
+            with conn:
+                yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            pool.putconn(conn, close=broken or bool(conn.closed))
+    finally:
+        slots.release()
+
+
+def listen(
+    channel: str,
+    callback: Callable[[str], None],
+    stop: threading.Event,
+    timeout_s: float = 1.0,
+    ready: Optional[Callable[[], None]] = None,
+) -> None:
+    conn = get_connection()
+    try:
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {channel};")
+        if ready is not None:
+            ready()
+        while not stop.is_set():
+            if select.select([conn], [], [], timeout_s) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                callback(conn.notifies.pop(0).payload)
+    finally:
+        conn.close()
+
+
 def get_platforms() -> List[Dict[str, Any]]:
     sql = """
         SELECT
@@ -40,7 +124,7 @@ def get_platforms() -> List[Dict[str, Any]]:
     """
     platforms: Dict[int, Dict[str, Any]] = {}
 
-    with get_connection() as conn:
+    with metrics.db_query("platforms"), pooled_connection() as conn:
         with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
             cur.execute(sql)
             rows = cur.fetchall()
@@ -72,50 +156,3 @@ def get_platforms() -> List[Dict[str, Any]]:
         )
 
     return list(platforms.values())
-
-
-def get_profile(platform_id: int, profile_name: str) -> Optional[Dict[str, Any]]:
-    sql = """
-        SELECT
-            p.id,
-            p.name,
-            p.category,
-            p.role,
-            p.source_url,
-            pr.id AS profile_id,
-            pr.profile_name,
-            pr.speed_mps,
-            pr.altitude_m,
-            pr.rcs_m2_est,
-            pr.rcs_quality,
-            pr.source_url AS profile_source_url,
-            pr.notes
-        FROM platform p
-        JOIN platform_profile pr ON pr.platform_id = p.id
-        WHERE p.id = %s AND pr.profile_name = %s
-        LIMIT 1;
-    """
-
-    with get_connection() as conn:
-        with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
-            cur.execute(sql, (platform_id, profile_name))
-            row = cur.fetchone()
-
-    if not row:
-        return None
-
-    return {
-        "platform_id": int(row["id"]),
-        "platform_name": row["name"],
-        "category": row["category"],
-        "role": row["role"],
-        "platform_source_url": row["source_url"],
-        "profile_id": int(row["profile_id"]),
-        "profile_name": row["profile_name"],
-        "speed_mps": float(row["speed_mps"]),
-        "altitude_m": float(row["altitude_m"]),
-        "rcs_m2_est": float(row["rcs_m2_est"]) if row["rcs_m2_est"] is not None else None,
-        "rcs_quality": row["rcs_quality"],
-        "profile_source_url": row["profile_source_url"],
-        "notes": row["notes"]
-    }
@@ -0,0 +1,129 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .asterix48 import MESSAGE_LEN
+from .frames import SECTION_FIELDS, SECTIONS, Frame
+
+
+ROW_KEYS = {
+    "targets": "target_id",
+    "asterix48": "target_id",
+    "custom_targets": "track_id",
+}
+
+RowSelector = Callable[[Frame, str], Optional[np.ndarray]]
+
+
+def _keys(frame: Frame, section: str) -> np.ndarray:
+    if section == "custom_targets":
+        return np.asarray(frame.custom_columns()["track_id"], dtype=np.int64)
+    return np.asarray(frame.columns["track_number"], dtype=np.int64)
+
+
+def _compared(frame: Frame, section: str) -> Dict[str, Tuple[np.ndarray, ...]]:
+    columns = frame.columns
+    target_count = len(columns["range_m"])
+    records = np.frombuffer(frame.messages(), dtype=np.uint8).reshape(-1, MESSAGE_LEN)
+    if section == "custom_targets":
+        custom = frame.custom_columns()
+        platform_names, profile_names = frame.custom_names()
+        values = {name: (custom[name],) for name in SECTION_FIELDS[section] if name in custom}
+        values.update(
+            platform_name=(np.array(platform_names, dtype=object),),
+            profile_name=(np.array(profile_names, dtype=object),),
+            time_of_day_s=(frame.custom_times(),),
+            raw_hex=(records[target_count:],),
+        )
+        return values
+    track_number = _keys(frame, section)
+    if section == "targets":
+        values = {name: (columns[name],) for name in SECTION_FIELDS[section] if name in columns}
+        values.update(target_id=(track_number,), track_number=(track_number,))
+        return values
+    return {
+        "target_id": (track_number,),
+        "track_number": (track_number,),
+        "time_of_day_s": (np.full(target_count, frame.time_of_day_s),),
+        "polar": (columns["range_m"], columns["azimuth_deg"]),
+        "cartesian": (columns["x_m"], columns["y_m"]),
+        "rcs_m2": (columns["rcs_m2"],),
+        "raw_hex": (records[:target_count],),
+        "raw_base64": (records[:target_count],),
+    }
+
+
+def _differs(
+    current: Tuple[np.ndarray, ...],
+    base: Tuple[np.ndarray, ...],
+    rows: np.ndarray,
+    base_rows: np.ndarray,
+) -> np.ndarray:
+    differs = np.zeros(len(rows), dtype=bool)
+    for values, base_values in zip(current, base):
+        values = values[rows]
+        base_values = base_values[base_rows]
+        changed = values != base_values
+        if changed.ndim > 1:
+            changed = changed.any(axis=1)
+        elif values.dtype.kind == "f":
+            changed &= ~(np.isnan(values) & np.isnan(base_values))
+        differs |= changed
+    return differs
+
+
+def diff_section(
+    base: Frame,
+    frame: Frame,
+    section: str,
+    base_rows: Optional[np.ndarray] = None,
+    rows: Optional[np.ndarray] = None,
+) -> Dict[str, List[Any]]:
+    key = ROW_KEYS[section]
+    if base_rows is None:
+        base_rows = np.arange(base.section_count(section))
+    if rows is None:
+        rows = np.arange(frame.section_count(section))
+    base_keys = _keys(base, section)[base_rows]
+    keys = _keys(frame, section)[rows]
+    order = np.argsort(base_keys, kind="stable")
+    position = np.searchsorted(base_keys[order], keys, side="right") - 1
+    matched = position >= 0
+    matched[matched] = base_keys[order[position[matched]]] == keys[matched]
+    matched_rows = rows[matched]
+    matched_base_rows = base_rows[order[position[matched]]]
+
+    values = _compared(frame, section)
+    base_values = _compared(base, section)
+    names = [name for name in SECTION_FIELDS[section] if name != key]
+    flags = {name: _differs(values[name], base_values[name], matched_rows, matched_base_rows) for name in names}
+    changed = np.logical_or.reduce(list(flags.values()))
+    changed_rows = matched_rows[changed]
+    names = [name for name in names if flags[name][changed].any()]
+    masks = [flags[name][changed].tolist() for name in names]
+    changed_fields = []
+    for index, row in enumerate(frame.section_rows(section, names + [key], changed_rows)):
+        fields = {name: row[name] for name, mask in zip(names, masks) if mask[index]}
+        fields[key] = row[key]
+        changed_fields.append(fields)
+    removed_rows = base_rows[~np.isin(base_keys, keys)]
+    return {
+        "added": frame.section_rows(section, SECTION_FIELDS[section], rows[~matched]),
+        "changed": changed_fields,
+        "removed": [row[key] for row in base.section_rows(section, (key,), removed_rows)],
+    }
+
+
+def diff_frames(
+    base: Frame,
+    frame: Frame,
+    sections: Sequence[str] = SECTIONS,
+    select: Optional[RowSelector] = None,
+) -> Dict[str, Any]:
+    delta = frame.header()
+    delta["base_frame_index"] = int(base.frame_index)
+    for section in sections:
+        base_rows = select(base, section) if select is not None else None
+        rows = select(frame, section) if select is not None else None
+        delta[section] = diff_section(base, frame, section, base_rows, rows)
+    return delta
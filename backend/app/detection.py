@@ -0,0 +1,137 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import math
+
+import numpy as np
+
+from . import metrics
+from .config import Settings
+from .engine import MIN_RANGE_M
+
+
+CLUTTER_TRACK_NUMBER = 0
+UNKNOWN_RCS_DBSM = -64.0
+
+
+def _erfc(x: np.ndarray) -> np.ndarray:
+    z = np.abs(x)
+    t = 1.0 / (1.0 + 0.3275911 * z)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    value = poly * np.exp(-z * z)
+    return np.where(x >= 0, value, 2.0 - value)
+
+
+@dataclass
+class DetectionModel:
+    reference_snr_db: float
+    reference_range_m: float
+    pfa: float
+    swerling: int
+    range_sigma_m: float
+    azimuth_sigma_deg: float
+    clutter_per_sector: float
+    sector_step_deg: float
+    sources: List[Tuple[int, int, float]]
+    seed: int
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> Optional["DetectionModel"]:
+        if not settings.detection_enabled:
+            return None
+        sources = [(site.sac, site.sic, site.max_range_km * 1000.0) for site in settings.sites]
+        return cls(
+            reference_snr_db=settings.detection_snr_db,
+            reference_range_m=settings.detection_reference_range_km * 1000.0,
+            pfa=settings.detection_pfa,
+            swerling=settings.detection_swerling,
+            range_sigma_m=settings.detection_range_sigma_m,
+            azimuth_sigma_deg=settings.detection_azimuth_sigma_deg,
+            clutter_per_sector=settings.detection_clutter_per_sector,
+            sector_step_deg=float(settings.sector_step_deg),
+            sources=sources or [(1, 1, settings.max_range_km * 1000.0)],
+            seed=settings.random_seed,
+        )
+
+    @property
+    def threshold(self) -> float:
+        return -math.log(self.pfa)
+
+    def rng(self, key: int = 0) -> np.random.Generator:
+        return np.random.default_rng([self.seed, key])
+
+    def snr_db(self, range_m: np.ndarray, rcs_dbsm: np.ndarray) -> np.ndarray:
+        rcs_dbsm = np.where(rcs_dbsm <= UNKNOWN_RCS_DBSM, 0.0, rcs_dbsm)
+        range_m = np.maximum(range_m, MIN_RANGE_M)
+        return self.reference_snr_db + rcs_dbsm + 40.0 * np.log10(self.reference_range_m / range_m)
+
+    def probability(self, snr_db: np.ndarray) -> np.ndarray:
+        snr = 10.0 ** (np.asarray(snr_db, dtype=np.float64) / 10.0)
+        if self.swerling == 1:
+            return self.pfa ** (1.0 / (1.0 + snr))
+        return 0.5 * _erfc(math.sqrt(self.threshold) - np.sqrt(snr + 0.5))
+
+    def apply(
+        self,
+        plots: Dict[str, np.ndarray],
+        rng: np.random.Generator,
+        start_deg: float = 0.0,
+        span_deg: float = 360.0,
+        time_span: Optional[Tuple[float, float]] = None,
+    ) -> Dict[str, np.ndarray]:
+        total = len(plots["range_m"])
+        detected = rng.random(total) < self.probability(self.snr_db(plots["range_m"], plots["rcs_dbsm"]))
+        count = int(np.count_nonzero(detected))
+        range_m = np.maximum(plots["range_m"][detected] + rng.normal(0.0, self.range_sigma_m, count), 0.0)
+        azimuth_deg = (plots["azimuth_deg"][detected] + rng.normal(0.0, self.azimuth_sigma_deg, count)) % 360.0
+        azimuth_rad = np.radians(azimuth_deg)
+        measured = {name: values[detected] for name, values in plots.items()}
+        measured["range_m"] = range_m
+        measured["azimuth_deg"] = azimuth_deg
+        measured["x_m"] = range_m * np.cos(azimuth_rad)
+        measured["y_m"] = range_m * np.sin(azimuth_rad)
+
+        if time_span is None:
+            time_of_day_s = plots["time_of_day_s"]
+            time_span = (float(time_of_day_s.min()), float(time_of_day_s.max())) if total else (0.0, 0.0)
+        clutter = self.clutter(rng, start_deg, span_deg, time_span)
+        clutter_count = len(clutter["range_m"])
+        metrics.DETECTION_PLOTS.labels("detected").inc(count)
+        metrics.DETECTION_PLOTS.labels("missed").inc(total - count)
+        metrics.DETECTION_PLOTS.labels("false_alarm").inc(clutter_count)
+        if not clutter_count:
+            return measured
+        return {
+            name: np.concatenate([values, clutter[name].astype(values.dtype, copy=False)])
+            for name, values in measured.items()
+        }
+
+    def clutter(
+        self,
+        rng: np.random.Generator,
+        start_deg: float,
+        span_deg: float,
+        time_span: Tuple[float, float],
+    ) -> Dict[str, np.ndarray]:
+        parts = []
+        mean = self.clutter_per_sector * span_deg / self.sector_step_deg
+        for sac, sic, max_range_m in self.sources:
+            count = int(rng.poisson(mean)) if mean > 0 else 0
+            offset = rng.random(count) * span_deg
+            azimuth_deg = (start_deg + offset) % 360.0
+            azimuth_rad = np.radians(azimuth_deg)
+            range_m = MIN_RANGE_M + rng.random(count) * max(0.0, max_range_m - MIN_RANGE_M)
+            snr_db = 10.0 * np.log10(self.threshold + rng.exponential(1.0, count))
+            parts.append(
+                {
+                    "sac": np.full(count, sac, dtype=np.int64),
+                    "sic": np.full(count, sic, dtype=np.int64),
+                    "time_of_day_s": time_span[0] + offset / span_deg * (time_span[1] - time_span[0]),
+                    "range_m": range_m,
+                    "azimuth_deg": azimuth_deg,
+                    "x_m": range_m * np.cos(azimuth_rad),
+                    "y_m": range_m * np.sin(azimuth_rad),
+                    "track_number": np.full(count, CLUTTER_TRACK_NUMBER, dtype=np.int64),
+                    "rcs_dbsm": snr_db - self.reference_snr_db - 40.0 * np.log10(self.reference_range_m / range_m),
+                }
+            )
+        return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
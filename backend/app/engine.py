@@ -0,0 +1,225 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .trajectory import TrajectorySet
+
+
+MIN_RANGE_M = 200.0
+
+CUSTOM_MOVING_COLUMNS = ("x_m", "y_m", "range_m", "azimuth_deg", "heading_deg", "altitude_m", "speed_mps")
+CUSTOM_STATIC_COLUMNS = ("created_time_s",)
+
+
+def custom_track_columns(tracks: List) -> Dict[str, np.ndarray]:
+    columns = {
+        name: np.array([getattr(t, name) for t in tracks], dtype=np.float64)
+        for name in CUSTOM_MOVING_COLUMNS + CUSTOM_STATIC_COLUMNS
+    }
+    columns["track_id"] = np.array([t.track_id for t in tracks], dtype=np.int64)
+    columns["platform_id"] = np.array([t.platform_id for t in tracks], dtype=np.int64)
+    columns["rcs_m2"] = np.array([np.nan if t.rcs_m2 is None else t.rcs_m2 for t in tracks], dtype=np.float64)
+    return columns
+
+
+def _grow(array: np.ndarray, capacity: int) -> np.ndarray:
+    grown = np.zeros(capacity, dtype=array.dtype)
+    grown[: len(array)] = array
+    return grown
+
+
+class TrackArrays:
+    _COLUMNS = (
+        ("track_number", np.int64),
+        ("sector_deg", np.float64),
+        ("azimuth_deg", np.float64),
+        ("range_m", np.float64),
+        ("radial_velocity_mps", np.float64),
+        ("rcs_m2", np.float64),
+        ("x_m", np.float64),
+        ("y_m", np.float64),
+        ("cos_az", np.float64),
+        ("sin_az", np.float64),
+    )
+
+    def __init__(self, capacity: int = 0) -> None:
+        self.size = 0
+        for name, dtype in self._COLUMNS:
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray]) -> "TrackArrays":
+        arrays = cls()
+        for name, dtype in cls._COLUMNS:
+            if name in columns:
+                setattr(arrays, name, np.asarray(columns[name], dtype=dtype))
+        azimuth_rad = np.radians(arrays.azimuth_deg)
+        arrays.cos_az = np.cos(azimuth_rad)
+        arrays.sin_az = np.sin(azimuth_rad)
+        arrays.size = len(arrays.range_m)
+        return arrays
+
+    def __len__(self) -> int:
+        return self.size
+
+    def clear(self) -> None:
+        self.size = 0
+
+    def reserve(self, capacity: int) -> None:
+        if capacity <= len(self.range_m):
+            return
+        for name, _ in self._COLUMNS:
+            setattr(self, name, _grow(getattr(self, name), capacity))
+
+    def view(self, name: str) -> np.ndarray:
+        return getattr(self, name)[: self.size]
+
+    def extend(
+        self,
+        track_number: np.ndarray,
+        sector_deg: np.ndarray,
+        azimuth_deg: np.ndarray,
+        range_m: np.ndarray,
+        radial_velocity_mps: np.ndarray,
+        rcs_m2: np.ndarray,
+    ) -> None:
+        count = len(track_number)
+        start = self.size
+        end = start + count
+        if end > len(self.range_m):
+            self.reserve(max(end, 2 * len(self.range_m)))
+        self.track_number[start:end] = track_number
+        self.sector_deg[start:end] = sector_deg
+        self.azimuth_deg[start:end] = azimuth_deg
+        self.range_m[start:end] = range_m
+        self.radial_velocity_mps[start:end] = radial_velocity_mps
+        self.rcs_m2[start:end] = rcs_m2
+        azimuth_rad = np.radians(self.azimuth_deg[start:end])
+        self.cos_az[start:end] = np.cos(azimuth_rad)
+        self.sin_az[start:end] = np.sin(azimuth_rad)
+        self.size = end
+        self._update_xy(slice(start, end))
+
+    def _update_xy(self, index) -> None:
+        np.multiply(self.cos_az[index], self.range_m[index], out=self.x_m[index])
+        np.multiply(self.sin_az[index], self.range_m[index], out=self.y_m[index])
+
+    def step(self, dt: float, max_range_m: float) -> None:
+        if self.size == 0:
+            return
+        range_m = self.view("range_m")
+        velocity = self.view("radial_velocity_mps")
+        range_m += velocity * dt
+        low = range_m < MIN_RANGE_M
+        range_m[low] = MIN_RANGE_M
+        high = range_m > max_range_m
+        range_m[high] = max_range_m
+        np.negative(velocity, out=velocity, where=low | high)
+        self._update_xy(slice(0, self.size))
+
+    def rows(self) -> Iterator[Tuple[int, float, float, float, float, float, float, float]]:
+        return zip(
+            self.view("track_number").tolist(),
+            self.view("sector_deg").tolist(),
+            self.view("range_m").tolist(),
+            self.view("azimuth_deg").tolist(),
+            self.view("x_m").tolist(),
+            self.view("y_m").tolist(),
+            self.view("rcs_m2").tolist(),
+            self.view("radial_velocity_mps").tolist(),
+        )
+
+
+def build_track_arrays(
+    sector_step_deg: int,
+    targets_per_sector: int,
+    max_range_m: float,
+    rcs_m2_range: Tuple[float, float],
+    uniform,
+    engine: Optional[TrackArrays] = None,
+) -> TrackArrays:
+    rcs_min, rcs_max = rcs_m2_range
+    sectors = np.arange(0, 360, sector_step_deg, dtype=np.float64)
+    count = len(sectors) * targets_per_sector
+
+    idx = np.tile(np.arange(targets_per_sector, dtype=np.float64), len(sectors))
+    sector_deg = np.repeat(sectors, targets_per_sector)
+    range_m = max_range_m * (0.1 + 0.9 * (idx + 1) / targets_per_sector)
+    velocity = np.empty(count)
+    rcs = np.empty(count)
+    for i in range(count):
+        velocity[i] = uniform(-35.0, 35.0)
+        rcs[i] = uniform(rcs_min, rcs_max)
+
+    engine = engine if engine is not None else TrackArrays()
+    engine.clear()
+    engine.reserve(count)
+    engine.extend(
+        track_number=np.arange(1, count + 1),
+        sector_deg=sector_deg,
+        azimuth_deg=(sector_deg + sector_step_deg / 2.0) % 360.0,
+        range_m=np.clip(range_m, MIN_RANGE_M, max_range_m),
+        radial_velocity_mps=velocity,
+        rcs_m2=rcs,
+    )
+    return engine
+
+
+class CustomTrackArrays:
+    def __init__(self) -> None:
+        self.x_m = np.zeros(0)
+        self.y_m = np.zeros(0)
+        self.range_m = np.zeros(0)
+        self.azimuth_deg = np.zeros(0)
+        self.heading_deg = np.zeros(0)
+        self.altitude_m = np.zeros(0)
+        self.speed_mps = np.zeros(0)
+        self._static = custom_track_columns([])
+        self._trajectories: Optional[TrajectorySet] = None
+
+    def __len__(self) -> int:
+        return len(self.x_m)
+
+    def load(self, tracks: List) -> None:
+        columns = custom_track_columns(tracks)
+        for name in CUSTOM_MOVING_COLUMNS:
+            setattr(self, name, columns.pop(name))
+        self._static = columns
+        self._trajectories = TrajectorySet.build(tracks)
+
+    def snapshot(self, copy: bool = True) -> Dict[str, np.ndarray]:
+        columns = dict(self._static)
+        for name in CUSTOM_MOVING_COLUMNS:
+            columns[name] = getattr(self, name).copy() if copy else getattr(self, name)
+        return columns
+
+    def store(self, tracks: List) -> None:
+        for track, values in zip(tracks, zip(*(getattr(self, name).tolist() for name in CUSTOM_MOVING_COLUMNS))):
+            for name, value in zip(CUSTOM_MOVING_COLUMNS, values):
+                setattr(track, name, value)
+
+    def step(self, dt: float, max_range_m: float, time_of_day_s: Optional[float] = None) -> None:
+        if len(self) == 0:
+            return
+        heading_rad = np.radians(self.heading_deg)
+        self.x_m += np.cos(heading_rad) * self.speed_mps * dt
+        self.y_m += np.sin(heading_rad) * self.speed_mps * dt
+        np.hypot(self.x_m, self.y_m, out=self.range_m)
+        over = self.range_m > max_range_m
+        if over.any():
+            self.range_m[over] = max_range_m
+            self.heading_deg[over] = (self.heading_deg[over] + 180.0) % 360.0
+            reflected_rad = np.radians(self.heading_deg[over])
+            self.x_m[over] = np.cos(reflected_rad) * max_range_m
+            self.y_m[over] = np.sin(reflected_rad) * max_range_m
+        self.azimuth_deg = (np.degrees(np.arctan2(self.y_m, self.x_m)) + 360.0) % 360.0
+        if self._trajectories is not None and time_of_day_s is not None:
+            self.seek(time_of_day_s)
+
+    def seek(self, time_of_day_s: float) -> None:
+        if self._trajectories is None:
+            return
+        rows = self._trajectories.rows
+        state = self._trajectories.evaluate(time_of_day_s)
+        for name in CUSTOM_MOVING_COLUMNS:
+            getattr(self, name)[rows] = state[name]
@@ -0,0 +1,426 @@
+from dataclasses import replace
+from typing import Any, Callable, Collection, Dict, Hashable, List, Optional, Sequence, Tuple, Union
+import base64
+import time
+
+import numpy as np
+from pydantic_core import to_json
+
+from . import metrics
+from .config import SiteConfig
+from .asterix48 import MESSAGE_LEN, encode_messages, rcs_m2_to_dbsm_array
+from .detection import DetectionModel
+from .engine import CUSTOM_MOVING_COLUMNS, custom_track_columns
+from .models import AsterixRecord, CustomTarget, MasterTable, Target
+
+
+SECTIONS = ("targets", "asterix48", "custom_targets")
+HEADER_FIELDS = ("prf_hz", "frame_index", "motion_enabled")
+SECTION_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "targets": tuple(Target.model_fields),
+    "asterix48": tuple(AsterixRecord.model_fields),
+    "custom_targets": tuple(CustomTarget.model_fields),
+}
+RETAINED_ENCODINGS = frozenset({"messages", "custom_names", "custom_times"})
+
+Rows = Union[slice, np.ndarray]
+
+MESSAGE_B64_PAD = -MESSAGE_LEN % 3
+MESSAGE_B64_LEN = 4 * (MESSAGE_LEN + MESSAGE_B64_PAD) // 3
+
+
+def _split(text: str, width: int) -> List[str]:
+    return [text[i : i + width] for i in range(0, len(text), width)]
+
+
+def _split_base64(messages) -> List[str]:
+    if not MESSAGE_B64_PAD:
+        return _split(base64.b64encode(messages).decode("ascii"), MESSAGE_B64_LEN)
+    rows = np.frombuffer(messages, dtype=np.uint8).reshape(-1, MESSAGE_LEN)
+    padded = np.zeros((len(rows), MESSAGE_LEN + MESSAGE_B64_PAD), dtype=np.uint8)
+    padded[:, :MESSAGE_LEN] = rows
+    text = base64.b64encode(padded).decode("ascii")
+    width = MESSAGE_B64_LEN - MESSAGE_B64_PAD
+    padding = "=" * MESSAGE_B64_PAD
+    return [text[i : i + width] + padding for i in range(0, len(text), MESSAGE_B64_LEN)]
+
+
+def _floats(values) -> List[float]:
+    return np.asarray(values, dtype=np.float64).tolist()
+
+
+class Frame:
+    def __init__(
+        self,
+        frame_index: int,
+        time_of_day_s: float,
+        prf_hz: int,
+        motion_enabled: bool,
+        columns: Dict[str, np.ndarray],
+        custom_tracks: List,
+        custom_columns: Optional[Dict[str, np.ndarray]] = None,
+        detection: Optional[DetectionModel] = None,
+        custom_site: Optional[SiteConfig] = None,
+    ) -> None:
+        self.frame_index = frame_index
+        self.time_of_day_s = time_of_day_s
+        self.prf_hz = prf_hz
+        self.motion_enabled = motion_enabled
+        self.columns = columns
+        self._custom_source = custom_tracks
+        self._custom_columns = custom_columns
+        self._custom_tracks = custom_tracks if custom_columns is None else None
+        self.detection = detection
+        self.custom_site = custom_site
+        self._encodings: Dict[Hashable, Any] = {}
+        self._retired = False
+
+    @property
+    def custom_tracks(self) -> List:
+        if self._custom_tracks is None:
+            columns = self._custom_columns
+            moving = zip(*(columns[name].tolist() for name in CUSTOM_MOVING_COLUMNS))
+            self._custom_tracks = [
+                replace(track, **dict(zip(CUSTOM_MOVING_COLUMNS, values)))
+                for track, values in zip(self._custom_source, moving)
+            ]
+        return self._custom_tracks
+
+    def custom_columns(self) -> Dict[str, np.ndarray]:
+        if self._custom_columns is None:
+            self._custom_columns = custom_track_columns(self._custom_source)
+        return self._custom_columns
+
+    def custom_trajectories(self) -> List:
+        return [track.trajectory for track in self._custom_source]
+
+    def custom_names(self) -> Tuple[List[str], List[str]]:
+        tracks = self._custom_source
+        return self.encoded(
+            "custom_names",
+            lambda: ([t.platform_name for t in tracks], [t.profile_name for t in tracks]),
+        )
+
+    @property
+    def table(self) -> MasterTable:
+        return self.encoded("table", self._table)
+
+    def _table(self) -> MasterTable:
+        payload = self.payload()
+        return self._timed("table", lambda: MasterTable.model_validate(payload))
+
+    def custom_times(self) -> np.ndarray:
+        return self.encoded(
+            "custom_times",
+            lambda: np.maximum(0.0, self.time_of_day_s - self.custom_columns()["created_time_s"]),
+        )
+
+    def _timed(self, stage: str, build: Callable[[], Any]) -> Any:
+        started = time.perf_counter()
+        value = build()
+        metrics.FRAME_BUILD_SECONDS.labels(stage).observe(time.perf_counter() - started)
+        return value
+
+    def encoded(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        value = self._encodings.get(key)
+        if value is None:
+            value = build()
+            if not self._retired or key in RETAINED_ENCODINGS:
+                self._encodings[key] = value
+        return value
+
+    def retire(self) -> None:
+        self._retired = True
+        self._encodings = {key: value for key, value in self._encodings.items() if key in RETAINED_ENCODINGS}
+        if self._custom_columns is not None:
+            self._custom_tracks = None
+
+    def plot_columns(self) -> Dict[str, np.ndarray]:
+        return self.encoded("plots", lambda: self._timed("plots", self._build_plot_columns))
+
+    def radar_plots(self) -> Dict[str, np.ndarray]:
+        if self.detection is None:
+            return self.plot_columns()
+        return self.encoded("radar_plots", lambda: self._timed("detection", self._detect))
+
+    def _detect(self) -> Dict[str, np.ndarray]:
+        detection = self.detection
+        plots = self.plot_columns()
+        time_span = (self.time_of_day_s, self.time_of_day_s)
+        return detection.apply(plots, detection.rng(self.frame_index), time_span=time_span)
+
+    def messages(self) -> bytearray:
+        return self.encoded("messages", lambda: self._encode_messages(self.plot_columns()))
+
+    def _encode_messages(self, plots: Dict[str, np.ndarray]) -> bytearray:
+        return self._timed("asterix", lambda: encode_messages(**plots))
+
+    def _custom_plot_position(self, custom: Dict[str, np.ndarray]) -> Tuple[np.ndarray, ...]:
+        site = self.custom_site
+        if site is None or (site.x_m == 0.0 and site.y_m == 0.0):
+            return custom["range_m"], custom["azimuth_deg"], custom["x_m"], custom["y_m"]
+        x_m = custom["x_m"] - site.x_m
+        y_m = custom["y_m"] - site.y_m
+        azimuth_deg = (np.degrees(np.arctan2(y_m, x_m)) + 360.0) % 360.0
+        return np.hypot(x_m, y_m), azimuth_deg, x_m, y_m
+
+    def _build_plot_columns(self) -> Dict[str, np.ndarray]:
+        columns = self.columns
+        custom = self.custom_columns()
+        count = len(columns["range_m"]) + len(custom["range_m"])
+        rcs_m2 = custom["rcs_m2"]
+        missing = np.isnan(rcs_m2)
+        custom_rcs_dbsm = rcs_m2_to_dbsm_array(np.where(missing, 1.0, rcs_m2))
+        custom_rcs_dbsm[missing] = -64.0
+        target_count = len(columns["range_m"])
+        site = self.custom_site
+        custom_sac = np.full(count - target_count, 1 if site is None else site.sac, dtype=np.int64)
+        custom_sic = np.full(count - target_count, 1 if site is None else site.sic, dtype=np.int64)
+        custom_range_m, custom_azimuth_deg, custom_x_m, custom_y_m = self._custom_plot_position(custom)
+        x_m = columns["x_m"] - columns["site_x_m"] if "site_x_m" in columns else columns["x_m"]
+        y_m = columns["y_m"] - columns["site_y_m"] if "site_y_m" in columns else columns["y_m"]
+        return {
+            "sac": np.concatenate([columns.get("sac", np.full(target_count, 1, dtype=np.int64)), custom_sac]),
+            "sic": np.concatenate([columns.get("sic", np.full(target_count, 1, dtype=np.int64)), custom_sic]),
+            "time_of_day_s": np.concatenate([np.full(target_count, self.time_of_day_s), self.custom_times()]),
+            "range_m": np.concatenate([columns["range_m"], custom_range_m]),
+            "azimuth_deg": np.concatenate([columns["azimuth_deg"], custom_azimuth_deg]),
+            "x_m": np.concatenate([x_m, custom_x_m]),
+            "y_m": np.concatenate([y_m, custom_y_m]),
+            "track_number": np.concatenate([columns["track_number"], 8000 + custom["track_id"]]),
+            "rcs_dbsm": np.concatenate([rcs_m2_to_dbsm_array(columns["rcs_m2"]), custom_rcs_dbsm]),
+        }
+
+    def site(self, sac: int, sic: int) -> "Frame":
+        return self.encoded(("site", sac, sic), lambda: self._build_site(sac, sic))
+
+    def _build_site(self, sac: int, sic: int) -> "Frame":
+        columns = self.columns
+        count = len(columns["range_m"])
+        mask = (columns.get("sac", np.full(count, 1)) == sac) & (columns.get("sic", np.full(count, 1)) == sic)
+        site = self.custom_site
+        owned = site is None or (site.sac, site.sic) == (sac, sic)
+        return Frame(
+            frame_index=self.frame_index,
+            time_of_day_s=self.time_of_day_s,
+            prf_hz=self.prf_hz,
+            motion_enabled=self.motion_enabled,
+            columns={name: values[mask] for name, values in columns.items()},
+            custom_tracks=self._custom_source if owned else [],
+            custom_columns=self._custom_columns if owned else None,
+            detection=self.detection,
+            custom_site=site,
+        )
+
+    def payload(self) -> Dict[str, Any]:
+        return self.encoded("payload", self._payload)
+
+    def _payload(self) -> Dict[str, Any]:
+        messages = self.messages()
+        return self._timed("payload", lambda: self._build_payload(messages))
+
+    def json(self) -> bytes:
+        return self.encoded("json", self._json)
+
+    def _json(self) -> bytes:
+        payload = self.payload()
+        return self._timed("json", lambda: to_json(payload, inf_nan_mode="null"))
+
+    def header(self) -> Dict[str, Any]:
+        return {
+            "prf_hz": int(self.prf_hz),
+            "frame_index": int(self.frame_index),
+            "motion_enabled": bool(self.motion_enabled),
+        }
+
+    def section_count(self, section: str) -> int:
+        if section == "custom_targets":
+            return len(self.custom_columns()["range_m"])
+        return len(self.columns["range_m"])
+
+    def project(
+        self,
+        sections: Sequence[str],
+        fields: Optional[Collection[str]] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        return self._timed("projection", lambda: self._build_projection(sections, fields, offset, limit))
+
+    def _build_projection(
+        self,
+        sections: Sequence[str],
+        fields: Optional[Collection[str]],
+        offset: int,
+        limit: Optional[int],
+    ) -> Dict[str, Any]:
+        payload = self.header()
+        for section in sections:
+            count = self.section_count(section)
+            start = min(offset, count)
+            stop = count if limit is None else min(count, start + limit)
+            names = [name for name in SECTION_FIELDS[section] if fields is None or name in fields]
+            payload[section] = self.section_rows(section, names, slice(start, stop)) if names else [{} for _ in range(stop - start)]
+            offset = max(0, offset - count)
+            if limit is not None:
+                limit -= stop - start
+        return payload
+
+    def section_rows(self, section: str, names: Sequence[str], rows: Rows) -> List[Dict[str, Any]]:
+        getters = self._section_getters(section, rows)
+        columns = [getters[name]() for name in names]
+        return [dict(zip(names, values)) for values in zip(*columns)]
+
+    def _section_getters(self, section: str, rows: Rows) -> Dict[str, Callable[[], list]]:
+        columns = self.columns
+
+        def raw(first: int) -> Union[bytes, memoryview]:
+            if isinstance(rows, slice):
+                return memoryview(self.messages())[(first + rows.start) * MESSAGE_LEN : (first + rows.stop) * MESSAGE_LEN]
+            return np.frombuffer(self.messages(), dtype=np.uint8).reshape(-1, MESSAGE_LEN)[first + rows].tobytes()
+
+        def take(values: List[Any]) -> List[Any]:
+            return values[rows] if isinstance(rows, slice) else [values[index] for index in rows.tolist()]
+
+        if section == "custom_targets":
+            custom = self.custom_columns()
+            target_count = len(columns["range_m"])
+            getters = {name: (lambda name=name: _floats(custom[name][rows])) for name in SECTION_FIELDS[section]}
+            getters.update(
+                track_id=lambda: custom["track_id"][rows].tolist(),
+                platform_id=lambda: custom["platform_id"][rows].tolist(),
+                platform_name=lambda: take(self.custom_names()[0]),
+                profile_name=lambda: take(self.custom_names()[1]),
+                rcs_m2=lambda: [None if value != value else value for value in _floats(custom["rcs_m2"][rows])],
+                time_of_day_s=lambda: _floats(self.custom_times()[rows]),
+                raw_hex=lambda: _split(raw(target_count).hex(), 2 * MESSAGE_LEN),
+            )
+            return getters
+
+        def track_numbers() -> List[int]:
+            return np.asarray(columns["track_number"][rows], dtype=np.int64).tolist()
+
+        def pairs(first: str, second: str) -> List[Dict[str, float]]:
+            return [
+                {first: a, second: b}
+                for a, b in zip(_floats(columns[first][rows]), _floats(columns[second][rows]))
+            ]
+
+        getters = {name: (lambda name=name: _floats(columns[name][rows])) for name in SECTION_FIELDS["targets"]}
+        getters.update(
+            target_id=lambda: [f"T{track_number:04d}" for track_number in track_numbers()],
+            track_number=track_numbers,
+            time_of_day_s=lambda: [float(self.time_of_day_s)] * len(columns["range_m"][rows]),
+            polar=lambda: pairs("range_m", "azimuth_deg"),
+            cartesian=lambda: pairs("x_m", "y_m"),
+            raw_hex=lambda: _split(raw(0).hex(), 2 * MESSAGE_LEN),
+            raw_base64=lambda: _split_base64(raw(0)),
+        )
+        return getters
+
+    def _build_payload(self, messages: bytearray) -> Dict[str, Any]:
+        columns = self.columns
+        target_count = len(columns["range_m"])
+        raw_hex = _split(messages.hex(), 2 * MESSAGE_LEN)
+        raw_base64 = _split_base64(memoryview(messages)[: target_count * MESSAGE_LEN])
+        custom_hex = raw_hex[target_count:]
+        time_of_day_s = float(self.time_of_day_s)
+
+        targets: List[Dict[str, Any]] = []
+        asterix: List[Dict[str, Any]] = []
+        rows = zip(
+            np.asarray(columns["track_number"], dtype=np.int64).tolist(),
+            _floats(columns["sector_deg"]),
+            _floats(columns["range_m"]),
+            _floats(columns["azimuth_deg"]),
+            _floats(columns["x_m"]),
+            _floats(columns["y_m"]),
+            _floats(columns["rcs_m2"]),
+            _floats(columns["radial_velocity_mps"]),
+            raw_hex,
+            raw_base64,
+        )
+        for track_number, sector_deg, range_m, azimuth_deg, x_m, y_m, rcs_m2, velocity, hex_row, b64_row in rows:
+            target_id = f"T{track_number:04d}"
+            targets.append(
+                {
+                    "target_id": target_id,
+                    "track_number": track_number,
+                    "sector_deg": sector_deg,
+                    "range_m": range_m,
+                    "azimuth_deg": azimuth_deg,
+                    "x_m": x_m,
+                    "y_m": y_m,
+                    "rcs_m2": rcs_m2,
+                    "radial_velocity_mps": velocity,
+                }
+            )
+            asterix.append(
+                {
+                    "target_id": target_id,
+                    "track_number": track_number,
+                    "time_of_day_s": time_of_day_s,
+                    "polar": {"range_m": range_m, "azimuth_deg": azimuth_deg},
+                    "cartesian": {"x_m": x_m, "y_m": y_m},
+                    "rcs_m2": rcs_m2,
+                    "raw_hex": hex_row,
+                    "raw_base64": b64_row,
+                }
+            )
+
+        custom = self.custom_columns()
+        platform_names, profile_names = self.custom_names()
+        custom_rows = zip(
+            custom["track_id"].tolist(),
+            custom["platform_id"].tolist(),
+            platform_names,
+            profile_names,
+            _floats(custom["range_m"]),
+            _floats(custom["azimuth_deg"]),
+            _floats(custom["x_m"]),
+            _floats(custom["y_m"]),
+            _floats(custom["altitude_m"]),
+            _floats(custom["heading_deg"]),
+            _floats(custom["speed_mps"]),
+            [None if rcs_m2 != rcs_m2 else rcs_m2 for rcs_m2 in _floats(custom["rcs_m2"])],
+            _floats(self.custom_times()),
+            custom_hex,
+        )
+        custom_targets = [
+            {
+                "track_id": track_id,
+                "platform_id": platform_id,
+                "platform_name": platform_name,
+                "profile_name": profile_name,
+                "range_m": range_m,
+                "azimuth_deg": azimuth_deg,
+                "x_m": x_m,
+                "y_m": y_m,
+                "altitude_m": altitude_m,
+                "heading_deg": heading_deg,
+                "speed_mps": speed_mps,
+                "rcs_m2": rcs_m2,
+                "time_of_day_s": custom_time_s,
+                "raw_hex": hex_row,
+            }
+            for (
+                track_id,
+                platform_id,
+                platform_name,
+                profile_name,
+                range_m,
+                azimuth_deg,
+                x_m,
+                y_m,
+                altitude_m,
+                heading_deg,
+                speed_mps,
+                rcs_m2,
+                custom_time_s,
+                hex_row,
+            ) in custom_rows
+        ]
+
+        payload = self.header()
+        payload.update(targets=targets, asterix48=asterix, custom_targets=custom_targets)
+        return payload
@@ -0,0 +1,202 @@
+from dataclasses import dataclass, replace
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional
+import argparse
+import struct
+import sys
+import time
+
+import numpy as np
+
+from . import columnar
+from .asterix48 import encode_columns
+from .config import Settings
+from .frames import Frame
+from .recording import index_path, write_entry
+from .scenario import load_scenario
+from .shards import ShardPool
+from .simulator import Simulator
+
+
+SECONDS_PER_DAY = 86400.0
+MAX_REQUEST_S = 7 * SECONDS_PER_DAY
+FORMATS = ("asterix", "columnar")
+
+_FRAME_LEN = struct.Struct("<I")
+
+
+@dataclass
+class GenerateOptions:
+    duration_s: float
+    start_s: float = 0.0
+    scan_period_s: float = 4.0
+    decimate: int = 1
+    format: str = "asterix"
+
+    def validate(self) -> None:
+        if self.format not in FORMATS:
+            raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+        if self.duration_s < 0 or self.start_s < 0:
+            raise ValueError("start_s and duration_s must not be negative")
+        if self.scan_period_s <= 0:
+            raise ValueError("scan_period_s must be positive")
+        if self.decimate < 1:
+            raise ValueError("decimate must be at least 1")
+
+
+def steps_per_scan(settings: Settings, scan_period_s: float) -> int:
+    return max(1, int(round(scan_period_s * settings.prf_hz)))
+
+
+def iter_scans(simulator: Simulator, options: GenerateOptions) -> Iterator[Frame]:
+    steps = steps_per_scan(simulator.settings, options.scan_period_s)
+    dt = steps / simulator.settings.prf_hz
+    simulator.set_motion(True)
+    scan = 0
+    while scan * dt < options.start_s:
+        simulator.step(steps)
+        scan += 1
+    end_s = options.start_s + options.duration_s
+    emitted = 0
+    while scan * dt <= end_s:
+        if emitted % options.decimate == 0:
+            yield simulator.current_frame()
+        emitted += 1
+        simulator.step(steps)
+        scan += 1
+
+
+def asterix_blocks(frame: Frame) -> List[memoryview]:
+    plots = dict(frame.radar_plots())
+    plots["time_of_day_s"] = np.mod(plots["time_of_day_s"], SECONDS_PER_DAY)
+    return encode_columns(**plots)
+
+
+def encode_scan(frame: Frame, format: str) -> bytes:
+    if format == "columnar":
+        data = columnar.frame_bytes(frame)
+        return _FRAME_LEN.pack(len(data)) + data
+    return b"".join(asterix_blocks(frame))
+
+
+def iter_columnar_stream(data) -> Iterator[columnar.ColumnarFrame]:
+    view = memoryview(data)
+    offset = 0
+    while offset + _FRAME_LEN.size <= len(view):
+        (length,) = _FRAME_LEN.unpack_from(view, offset)
+        offset += _FRAME_LEN.size
+        if offset + length > len(view):
+            break
+        yield columnar.decode(view[offset : offset + length])
+        offset += length
+
+
+class _Run:
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+        self.shards = ShardPool(settings, settings.sites, settings.shard_processes) if settings.sites else None
+        self.simulator = Simulator(settings, shards=self.shards)
+
+    def __enter__(self) -> Simulator:
+        if self.shards is not None:
+            self.shards.start()
+        elif self.settings.scenario_file:
+            settings = self.settings
+            self.simulator.set_targets(
+                load_scenario(settings.scenario_file, settings.sector_step_deg, settings.max_range_km * 1000.0)
+            )
+        return self.simulator
+
+    def __exit__(self, *exc) -> None:
+        if self.shards is not None:
+            self.shards.close()
+
+
+def iter_output(settings: Settings, options: GenerateOptions) -> Iterator[bytes]:
+    options.validate()
+    with _Run(settings) as simulator:
+        for frame in iter_scans(simulator, options):
+            yield encode_scan(frame, options.format)
+
+
+def generate(settings: Settings, options: GenerateOptions, output: BinaryIO, index: Optional[BinaryIO] = None) -> Dict[str, Any]:
+    options.validate()
+    started = time.perf_counter()
+    scans = 0
+    records = 0
+    written = 0
+    first_s: Optional[float] = None
+    last_s: Optional[float] = None
+    with _Run(settings) as simulator:
+        for frame in iter_scans(simulator, options):
+            if options.format == "asterix" and index is not None:
+                written += write_entry(output, index, frame.time_of_day_s, asterix_blocks(frame))
+            else:
+                written += output.write(encode_scan(frame, options.format))
+            scans += 1
+            records += len(frame.radar_plots()["range_m"])
+            first_s = frame.time_of_day_s if first_s is None else first_s
+            last_s = frame.time_of_day_s
+    elapsed_s = time.perf_counter() - started
+    return {
+        "format": options.format,
+        "scans": scans,
+        "records": records,
+        "bytes": written,
+        "time_range_s": None if first_s is None else (first_s, last_s),
+        "elapsed_s": elapsed_s,
+        "speedup": (last_s - first_s) / elapsed_s if first_s is not None and elapsed_s > 0 else None,
+    }
+
+
+def _parser(settings: Settings) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.headless",
+        description="Generate seeded CAT 048 or columnar scans without the wall clock.",
+    )
+    parser.add_argument("--duration-s", type=float, required=True, help="simulated seconds to emit")
+    parser.add_argument("--start-s", type=float, default=0.0, help="simulated seconds to run before emitting")
+    parser.add_argument("--scan-period-s", type=float, default=settings.udp_scan_period_s)
+    parser.add_argument("--decimate", type=int, default=1, help="emit every Nth scan")
+    parser.add_argument("--format", choices=FORMATS, default="asterix")
+    parser.add_argument("--seed", type=int, default=settings.random_seed)
+    parser.add_argument("--output", default="-", help="output file, '-' for stdout")
+    parser.add_argument("--no-index", action="store_true", help="do not write a replay index next to ASTERIX output")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    settings = Settings.from_env()
+    parser = _parser(settings)
+    args = parser.parse_args(argv)
+    options = GenerateOptions(
+        duration_s=args.duration_s,
+        start_s=args.start_s,
+        scan_period_s=args.scan_period_s,
+        decimate=args.decimate,
+        format=args.format,
+    )
+    try:
+        options.validate()
+    except ValueError as exc:
+        parser.error(str(exc))
+    settings = replace(settings, random_seed=args.seed)
+
+    if args.output == "-":
+        stats = generate(settings, options, sys.stdout.buffer)
+        sys.stdout.buffer.flush()
+    elif args.format == "asterix" and not args.no_index:
+        with open(args.output, "wb") as output, open(index_path(args.output), "wb") as index:
+            stats = generate(settings, options, output, index)
+    else:
+        with open(args.output, "wb") as output:
+            stats = generate(settings, options, output)
+    print(
+        f"{stats['scans']} scans, {stats['records']} records, {stats['bytes']} bytes "
+        f"in {stats['elapsed_s']:.2f} s",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+import csv
+import json
+
+import numpy as np
+
+from . import columnar
+from .simulator import CustomTrack
+from .trajectory import TrajectoryError, compile_trajectory
+
+
+JSONL_MEDIA_TYPES = ("application/x-ndjson", "application/jsonl", "application/x-jsonlines")
+CSV_MEDIA_TYPES = ("text/csv",)
+BINARY_MEDIA_TYPES = (columnar.MEDIA_TYPE,)
+
+OPS = ("upsert", "remove")
+
+ProfileKey = Tuple[int, str]
+
+
+class IngestError(ValueError):
+    def __init__(self, row: int, reason: str) -> None:
+        super().__init__(f"Row {row}: {reason}" if row else reason)
+        self.row = row
+        self.reason = reason
+
+
+@dataclass
+class TrackBatch:
+    source_row: List[int] = field(default_factory=list)
+    track_id: List[int] = field(default_factory=list)
+    platform_id: List[int] = field(default_factory=list)
+    profile_name: List[str] = field(default_factory=list)
+    range_m: List[float] = field(default_factory=list)
+    azimuth_deg: List[float] = field(default_factory=list)
+    heading_deg: List[float] = field(default_factory=list)
+    trajectory: List[Optional[List[Dict[str, Any]]]] = field(default_factory=list)
+    removed: Set[int] = field(default_factory=set)
+    rows: int = 0
+
+    def __len__(self) -> int:
+        return len(self.track_id)
+
+    def upsert(
+        self,
+        row: int,
+        track_id: int,
+        platform_id: int,
+        profile_name: str,
+        range_m: float,
+        azimuth_deg: float,
+        heading_deg: float,
+        trajectory: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        self.removed.discard(track_id)
+        self.source_row.append(row)
+        self.track_id.append(track_id)
+        self.platform_id.append(platform_id)
+        self.profile_name.append(profile_name)
+        self.range_m.append(range_m)
+        self.azimuth_deg.append(azimuth_deg)
+        self.heading_deg.append(heading_deg)
+        self.trajectory.append(trajectory)
+
+    def remove(self, track_id: int) -> None:
+        self.removed.add(track_id)
+
+    def keys(self) -> List[ProfileKey]:
+        return list(dict.fromkeys(zip(self.platform_id, self.profile_name)))
+
+    def add_row(self, row: int, values: Dict[str, Any]) -> None:
+        self.rows += 1
+        op = str(values.get("op") or "upsert").strip().lower()
+        if op not in OPS:
+            raise IngestError(row, f"unknown op {op!r}")
+        try:
+            track_id = int(values["track_id"])
+            if op == "remove":
+                self.remove(track_id)
+                return
+            self.upsert(
+                row,
+                track_id,
+                int(values["platform_id"]),
+                str(values["profile_name"]),
+                float(values["range_m"]),
+                float(values["azimuth_deg"]),
+                float(values["heading_deg"]),
+                _trajectory_legs(values.get("trajectory")),
+            )
+        except KeyError as exc:
+            raise IngestError(row, f"missing field {exc.args[0]}") from None
+        except (TypeError, ValueError) as exc:
+            raise IngestError(row, str(exc)) from None
+
+
+def _trajectory_legs(value: Any) -> Optional[List[Dict[str, Any]]]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"invalid trajectory JSON ({exc.msg})") from None
+    if not isinstance(value, list):
+        raise ValueError("trajectory must be a list of legs")
+    return value
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        lines = pending.split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line.decode("utf-8").rstrip("\r")
+    if pending:
+        yield pending.decode("utf-8").rstrip("\r")
+
+
+async def read_jsonl(chunks: AsyncIterator[bytes], batch: TrackBatch) -> None:
+    row = 0
+    async for line in iter_lines(chunks):
+        row += 1
+        if not line.strip():
+            continue
+        try:
+            values = json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise IngestError(row, f"invalid JSON ({exc.msg})") from None
+        if not isinstance(values, dict):
+            raise IngestError(row, "expected an object")
+        batch.add_row(row, values)
+
+
+async def iter_csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, List[str]]]:
+    pending: List[str] = []
+    quotes = 0
+    row = 0
+    start = 0
+    async for line in iter_lines(chunks):
+        row += 1
+        if not pending:
+            start = row
+        pending.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        record = "\n".join(pending)
+        pending = []
+        quotes = 0
+        if record.strip():
+            yield start, next(csv.reader([record]))
+    if pending:
+        raise IngestError(start, "unterminated quoted field")
+
+
+async def read_csv(chunks: AsyncIterator[bytes], batch: TrackBatch) -> None:
+    header: Optional[List[str]] = None
+    async for row, cells in iter_csv_rows(chunks):
+        if header is None:
+            header = [cell.strip() for cell in cells]
+            continue
+        batch.add_row(row, {name: value for name, value in zip(header, cells) if value != ""})
+
+
+def read_columnar(data: bytes, batch: TrackBatch) -> None:
+    try:
+        frame = columnar.decode(data)
+    except ValueError as exc:
+        raise IngestError(0, str(exc)) from None
+    custom = frame.custom
+    strings = frame.strings
+    for row, (track_id, platform_id, profile_index, range_m, azimuth_deg, heading_deg) in enumerate(
+        zip(
+            custom["track_id"].tolist(),
+            custom["platform_id"].tolist(),
+            custom["profile_name"].tolist(),
+            custom["range_m"].tolist(),
+            custom["azimuth_deg"].tolist(),
+            custom["heading_deg"].tolist(),
+        ),
+        start=1,
+    ):
+        if profile_index >= len(strings):
+            raise IngestError(row, "profile_name index out of range")
+        batch.rows += 1
+        batch.upsert(row, track_id, platform_id, strings[profile_index], range_m, azimuth_deg, heading_deg)
+
+
+async def read_batch(media_type: str, chunks: AsyncIterator[bytes]) -> TrackBatch:
+    batch = TrackBatch()
+    if media_type in JSONL_MEDIA_TYPES:
+        await read_jsonl(chunks, batch)
+    elif media_type in CSV_MEDIA_TYPES:
+        await read_csv(chunks, batch)
+    elif media_type in BINARY_MEDIA_TYPES:
+        read_columnar(b"".join([chunk async for chunk in chunks]), batch)
+    else:
+        raise ValueError(f"Unsupported media type {media_type!r}")
+    return batch
+
+
+def build_custom_tracks(
+    batch: TrackBatch,
+    profiles: Dict[ProfileKey, Optional[Dict[str, Any]]],
+) -> List[CustomTrack]:
+    range_m = np.maximum(0.0, np.array(batch.range_m, dtype=np.float64))
+    azimuth_deg = np.array(batch.azimuth_deg, dtype=np.float64)
+    azimuth_rad = np.radians(azimuth_deg)
+    x_m = (np.cos(azimuth_rad) * range_m).tolist()
+    y_m = (np.sin(azimuth_rad) * range_m).tolist()
+    azimuth_deg = (azimuth_deg % 360.0).tolist()
+    heading_deg = (np.array(batch.heading_deg, dtype=np.float64) % 360.0).tolist()
+    range_m = range_m.tolist()
+
+    tracks: Dict[int, CustomTrack] = {}
+    for i, key in enumerate(zip(batch.platform_id, batch.profile_name)):
+        if batch.track_id[i] in batch.removed:
+            continue
+        profile = profiles.get(key)
+        if profile is None:
+            raise IngestError(batch.source_row[i], f"invalid platform or profile {key[0]}/{key[1]}")
+        trajectory = None
+        if batch.trajectory[i] is not None:
+            try:
+                trajectory = compile_trajectory(
+                    batch.trajectory[i],
+                    x_m[i],
+                    y_m[i],
+                    profile["altitude_m"],
+                    heading_deg[i],
+                    profile["speed_mps"],
+                )
+            except TrajectoryError as exc:
+                raise IngestError(batch.source_row[i], f"invalid trajectory: {exc}") from None
+        tracks[batch.track_id[i]] = CustomTrack(
+            track_id=batch.track_id[i],
+            platform_id=profile["platform_id"],
+            platform_name=profile["platform_name"],
+            profile_name=profile["profile_name"],
+            x_m=x_m[i],
+            y_m=y_m[i],
+            range_m=range_m[i],
+            azimuth_deg=azimuth_deg[i],
+            altitude_m=profile["altitude_m"],
+            heading_deg=heading_deg[i],
+            speed_mps=profile["speed_mps"],
+            rcs_m2=profile["rcs_m2_est"],
+            created_time_s=0.0,
+            trajectory=trajectory,
+        )
+    return list(tracks.values())
@@ -1,16 +1,142 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from pydantic_core import to_json
+from contextlib import asynccontextmanager
+from dataclasses import replace as replace_settings
+from typing import Literal, Optional
+import asyncio
 import math
+import os
 
+from . import columnar, db, metrics
 from .asterix48 import decode_record, encode_record, Asterix48Data, rcs_dbsm_to_m2, rcs_m2_to_dbsm
+from .catalog import PlatformCatalog
+from .checkpoint import DEFAULT_NAME as CHECKPOINT_NAME, SUFFIX as CHECKPOINT_SUFFIX, Checkpointer, latest_checkpoint
+from .compression import compress, negotiate
 from .config import Settings
-from .db import get_platforms, get_profile
-from .simulator import Simulator, CustomTrack
+from .delta import diff_frames
+from .frames import Frame
+from .headless import MAX_REQUEST_S, GenerateOptions, iter_output
+from .ingest import IngestError, TrackBatch, build_custom_tracks, read_batch
+from .profiler import SamplingProfiler
+from .projection import Projection
+from .push import FrameHub, Subscription
+from .recording import Recorder, Recording, Replayer, frame_from_chunk, index_path
+from .scan import AntennaScan
+from .scenario import ScenarioError, ScenarioLoader
+from .shards import ShardPool
+from .simulator import Simulator
+from .ticker import FrameBuffer, TickLoop
+from .udp_emitter import UdpEmitter, parse_target
 
 
 settings = Settings.from_env()
-app = FastAPI(title="Phoenix Track Sim")
+shard_pool = ShardPool(settings, settings.sites, settings.shard_processes) if settings.sites else None
+checkpoint_path = latest_checkpoint(settings.checkpoint_dir) if settings.checkpoint_restore else None
+simulator = Simulator(settings, shards=shard_pool, populate=checkpoint_path is None)
+antenna = (
+    AntennaScan(
+        rotation_period_s=settings.scan_rotation_s,
+        beamwidth_deg=settings.scan_beamwidth_deg,
+        sector_step_deg=settings.sector_step_deg,
+        max_range_m=settings.max_range_km * 1000.0,
+        detection=simulator.detection,
+    )
+    if settings.scan_rotation_s > 0
+    else None
+)
+tick_loop = TickLoop(simulator, settings.tick_hz, scan=antenna)
+checkpointer = Checkpointer(
+    settings.checkpoint_dir,
+    tick_loop.latest,
+    interval_s=settings.checkpoint_interval_s,
+    include_targets=shard_pool is None,
+)
+catalog = PlatformCatalog(ttl_s=settings.catalog_ttl_s)
+recorder: Optional[Recorder] = None
+replayer: Optional[Replayer] = None
+replay_frames = FrameBuffer()
+scenario_loader = ScenarioLoader(simulator.set_targets, settings.sector_step_deg, settings.max_range_km * 1000.0)
+
+
+def current_frame() -> Frame:
+    if replayer is not None and replayer.running():
+        frame = replay_frames.front()
+        if frame is not None:
+            return frame
+    return tick_loop.latest()
+
+
+hub = FrameHub(
+    producer=current_frame,
+    sector_step_deg=settings.sector_step_deg,
+    max_rate_hz=settings.stream_max_hz,
+)
+
+metrics.STREAM_CLIENTS.set_function(hub.client_count)
+profiler = SamplingProfiler(interval_s=1.0 / settings.profiler_hz if settings.profiler_hz > 0 else 0.005)
+
+udp_target = parse_target(settings.udp_target)
+udp_emitter = (
+    UdpEmitter(
+        frame_source=tick_loop.latest,
+        target=udp_target,
+        scan_period_s=settings.udp_scan_period_s,
+        mtu=settings.udp_mtu,
+        multicast_ttl=settings.udp_multicast_ttl,
+        multicast_interface=settings.udp_multicast_interface,
+    )
+    if udp_target is not None
+    else None
+)
+if udp_emitter is not None and antenna is not None:
+    tick_loop.add_plot_listener(udp_emitter.send_plots)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    if shard_pool is not None:
+        shard_pool.start()
+    restored = checkpointer.restore(simulator, checkpoint_path) if checkpoint_path is not None else None
+    if checkpoint_path is not None and restored is None:
+        simulator.populate()
+    if settings.scenario_file and shard_pool is None and restored is None:
+        scenario_loader.start(settings.scenario_file)
+    tick_loop.start()
+    checkpointer.start()
+    catalog.start()
+    if udp_emitter is not None and antenna is None:
+        udp_emitter.start()
+    if settings.profiler_hz > 0:
+        profiler.start()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        scenario_loader.stop()
+        checkpointer.stop()
+        if settings.checkpoint_interval_s > 0:
+            try:
+                checkpointer.write()
+            except (OSError, ValueError):
+                pass
+        if replayer is not None:
+            replayer.stop()
+            replayer.recording.close()
+        if recorder is not None:
+            recorder.stop()
+        if udp_emitter is not None:
+            udp_emitter.stop()
+        tick_loop.stop()
+        catalog.stop()
+        db.close_pool()
+        if shard_pool is not None:
+            shard_pool.close()
+
+
+app = FastAPI(title="Phoenix Track Sim", lifespan=lifespan)
 
 allow_all = any(origin == "*" for origin in settings.allowed_origins)
 app.add_middleware(
@@ -20,8 +146,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-simulator = Simulator(settings)
+app.add_middleware(metrics.MetricsMiddleware)
 
 
 class EncodeRequest(BaseModel):
@@ -34,6 +159,12 @@ class EncodeRequest(BaseModel):
     y_m: float
     track_number: int
     rcs_m2: float
+    report_descriptor: Optional[int] = None
+    mode3a: Optional[int] = None
+    flight_level: Optional[float] = None
+    ground_speed_mps: Optional[float] = None
+    heading_deg: Optional[float] = None
+    aircraft_address: Optional[int] = None
 
 
 class DecodeRequest(BaseModel):
@@ -44,6 +175,50 @@ class MotionRequest(BaseModel):
     enabled: bool
 
 
+class RecordingRequest(BaseModel):
+    name: str
+    enabled: bool
+    append: bool = False
+
+
+class ReplayRequest(BaseModel):
+    name: str
+    start_time_s: float | None = None
+    speed: float = 1.0
+    output: Literal["state", "udp"] = "state"
+
+
+class ScenarioRequest(BaseModel):
+    name: str
+    format: Literal["jsonl", "csv", "columnar"] | None = None
+
+
+class CheckpointRequest(BaseModel):
+    name: str | None = None
+
+
+class ProfilerRequest(BaseModel):
+    enabled: bool
+    interval_ms: float | None = None
+    reset: bool = False
+
+
+class TrajectoryLeg(BaseModel):
+    type: Literal["straight", "speed", "climb", "turn", "waypoint"]
+    duration_s: float | None = None
+    speed_mps: float | None = None
+    accel_mps2: float | None = None
+    altitude_m: float | None = None
+    rate_mps: float | None = None
+    turn_deg: float | None = None
+    heading_deg: float | None = None
+    rate_deg_s: float | None = None
+    x_m: float | None = None
+    y_m: float | None = None
+    range_m: float | None = None
+    azimuth_deg: float | None = None
+
+
 class CustomTrackRequest(BaseModel):
     track_id: int | None = None
     platform_id: int
@@ -51,6 +226,7 @@ class CustomTrackRequest(BaseModel):
     range_m: float
     azimuth_deg: float
     heading_deg: float
+    trajectory: list[TrajectoryLeg] | None = None
 
 
 @app.get("/api/config")
@@ -62,13 +238,344 @@ async def get_config():
         "max_range_km": settings.max_range_km,
         "rcs_m2_range": settings.rcs_m2_range,
         "motion_enabled": simulator.motion_enabled(),
+        "tick_hz": settings.tick_hz,
+        "scan_rotation_s": settings.scan_rotation_s,
+        "scan_beamwidth_deg": settings.scan_beamwidth_deg,
     }
 
 
+def _respond(frame: Frame, key, content: bytes, media_type: str, accept_encoding: Optional[str]) -> Response:
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = None
+    if 0 < settings.compress_min_bytes <= len(content):
+        encoding = negotiate(accept_encoding)
+    if encoding is not None:
+        content = frame.encoded((encoding, key), lambda: compress(content, encoding))
+        headers["Content-Encoding"] = encoding
+    return Response(content=content, media_type=media_type, headers=headers)
+
+
+def _state_response(
+    projection: Optional[Projection],
+    since: Optional[int],
+    site: Optional[str],
+    binary: bool,
+    accept_encoding: Optional[str],
+) -> Response:
+    frame = current_frame()
+    if projection is not None and projection.cursor_frame_index not in (None, frame.frame_index):
+        frame = simulator.history_frame(projection.cursor_frame_index)
+        if frame is None:
+            raise HTTPException(status_code=410, detail="Expired cursor: its frame has left the history")
+    site_ids = None
+    if site is not None:
+        selected = shard_pool.site(site) if shard_pool is not None else None
+        if selected is None:
+            raise HTTPException(status_code=404, detail="Unknown site")
+        site_ids = (selected.sac, selected.sic)
+        frame = frame.site(*site_ids)
+    if binary:
+        if projection is not None:
+            raise HTTPException(status_code=400, detail="The columnar format does not support projection")
+        return _respond(frame, "columnar", columnar.frame_bytes(frame), columnar.MEDIA_TYPE, accept_encoding)
+    if projection is not None:
+        content = frame.encoded(
+            projection.key(),
+            lambda: to_json(projection.payload(frame), inf_nan_mode="null"),
+        )
+        return _respond(frame, projection.key(), content, "application/json", accept_encoding)
+    base = simulator.history_frame(since) if since is not None else None
+    if base is not None and site_ids is not None:
+        base = base.site(*site_ids)
+    if base is None:
+        return _respond(frame, "json", frame.json(), "application/json", accept_encoding)
+    key = ("delta", base.frame_index)
+    content = frame.encoded(
+        key,
+        lambda: to_json(diff_frames(base, frame), inf_nan_mode="null"),
+    )
+    return _respond(frame, key, content, "application/json", accept_encoding)
+
+
 @app.get("/api/state")
-async def get_state():
-    table = simulator.snapshot()
-    return table.model_dump()
+async def get_state(
+    request: Request,
+    since: int | None = None,
+    format: str | None = None,
+    site: str | None = None,
+    sections: str | None = None,
+    fields: str | None = None,
+    limit: int | None = None,
+    cursor: str | None = None,
+):
+    projection = None
+    if any(value is not None for value in (sections, fields, limit, cursor)):
+        if since is not None:
+            raise HTTPException(status_code=400, detail="since cannot be combined with sections, fields, limit or cursor")
+        try:
+            projection = Projection.parse(sections, fields, limit, cursor)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+    return await asyncio.to_thread(
+        _state_response,
+        projection,
+        since,
+        site,
+        format == "columnar" or columnar.MEDIA_TYPE in request.headers.get("accept", ""),
+        request.headers.get("accept-encoding"),
+    )
+
+
+def _parse_floats(value: str, count: int, name: str) -> list[float]:
+    try:
+        values = [float(part) for part in value.split(",")]
+    except ValueError:
+        values = []
+    if len(values) != count or not all(math.isfinite(v) for v in values):
+        raise HTTPException(status_code=400, detail=f"{name} expects {count} comma-separated numbers")
+    return values
+
+
+@app.get("/api/targets")
+async def query_targets(
+    bbox: Optional[str] = None,
+    sector: Optional[float] = None,
+    range_min: float = 0.0,
+    range_max: Optional[float] = None,
+    near: Optional[str] = None,
+    limit: int = 10,
+):
+    if sum(value is not None for value in (bbox, sector, near)) != 1:
+        raise HTTPException(status_code=400, detail="Specify exactly one of bbox, sector or near")
+    frame = current_frame()
+    index = simulator.spatial_index(frame)
+    distances = None
+    if bbox is not None:
+        x_min, y_min, x_max, y_max = _parse_floats(bbox, 4, "bbox")
+        matches = index.query_bbox(min(x_min, x_max), min(y_min, y_max), max(x_min, x_max), max(y_min, y_max))
+    elif sector is not None:
+        matches = index.query_sector(sector % 360.0, range_min, math.inf if range_max is None else range_max)
+    else:
+        x_m, y_m = _parse_floats(near, 2, "near")
+        matches, distances = index.nearest(x_m, y_m, max(0, min(limit, 10000)))
+    return {
+        "frame_index": frame.frame_index,
+        "time_of_day_s": frame.time_of_day_s,
+        "count": len(matches),
+        **index.rows(matches, distances),
+    }
+
+
+@app.get("/api/generate")
+async def generate_scans(
+    duration_s: float = Query(ge=0.0, le=MAX_REQUEST_S),
+    start_s: float = Query(0.0, ge=0.0, le=MAX_REQUEST_S),
+    scan_period_s: float | None = None,
+    decimate: int = 1,
+    format: Literal["asterix", "columnar"] = "asterix",
+    seed: int | None = None,
+):
+    options = GenerateOptions(
+        duration_s=duration_s,
+        start_s=start_s,
+        scan_period_s=scan_period_s if scan_period_s is not None else settings.udp_scan_period_s,
+        decimate=decimate,
+        format=format,
+    )
+    try:
+        options.validate()
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    run_settings = settings if seed is None else replace_settings(settings, random_seed=seed)
+    return StreamingResponse(iter_output(run_settings, options), media_type="application/octet-stream")
+
+
+@app.get("/api/sites")
+async def get_sites():
+    if shard_pool is None:
+        return {"sites": []}
+    return {"sites": shard_pool.stats()}
+
+
+@app.get("/api/tick")
+async def get_tick():
+    return tick_loop.stats()
+
+
+@app.get("/metrics")
+async def get_metrics():
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/api/profiler")
+async def get_profiler(limit: int = 50, sort: Literal["self", "total"] = "self", format: Literal["json", "collapsed"] = "json"):
+    if format == "collapsed":
+        return PlainTextResponse(profiler.collapsed())
+    return profiler.stats(limit=max(1, limit), sort=sort)
+
+
+@app.post("/api/profiler")
+async def set_profiler(payload: ProfilerRequest):
+    if payload.reset:
+        profiler.reset()
+    if payload.enabled:
+        interval_s = payload.interval_ms / 1000.0 if payload.interval_ms else None
+        profiler.start(interval_s)
+    else:
+        profiler.stop()
+    return profiler.stats(limit=0)
+
+
+@app.get("/api/udp")
+async def get_udp():
+    if udp_emitter is None:
+        return {"running": False, "target": None}
+    return udp_emitter.stats()
+
+
+def _data_path(directory: str, name: str, kind: str) -> str:
+    if not name or os.path.basename(name) != name or name.startswith("."):
+        raise HTTPException(status_code=400, detail=f"Invalid {kind} name")
+    return os.path.join(directory, name)
+
+
+def _recording_path(name: str) -> str:
+    return _data_path(settings.recording_dir, name, "recording")
+
+
+@app.get("/api/recording")
+async def get_recording():
+    if recorder is None:
+        return {"running": False, "path": None}
+    return recorder.stats()
+
+
+@app.post("/api/recording")
+async def set_recording(payload: RecordingRequest):
+    global recorder
+    path = _recording_path(payload.name) if payload.enabled else None
+    if path is not None and os.path.exists(path) and not payload.append:
+        raise HTTPException(status_code=409, detail="Recording already exists; set append to continue it")
+    if recorder is not None:
+        recorder.stop()
+    if path is not None:
+        os.makedirs(settings.recording_dir, exist_ok=True)
+        interval_s = 1.0 / settings.tick_hz if settings.tick_hz > 0 else 0.1
+        recorder = Recorder(path, tick_loop.latest, interval_s, append=payload.append)
+        recorder.start()
+    return recorder.stats() if recorder is not None else {"running": False, "path": None}
+
+
+@app.get("/api/replay")
+async def get_replay():
+    if replayer is None:
+        return {"running": False, "path": None}
+    return replayer.stats()
+
+
+@app.post("/api/replay")
+async def start_replay(payload: ReplayRequest):
+    global replayer
+    path = _recording_path(payload.name)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Recording not found")
+    if not os.path.exists(index_path(path)):
+        raise HTTPException(status_code=404, detail="Recording index not found")
+    if payload.output == "udp" and udp_emitter is None:
+        raise HTTPException(status_code=400, detail="UDP output is not configured")
+    if replayer is not None:
+        replayer.stop()
+        replayer.recording.close()
+
+    if payload.output == "udp":
+        def sink(chunk, _time_of_day_s):
+            udp_emitter.send_chunk(chunk)
+    else:
+        frame_counter = [simulator.current_frame().frame_index]
+
+        def sink(chunk, time_of_day_s):
+            frame_counter[0] += 1
+            replay_frames.publish(
+                frame_from_chunk(
+                    chunk,
+                    time_of_day_s,
+                    frame_counter[0],
+                    settings.prf_hz,
+                    settings.sector_step_deg,
+                )
+            )
+
+    replayer = Replayer(Recording(path))
+    replayer.start(sink, start_time_s=payload.start_time_s, speed=payload.speed)
+    return replayer.stats()
+
+
+@app.delete("/api/replay")
+async def stop_replay():
+    if replayer is not None:
+        replayer.stop()
+    return {"running": False}
+
+
+@app.get("/api/scenario")
+async def get_scenario():
+    return scenario_loader.stats()
+
+
+@app.post("/api/scenario")
+async def load_scenario(payload: ScenarioRequest):
+    if shard_pool is not None:
+        raise HTTPException(status_code=400, detail="Scenario files are not supported with SITES")
+    path = _data_path(settings.scenario_dir, payload.name, "scenario")
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Scenario not found")
+    if scenario_loader.running():
+        raise HTTPException(status_code=409, detail="A scenario is already loading")
+    try:
+        scenario_loader.start(path, payload.format)
+    except ScenarioError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return scenario_loader.stats()
+
+
+@app.delete("/api/scenario")
+async def cancel_scenario():
+    scenario_loader.stop()
+    return scenario_loader.stats()
+
+
+@app.get("/api/checkpoint")
+async def get_checkpoint():
+    return checkpointer.stats()
+
+
+@app.post("/api/checkpoint")
+async def write_checkpoint(payload: CheckpointRequest | None = None):
+    name = payload.name if payload is not None and payload.name else CHECKPOINT_NAME
+    if not name.endswith(CHECKPOINT_SUFFIX):
+        raise HTTPException(status_code=400, detail=f"Checkpoint names must end in {CHECKPOINT_SUFFIX}")
+    _data_path(settings.checkpoint_dir, name, "checkpoint")
+    try:
+        return await asyncio.to_thread(checkpointer.write, name)
+    except (OSError, ValueError) as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
+
+
+@app.websocket("/api/stream")
+async def stream_state(
+    websocket: WebSocket,
+    rate_hz: float = 5.0,
+    sections: str | None = None,
+    sectors: str | None = None,
+    delta: bool = False,
+):
+    try:
+        subscription = Subscription.parse(sections, sectors, delta)
+    except ValueError:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    await hub.serve(websocket, rate_hz, subscription)
 
 
 @app.post("/api/motion")
@@ -79,42 +586,70 @@ async def set_motion(payload: MotionRequest):
 
 @app.get("/api/platforms")
 async def list_platforms():
-    return {"platforms": get_platforms()}
+    return {"platforms": await catalog.platforms()}
+
+
+@app.get("/api/catalog")
+async def get_catalog():
+    return catalog.stats()
+
+
+@app.post("/api/catalog/invalidate")
+async def invalidate_catalog():
+    catalog.invalidate()
+    return catalog.stats()
 
 
 @app.post("/api/custom-tracks")
 async def set_custom_tracks(payload: list[CustomTrackRequest]):
-    tracks = []
+    batch = TrackBatch()
+    seen = set()
     for index, entry in enumerate(payload, start=1):
         track_id = entry.track_id if entry.track_id is not None else index
-        profile = get_profile(entry.platform_id, entry.profile_name)
-        if profile is None:
-            raise HTTPException(status_code=400, detail="Invalid platform or profile")
-        azimuth_rad = math.radians(entry.azimuth_deg)
-        range_m = max(0.0, entry.range_m)
-        x_m = math.cos(azimuth_rad) * range_m
-        y_m = math.sin(azimuth_rad) * range_m
-        tracks.append(
-            CustomTrack(
-                track_id=track_id,
-                platform_id=profile["platform_id"],
-                platform_name=profile["platform_name"],
-                profile_name=profile["profile_name"],
-                x_m=x_m,
-                y_m=y_m,
-                range_m=range_m,
-                azimuth_deg=entry.azimuth_deg % 360.0,
-                altitude_m=profile["altitude_m"],
-                heading_deg=entry.heading_deg % 360.0,
-                speed_mps=profile["speed_mps"],
-                rcs_m2=profile["rcs_m2_est"],
-                created_time_s=0.0,
-            )
+        if track_id in seen:
+            raise HTTPException(status_code=400, detail=f"Duplicate track_id {track_id}")
+        seen.add(track_id)
+        batch.upsert(
+            index,
+            track_id,
+            entry.platform_id,
+            entry.profile_name,
+            entry.range_m,
+            entry.azimuth_deg,
+            entry.heading_deg,
+            None if entry.trajectory is None else [leg.model_dump(exclude_none=True) for leg in entry.trajectory],
         )
+    profiles = await catalog.profiles(batch.keys())
+    try:
+        tracks = build_custom_tracks(batch, profiles)
+    except IngestError as exc:
+        detail = exc.reason if exc.reason.startswith("invalid trajectory") else "Invalid platform or profile"
+        raise HTTPException(status_code=400, detail=detail)
     simulator.set_custom_tracks(tracks)
     return {"count": len(tracks)}
 
 
+@app.post("/api/custom-tracks/bulk")
+async def bulk_custom_tracks(request: Request, replace: bool = False):
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    try:
+        batch = await read_batch(media_type, request.stream())
+    except IngestError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except ValueError as exc:
+        raise HTTPException(status_code=415, detail=str(exc))
+    profiles = await catalog.profiles(batch.keys())
+    try:
+        tracks = build_custom_tracks(batch, profiles)
+    except IngestError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if replace:
+        simulator.set_custom_tracks(tracks)
+        return {"rows": batch.rows, "upserted": len(tracks), "removed": 0, "count": len(tracks)}
+    count, removed = simulator.update_custom_tracks(tracks, batch.removed)
+    return {"rows": batch.rows, "upserted": len(tracks), "removed": removed, "count": count}
+
+
 @app.post("/api/asterix/encode")
 async def encode_asterix(payload: EncodeRequest):
     data = payload.model_dump()
@@ -126,8 +661,10 @@ async def encode_asterix(payload: EncodeRequest):
 
 @app.post("/api/asterix/decode")
 async def decode_asterix(payload: DecodeRequest):
-    data = bytes.fromhex(payload.hex)
-    decoded = decode_record(data)
+    try:
+        decoded = decode_record(bytes.fromhex(payload.hex))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
     if "rcs_dbsm" in decoded:
         decoded["rcs_m2"] = rcs_dbsm_to_m2(decoded["rcs_dbsm"])
     return decoded
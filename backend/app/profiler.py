@@ -0,0 +1,158 @@
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+import os
+import sys
+import threading
+import time
+
+
+FunctionKey = Tuple[str, int, str]
+
+IDLE_LEAVES = frozenset(
+    {
+        ("threading.py", "wait"),
+        ("threading.py", "_wait_for_tstate_lock"),
+        ("selectors.py", "select"),
+        ("connection.py", "_recv"),
+        ("connection.py", "_poll"),
+        ("thread.py", "_worker"),
+    }
+)
+
+
+def _function_key(frame) -> FunctionKey:
+    code = frame.f_code
+    return code.co_filename, code.co_firstlineno, code.co_name
+
+
+def _idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES
+
+
+def _short_path(filename: str) -> str:
+    for path in sorted(sys.path, key=len, reverse=True):
+        if path and filename.startswith(path + os.sep):
+            return filename[len(path) + 1 :]
+    return filename
+
+
+class SamplingProfiler:
+    def __init__(self, interval_s: float = 0.005, max_depth: int = 64) -> None:
+        self._interval_s = interval_s
+        self._max_depth = max_depth
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._self_counts: Counter = Counter()
+        self._total_counts: Counter = Counter()
+        self._stacks: Counter = Counter()
+        self._samples = 0
+        self._idle_samples = 0
+        self._started_at: Optional[float] = None
+        self._elapsed_s = 0.0
+        self._sample_cost_s = 0.0
+
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_s: Optional[float] = None) -> None:
+        if interval_s is not None and interval_s > 0:
+            self._interval_s = interval_s
+        if self.running():
+            return
+        self._stop.clear()
+        self._started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+        self._thread = None
+        if self._started_at is not None:
+            self._elapsed_s += time.monotonic() - self._started_at
+            self._started_at = None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._self_counts.clear()
+            self._total_counts.clear()
+            self._stacks.clear()
+            self._samples = 0
+            self._idle_samples = 0
+            self._elapsed_s = 0.0
+            self._sample_cost_s = 0.0
+            if self._started_at is not None:
+                self._started_at = time.monotonic()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self._interval_s):
+            started = time.perf_counter()
+            self._sample(own)
+            self._sample_cost_s += time.perf_counter() - started
+
+    def _sample(self, own: int) -> None:
+        stacks = []
+        idle = 0
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            if _idle(frame):
+                idle += 1
+                continue
+            stack: List[FunctionKey] = []
+            while frame is not None and len(stack) < self._max_depth:
+                stack.append(_function_key(frame))
+                frame = frame.f_back
+            if stack:
+                stacks.append(tuple(reversed(stack)))
+        with self._lock:
+            self._idle_samples += idle
+            for stack in stacks:
+                self._samples += 1
+                self._self_counts[stack[-1]] += 1
+                self._total_counts.update(set(stack))
+                self._stacks[stack] += 1
+
+    def stats(self, limit: int = 50, sort: str = "self") -> Dict[str, Any]:
+        with self._lock:
+            samples = self._samples
+            counts = self._self_counts if sort == "self" else self._total_counts
+            functions = [self._function_row(key, samples) for key, _ in counts.most_common(limit)]
+            elapsed_s = self._elapsed_s
+            if self._started_at is not None:
+                elapsed_s += time.monotonic() - self._started_at
+            return {
+                "running": self.running(),
+                "interval_s": self._interval_s,
+                "samples": samples,
+                "idle_samples": self._idle_samples,
+                "elapsed_s": elapsed_s,
+                "sample_cost_s": self._sample_cost_s,
+                "functions": functions,
+            }
+
+    def _function_row(self, key: FunctionKey, samples: int) -> Dict[str, Any]:
+        filename, line, name = key
+        self_samples = self._self_counts.get(key, 0)
+        total_samples = self._total_counts.get(key, 0)
+        return {
+            "function": name,
+            "file": _short_path(filename),
+            "line": line,
+            "self_samples": self_samples,
+            "total_samples": total_samples,
+            "self_pct": 100.0 * self_samples / samples if samples else 0.0,
+            "total_pct": 100.0 * total_samples / samples if samples else 0.0,
+        }
+
+    def collapsed(self) -> str:
+        with self._lock:
+            lines = [
+                ";".join(f"{name} ({_short_path(filename)}:{line})" for filename, line, name in stack) + f" {count}"
+                for stack, count in self._stacks.items()
+            ]
+        return "\n".join(sorted(lines)) + "\n"
@@ -0,0 +1,79 @@
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+import base64
+import binascii
+
+from .frames import SECTION_FIELDS, SECTIONS, Frame
+
+
+MAX_LIMIT = 100000
+
+
+def encode_cursor(frame_index: int, offset: int) -> str:
+    return base64.urlsafe_b64encode(f"{frame_index}:{offset}".encode("ascii")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    try:
+        text = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii")
+        frame_index, offset = (int(part) for part in text.split(":"))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor") from None
+    if offset < 0:
+        raise ValueError("Invalid cursor")
+    return frame_index, offset
+
+
+def _names(value: Optional[str]) -> Optional[list]:
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+@dataclass(frozen=True)
+class Projection:
+    sections: Tuple[str, ...] = SECTIONS
+    fields: Optional[FrozenSet[str]] = None
+    limit: Optional[int] = None
+    offset: int = 0
+    cursor_frame_index: Optional[int] = None
+
+    @classmethod
+    def parse(
+        cls,
+        sections: Optional[str] = None,
+        fields: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> "Projection":
+        selected = SECTIONS
+        names = _names(sections)
+        if names:
+            unknown = set(names).difference(SECTIONS)
+            if unknown:
+                raise ValueError(f"Unknown sections: {', '.join(sorted(unknown))}")
+            selected = tuple(name for name in SECTIONS if name in names)
+        field_set = None
+        names = _names(fields)
+        if names:
+            known = set().union(*(SECTION_FIELDS[section] for section in selected))
+            unknown = set(names).difference(known)
+            if unknown:
+                raise ValueError(f"Unknown fields for {', '.join(selected)}: {', '.join(sorted(unknown))}")
+            field_set = frozenset(names)
+        if limit is not None and not 1 <= limit <= MAX_LIMIT:
+            raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+        frame_index, offset = decode_cursor(cursor) if cursor else (None, 0)
+        return cls(sections=selected, fields=field_set, limit=limit, offset=offset, cursor_frame_index=frame_index)
+
+    def key(self) -> Tuple[Any, ...]:
+        return ("projection", self.sections, self.fields, self.offset, self.limit)
+
+    def payload(self, frame: Frame) -> Dict[str, Any]:
+        payload = frame.project(self.sections, self.fields, self.offset, self.limit)
+        if self.limit is not None:
+            total = sum(frame.section_count(section) for section in self.sections)
+            end = self.offset + self.limit
+            payload["total_rows"] = total
+            payload["next_cursor"] = encode_cursor(frame.frame_index, end) if end < total else None
+        return payload
@@ -0,0 +1,217 @@
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Hashable, Optional, Set, Tuple
+import asyncio
+import json
+
+import numpy as np
+from fastapi import WebSocket, WebSocketDisconnect
+from pydantic_core import to_json
+
+from . import metrics
+from .delta import RowSelector, diff_frames
+from .frames import SECTION_FIELDS, SECTIONS, Frame
+
+
+@dataclass(frozen=True)
+class Subscription:
+    sections: Tuple[str, ...] = SECTIONS
+    sectors: Optional[FrozenSet[float]] = None
+    delta: bool = False
+
+    @classmethod
+    def parse(
+        cls,
+        sections: Optional[str] = None,
+        sectors: Optional[str] = None,
+        delta: bool = False,
+    ) -> "Subscription":
+        selected = SECTIONS
+        if sections:
+            names = {s.strip() for s in sections.split(",") if s.strip()}
+            unknown = names.difference(SECTIONS)
+            if unknown:
+                raise ValueError(f"Unknown sections: {', '.join(sorted(unknown))}")
+            selected = tuple(name for name in SECTIONS if name in names)
+        sector_set = None
+        if sectors:
+            sector_set = frozenset(float(s) for s in sectors.split(",") if s.strip())
+        return cls(sections=selected, sectors=sector_set, delta=delta)
+
+    @classmethod
+    def from_message(cls, message: Dict[str, Any], current: "Subscription") -> "Subscription":
+        sections = message.get("sections", list(current.sections))
+        sectors = message.get("sectors", None if current.sectors is None else list(current.sectors))
+        if not isinstance(sections, list) or not sections:
+            raise ValueError("sections must be a non-empty list")
+        if sectors is not None and (not isinstance(sectors, list) or not sectors):
+            raise ValueError("sectors must be null or a non-empty list")
+        return cls.parse(
+            ",".join(str(s) for s in sections),
+            None if sectors is None else ",".join(str(s) for s in sectors),
+            bool(message.get("delta", current.delta)),
+        )
+
+
+def select_rows(frame: Frame, section: str, sectors: FrozenSet[float], sector_step_deg: int) -> np.ndarray:
+    if section == "custom_targets":
+        sector_deg = np.mod(frame.custom_columns()["azimuth_deg"], 360.0) // sector_step_deg * sector_step_deg
+    else:
+        sector_deg = frame.columns["sector_deg"]
+    return np.flatnonzero(np.isin(sector_deg, list(sectors)))
+
+
+def select_payload(frame: Frame, subscription: Subscription, sector_step_deg: int) -> Dict[str, Any]:
+    payload = frame.header()
+    for section in subscription.sections:
+        if subscription.sectors is None:
+            rows = slice(0, frame.section_count(section))
+        else:
+            rows = select_rows(frame, section, subscription.sectors, sector_step_deg)
+        payload[section] = frame.section_rows(section, SECTION_FIELDS[section], rows)
+    return payload
+
+
+@dataclass(eq=False)
+class _Client:
+    rate_hz: float
+    subscription: Subscription
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class FrameHub:
+    def __init__(self, producer: Callable[[], Frame], sector_step_deg: int, max_rate_hz: float) -> None:
+        self._producer = producer
+        self._sector_step_deg = sector_step_deg
+        self._max_rate_hz = max_rate_hz
+        self._clients: Set[_Client] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._sequence = 0
+        self._frame: Optional[Frame] = None
+        self._published = asyncio.Event()
+        self._messages: Dict[Hashable, asyncio.Future] = {}
+
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    def _clamp_rate(self, rate_hz: float) -> float:
+        return max(0.1, min(self._max_rate_hz, rate_hz))
+
+    def _publish(self, frame: Frame) -> None:
+        if frame is self._frame:
+            return
+        self._frame = frame
+        self._sequence += 1
+        self._messages = {}
+        published, self._published = self._published, asyncio.Event()
+        published.set()
+
+    def _selector(self, subscription: Subscription) -> Optional[RowSelector]:
+        sectors = subscription.sectors
+        if sectors is None:
+            return None
+        return lambda frame, section: select_rows(frame, section, sectors, self._sector_step_deg)
+
+    def _encode(self, frame: Frame, subscription: Subscription, base: Optional[Frame]) -> str:
+        if base is not None:
+            return frame.encoded(
+                ("push-delta", subscription.sections, subscription.sectors, base.frame_index),
+                lambda: to_json(
+                    diff_frames(base, frame, subscription.sections, self._selector(subscription)),
+                    inf_nan_mode="null",
+                ).decode("utf-8"),
+            )
+        if subscription.sections == SECTIONS and subscription.sectors is None:
+            return frame.encoded("push", lambda: frame.json().decode("utf-8"))
+        return frame.encoded(
+            ("push", subscription.sections, subscription.sectors),
+            lambda: to_json(
+                select_payload(frame, subscription, self._sector_step_deg),
+                inf_nan_mode="null",
+            ).decode("utf-8"),
+        )
+
+    def _message(self, frame: Frame, subscription: Subscription, base: Optional[Frame]) -> Awaitable[str]:
+        if not subscription.delta:
+            base = None
+        key = (subscription.sections, subscription.sectors, None if base is None else base.frame_index)
+        message = self._messages.get(key)
+        if message is None or message.get_loop() is not asyncio.get_running_loop():
+            message = asyncio.ensure_future(asyncio.to_thread(self._encode, frame, subscription, base))
+            self._messages[key] = message
+        return asyncio.shield(message)
+
+    async def _produce(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while self._clients:
+                started = loop.time()
+                self._publish(self._producer())
+                interval = 1.0 / max((client.rate_hz for client in self._clients), default=self._max_rate_hz)
+                await asyncio.sleep(max(0.0, interval - (loop.time() - started)))
+        finally:
+            self._task = None
+
+    async def _send_frames(self, websocket: WebSocket, client: _Client) -> None:
+        loop = asyncio.get_running_loop()
+        last_sequence = 0
+        last_frame: Optional[Frame] = None
+        last_subscription = client.subscription
+        while True:
+            if self._sequence == last_sequence or self._frame is None:
+                await self._published.wait()
+                continue
+            sequence = self._sequence
+            frame = self._frame
+            subscription = client.subscription
+            base = last_frame if subscription == last_subscription else None
+            started = loop.time()
+            message = await self._message(frame, subscription, base)
+            metrics.STREAM_MESSAGE_BYTES.observe(len(message))
+            await websocket.send_text(message)
+            last_sequence = sequence
+            last_frame = frame
+            last_subscription = subscription
+            remaining = 1.0 / client.rate_hz - (loop.time() - started)
+            if remaining > 0:
+                client.changed.clear()
+                try:
+                    await asyncio.wait_for(client.changed.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _receive_updates(self, websocket: WebSocket, client: _Client) -> None:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                message = json.loads(text)
+                if not isinstance(message, dict):
+                    raise ValueError("Subscription update must be a JSON object")
+                if "rate_hz" in message:
+                    client.rate_hz = self._clamp_rate(float(message["rate_hz"]))
+                client.subscription = Subscription.from_message(message, client.subscription)
+            except (TypeError, ValueError) as exc:
+                await websocket.send_json({"error": str(exc)})
+                continue
+            client.changed.set()
+
+    async def serve(self, websocket: WebSocket, rate_hz: float, subscription: Subscription) -> None:
+        client = _Client(rate_hz=self._clamp_rate(rate_hz), subscription=subscription)
+        self._clients.add(client)
+        if self._task is None:
+            self._task = asyncio.create_task(self._produce())
+        tasks = [
+            asyncio.create_task(self._send_frames(websocket, client)),
+            asyncio.create_task(self._receive_updates(websocket, client)),
+        ]
+        try:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in pending:
+                task.cancel()
+            for task in done:
+                exc = task.exception()
+                if exc is not None and not isinstance(exc, WebSocketDisconnect):
+                    raise exc
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._clients.discard(client)
@@ -0,0 +1,233 @@
+from typing import Any, Callable, Dict, Optional
+import mmap
+import os
+import threading
+import time
+
+import numpy as np
+
+from .asterix48 import encode_columns, rcs_dbsm_to_m2
+from .asterix48_stream import decode_buffer
+from .frames import Frame
+
+
+INDEX_SUFFIX = ".idx"
+INDEX_DTYPE = np.dtype([("time_of_day_s", "<f8"), ("offset", "<u8"), ("length", "<u4")])
+
+ChunkSink = Callable[[memoryview, float], None]
+
+
+def index_path(path: str) -> str:
+    return path + INDEX_SUFFIX
+
+
+def write_entry(data_file, index_file, time_of_day_s: float, blocks) -> int:
+    offset = data_file.tell()
+    length = 0
+    for block in blocks:
+        length += data_file.write(block)
+    entry = np.array([(time_of_day_s, offset, length)], dtype=INDEX_DTYPE)
+    index_file.write(entry.tobytes())
+    return length
+
+
+class Recorder:
+    def __init__(
+        self,
+        path: str,
+        frame_source: Callable[[], Frame],
+        interval_s: float,
+        flush_every: int = 64,
+        append: bool = False,
+    ) -> None:
+        self.path = path
+        self._frame_source = frame_source
+        self._interval_s = interval_s
+        self._flush_every = flush_every
+        self._append_mode = append
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._frames = 0
+        self._records = 0
+        self._bytes = 0
+        self._last_frame_index: Optional[int] = None
+        self._last_time_s = float("-inf")
+        if append and os.path.exists(path) and os.path.exists(index_path(path)):
+            recording = Recording(path)
+            time_range = recording.time_range()
+            recording.close()
+            if time_range is not None:
+                self._last_time_s = time_range[1]
+
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="asterix-recorder", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+        self._thread = None
+
+    def _append(self, data_file, index_file, frame: Frame) -> None:
+        plots = frame.radar_plots()
+        length = write_entry(data_file, index_file, frame.time_of_day_s, encode_columns(**plots))
+        self._frames += 1
+        self._records += len(plots["range_m"])
+        self._bytes += length
+
+    def _run(self) -> None:
+        mode = "ab" if self._append_mode else "wb"
+        with open(self.path, mode) as data_file, open(index_path(self.path), mode) as index_file:
+            pending = 0
+            while not self._stop.wait(self._interval_s):
+                frame = self._frame_source()
+                if frame.frame_index == self._last_frame_index or frame.time_of_day_s < self._last_time_s:
+                    continue
+                self._append(data_file, index_file, frame)
+                self._last_frame_index = frame.frame_index
+                self._last_time_s = frame.time_of_day_s
+                pending += 1
+                if pending >= self._flush_every:
+                    data_file.flush()
+                    index_file.flush()
+                    pending = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running(),
+            "path": self.path,
+            "frames": self._frames,
+            "records": self._records,
+            "bytes": self._bytes,
+        }
+
+
+class Recording:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._data_file = open(path, "rb")
+        size = os.fstat(self._data_file.fileno()).st_size
+        self._data = mmap.mmap(self._data_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        entries = os.path.getsize(index_path(path)) // INDEX_DTYPE.itemsize
+        if entries:
+            self.index = np.memmap(index_path(path), dtype=INDEX_DTYPE, mode="r", shape=(entries,))
+        else:
+            self.index = np.zeros(0, dtype=INDEX_DTYPE)
+        self._valid = int(np.searchsorted(self.index["offset"] + self.index["length"], size, side="right"))
+
+    def __len__(self) -> int:
+        return self._valid
+
+    def close(self) -> None:
+        self.index = np.zeros(0, dtype=INDEX_DTYPE)
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._data_file.close()
+
+    def time_range(self) -> Optional[tuple]:
+        if not len(self):
+            return None
+        return float(self.index["time_of_day_s"][0]), float(self.index["time_of_day_s"][len(self) - 1])
+
+    def seek(self, time_of_day_s: float) -> int:
+        return int(np.searchsorted(self.index["time_of_day_s"][: len(self)], time_of_day_s, side="left"))
+
+    def chunk(self, position: int) -> memoryview:
+        entry = self.index[position]
+        start = int(entry["offset"])
+        return memoryview(self._data)[start : start + int(entry["length"])]
+
+    def time_at(self, position: int) -> float:
+        return float(self.index["time_of_day_s"][position])
+
+
+class Replayer:
+    def __init__(self, recording: Recording) -> None:
+        self.recording = recording
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._position = 0
+        self._chunks_sent = 0
+        self._late_chunks = 0
+        self._speed = 1.0
+
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, sink: ChunkSink, start_time_s: Optional[float] = None, speed: float = 1.0) -> None:
+        self.stop()
+        self._position = 0 if start_time_s is None else self.recording.seek(start_time_s)
+        self._speed = speed
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(sink,), name="asterix-replay", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+        self._thread = None
+
+    def _run(self, sink: ChunkSink) -> None:
+        recording = self.recording
+        if self._position >= len(recording):
+            return
+        base_time_s = recording.time_at(self._position)
+        base_wall_s = time.perf_counter()
+        while self._position < len(recording) and not self._stop.is_set():
+            time_of_day_s = recording.time_at(self._position)
+            if self._speed > 0:
+                due = base_wall_s + (time_of_day_s - base_time_s) / self._speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    if self._stop.wait(delay):
+                        return
+                elif delay < -0.01:
+                    self._late_chunks += 1
+            sink(recording.chunk(self._position), time_of_day_s)
+            self._chunks_sent += 1
+            self._position += 1
+
+    def stats(self) -> Dict[str, Any]:
+        time_range = self.recording.time_range()
+        return {
+            "running": self.running(),
+            "path": self.recording.path,
+            "speed": self._speed,
+            "entries": len(self.recording),
+            "first_time_s": time_range[0] if time_range else None,
+            "last_time_s": time_range[1] if time_range else None,
+            "position": self._position,
+            "chunks_sent": self._chunks_sent,
+            "late_chunks": self._late_chunks,
+        }
+
+
+def frame_from_chunk(chunk, time_of_day_s: float, frame_index: int, prf_hz: int, sector_step_deg: int) -> Frame:
+    decoded, _ = decode_buffer(chunk)
+    azimuth_deg = decoded.azimuth_deg
+    columns = {
+        "track_number": decoded.track_number.astype(np.int64),
+        "sector_deg": np.floor(azimuth_deg / sector_step_deg) * sector_step_deg,
+        "range_m": decoded.range_m,
+        "azimuth_deg": azimuth_deg,
+        "x_m": decoded.x_m,
+        "y_m": decoded.y_m,
+        "rcs_m2": rcs_dbsm_to_m2(decoded.rcs_dbsm),
+        "radial_velocity_mps": np.zeros(len(decoded)),
+    }
+    return Frame(
+        frame_index=frame_index,
+        time_of_day_s=time_of_day_s,
+        prf_hz=prf_hz,
+        motion_enabled=True,
+        columns=columns,
+        custom_tracks=[],
+    )
@@ -0,0 +1,159 @@
+from typing import Any, Dict, Optional
+import math
+
+import numpy as np
+
+from .asterix48 import rcs_m2_to_dbsm_array
+from .config import SiteConfig
+from .detection import DetectionModel
+from .engine import MIN_RANGE_M
+
+
+PLOT_COLUMNS = ("sac", "sic", "time_of_day_s", "range_m", "azimuth_deg", "x_m", "y_m", "track_number", "rcs_dbsm")
+
+
+class AntennaScan:
+    def __init__(
+        self,
+        rotation_period_s: float,
+        beamwidth_deg: float,
+        sector_step_deg: float,
+        max_range_m: float,
+        detection: Optional[DetectionModel] = None,
+    ) -> None:
+        self.rotation_period_s = rotation_period_s
+        self.beamwidth_deg = beamwidth_deg
+        self.sector_step_deg = sector_step_deg
+        self.max_range_m = max_range_m
+        self.detection = detection
+        self._rng = detection.rng() if detection is not None else None
+        self._rate_deg_s = 360.0 / rotation_period_s
+        self._sector_count = int(math.ceil(360.0 / sector_step_deg))
+        self._time_s: Optional[float] = None
+        self._trailing_deg = -beamwidth_deg / 2.0
+        self._order: Optional[np.ndarray] = None
+        self._starts: Optional[np.ndarray] = None
+        self._population: Optional[int] = None
+        self._sweeps = 0
+        self._plots = 0
+        self._last_plots = 0
+        self._max_plots = 0
+
+    def beam_azimuth_deg(self) -> float:
+        return (self._trailing_deg + self.beamwidth_deg / 2.0) % 360.0
+
+    def _index(self, sector_deg: np.ndarray, population: int) -> None:
+        if self._order is not None and self._population == population and len(self._order) == len(sector_deg):
+            return
+        self._population = population
+        bins = (np.floor(sector_deg / self.sector_step_deg).astype(np.int64)) % self._sector_count
+        self._order = np.argsort(bins, kind="stable")
+        self._starts = np.zeros(self._sector_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(bins, minlength=self._sector_count), out=self._starts[1:])
+
+    def _swept_targets(self, start_deg: float, span_deg: float) -> np.ndarray:
+        first = int(math.floor(start_deg / self.sector_step_deg))
+        last = int(math.floor((start_deg + span_deg) / self.sector_step_deg))
+        last = min(last, first + self._sector_count - 1)
+        parts = []
+        for sector in range(first, last + 1):
+            sector %= self._sector_count
+            start, end = self._starts[sector], self._starts[sector + 1]
+            if end > start:
+                parts.append(self._order[start:end])
+        if not parts:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate(parts)
+
+    def _detect(self, azimuth_deg: np.ndarray, start_deg: float, span_deg: float):
+        offset = (azimuth_deg - start_deg) % 360.0
+        hit = (offset > 0.0) & (offset <= span_deg) if span_deg < 360.0 else np.ones(len(offset), dtype=bool)
+        return hit, offset
+
+    def sweep(
+        self,
+        time_of_day_s: float,
+        targets: Dict[str, np.ndarray],
+        custom: Dict[str, np.ndarray],
+        population: int = 0,
+        custom_site: Optional[SiteConfig] = None,
+    ) -> Dict[str, np.ndarray]:
+        if self._time_s is None or time_of_day_s < self._time_s:
+            self._time_s = time_of_day_s
+            self._trailing_deg = self._rate_deg_s * time_of_day_s - self.beamwidth_deg / 2.0
+        now_s = time_of_day_s
+        start_deg = self._trailing_deg % 360.0
+        span_deg = min(360.0, self._rate_deg_s * (now_s - self._time_s))
+        previous_s = self._time_s
+        self._time_s = now_s
+        self._trailing_deg += self._rate_deg_s * (now_s - previous_s)
+        if span_deg <= 0.0:
+            return {name: np.zeros(0) for name in PLOT_COLUMNS}
+
+        dwell_s = (self.beamwidth_deg / 2.0) / self._rate_deg_s
+
+        self._index(targets["sector_deg"], population)
+        rows = self._swept_targets(start_deg, span_deg)
+        hit, offset = self._detect(targets["azimuth_deg"][rows], start_deg, span_deg)
+        rows = rows[hit]
+        target_time = previous_s + offset[hit] / self._rate_deg_s - dwell_s
+        lag = now_s - target_time
+        range_m = np.clip(targets["range_m"][rows] - targets["radial_velocity_mps"][rows] * lag, MIN_RANGE_M, self.max_range_m)
+        azimuth_rad = np.radians(targets["azimuth_deg"][rows])
+
+        custom_x_m, custom_y_m, custom_azimuth_deg = custom["x_m"], custom["y_m"], custom["azimuth_deg"]
+        if custom_site is not None and (custom_site.x_m != 0.0 or custom_site.y_m != 0.0):
+            custom_x_m = custom_x_m - custom_site.x_m
+            custom_y_m = custom_y_m - custom_site.y_m
+            custom_azimuth_deg = (np.degrees(np.arctan2(custom_y_m, custom_x_m)) + 360.0) % 360.0
+        custom_hit, custom_offset = self._detect(custom_azimuth_deg, start_deg, span_deg)
+        custom_time = previous_s + custom_offset[custom_hit] / self._rate_deg_s - dwell_s
+        custom_lag = now_s - custom_time
+        heading_rad = np.radians(custom["heading_deg"][custom_hit])
+        speed = custom["speed_mps"][custom_hit]
+        custom_x = custom_x_m[custom_hit] - np.cos(heading_rad) * speed * custom_lag
+        custom_y = custom_y_m[custom_hit] - np.sin(heading_rad) * speed * custom_lag
+        custom_rcs = custom["rcs_m2"][custom_hit]
+        custom_dbsm = rcs_m2_to_dbsm_array(np.where(np.isnan(custom_rcs), 0.0, custom_rcs))
+
+        count = len(rows) + len(custom_x)
+        custom_sac = np.full(len(custom_x), 1 if custom_site is None else custom_site.sac, dtype=np.int64)
+        custom_sic = np.full(len(custom_x), 1 if custom_site is None else custom_site.sic, dtype=np.int64)
+        plots = {
+            "sac": np.concatenate([targets["sac"][rows] if "sac" in targets else np.full(len(rows), 1), custom_sac]),
+            "sic": np.concatenate([targets["sic"][rows] if "sic" in targets else np.full(len(rows), 1), custom_sic]),
+            "time_of_day_s": np.concatenate([target_time, custom_time]),
+            "range_m": np.concatenate([range_m, np.hypot(custom_x, custom_y)]),
+            "azimuth_deg": np.concatenate(
+                [targets["azimuth_deg"][rows], (np.degrees(np.arctan2(custom_y, custom_x)) + 360.0) % 360.0]
+            ),
+            "x_m": np.concatenate([np.cos(azimuth_rad) * range_m, custom_x]),
+            "y_m": np.concatenate([np.sin(azimuth_rad) * range_m, custom_y]),
+            "track_number": np.concatenate([targets["track_number"][rows], 8000 + custom["track_id"][custom_hit]]),
+            "rcs_dbsm": np.concatenate([rcs_m2_to_dbsm_array(targets["rcs_m2"][rows]), custom_dbsm]),
+        }
+        if self.detection is not None:
+            time_span = (previous_s - dwell_s, now_s - dwell_s)
+            plots = self.detection.apply(plots, self._rng, start_deg, span_deg, time_span)
+            count = len(plots["range_m"])
+        order = np.argsort(plots["time_of_day_s"], kind="stable")
+        plots = {name: values[order] for name, values in plots.items()}
+
+        self._sweeps += 1
+        self._plots += count
+        self._last_plots = count
+        self._max_plots = max(self._max_plots, count)
+        return plots
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rotation_period_s": self.rotation_period_s,
+            "beamwidth_deg": self.beamwidth_deg,
+            "beam_azimuth_deg": self.beam_azimuth_deg(),
+            "time_of_day_s": self._time_s,
+            "rotations": int(max(0.0, self._trailing_deg + self.beamwidth_deg / 2.0) // 360.0),
+            "sweeps": self._sweeps,
+            "plots": self._plots,
+            "last_sweep_plots": self._last_plots,
+            "max_sweep_plots": self._max_plots,
+        }
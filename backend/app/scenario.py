@@ -0,0 +1,291 @@
+from typing import Any, Callable, Dict, Iterator, Optional
+import io
+import json
+import mmap
+import os
+import threading
+import time
+
+import numpy as np
+import pydantic_core
+
+from . import columnar, metrics
+from .engine import MIN_RANGE_M, TrackArrays
+
+
+FORMATS = ("jsonl", "csv", "columnar")
+EXTENSIONS = {".jsonl": "jsonl", ".ndjson": "jsonl", ".csv": "csv"}
+FIELDS = ("track_number", "range_m", "azimuth_deg", "x_m", "y_m", "radial_velocity_mps", "rcs_m2")
+CHUNK_BYTES = 4 << 20
+CHUNK_ROWS = 65536
+DEFAULT_RCS_M2 = 1.0
+
+Progress = Callable[[int, int], None]
+
+
+class ScenarioError(ValueError):
+    pass
+
+
+def detect_format(path: str) -> str:
+    with open(path, "rb") as handle:
+        if handle.read(len(columnar.MAGIC)) == columnar.MAGIC:
+            return "columnar"
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in EXTENSIONS:
+        raise ScenarioError(f"Cannot tell the scenario format of {os.path.basename(path)!r}")
+    return EXTENSIONS[extension]
+
+
+def _line_blocks(handle, progress: Progress) -> Iterator[bytes]:
+    pending = b""
+    read = 0
+    while True:
+        data = handle.read(CHUNK_BYTES)
+        if not data:
+            break
+        read += len(data)
+        pending += data
+        end = pending.rfind(b"\n") + 1
+        if end:
+            block, pending = pending[:end], pending[end:]
+            progress(0, read)
+            yield block
+    if pending.strip():
+        progress(0, read)
+        yield pending
+
+
+def _csv_chunks(handle, progress: Progress) -> Iterator[Dict[str, np.ndarray]]:
+    header: Optional[list] = None
+    row = 0
+    for block in _line_blocks(handle, progress):
+        if header is None:
+            line, _, block = block.partition(b"\n")
+            row += 1
+            header = [name.strip() for name in line.decode("utf-8").strip().split(",")]
+            unknown = sorted(set(header) - set(FIELDS))
+            if unknown:
+                raise ScenarioError(f"Unknown CSV columns: {', '.join(unknown)}")
+        lines = block.count(b"\n") + (not block.endswith(b"\n"))
+        if block.strip():
+            try:
+                values = np.loadtxt(io.BytesIO(block), delimiter=",", ndmin=2, dtype=np.float64)
+            except ValueError as exc:
+                raise ScenarioError(f"Rows {row + 1}-{row + lines}: {exc}") from None
+            if values.shape[1] != len(header):
+                raise ScenarioError(f"Rows {row + 1}-{row + lines}: expected {len(header)} columns")
+            yield {name: values[:, index] for index, name in enumerate(header)}
+        row += lines
+
+
+def _json_rows(block: bytes, row: int) -> list:
+    lines = block.split(b"\n")
+    try:
+        rows = pydantic_core.from_json(b"[" + b",".join(line for line in lines if line.strip()) + b"]")
+    except ValueError:
+        rows = None
+    if rows is not None and all(isinstance(value, dict) for value in rows):
+        return rows
+    for offset, line in enumerate(lines, start=row + 1):
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise ScenarioError(f"Row {offset}: invalid JSON ({exc.msg})") from None
+        if not isinstance(value, dict):
+            raise ScenarioError(f"Row {offset}: expected an object")
+    raise ScenarioError(f"Rows {row + 1}-{row + len(lines)}: invalid JSON")
+
+
+def _jsonl_chunks(handle, progress: Progress) -> Iterator[Dict[str, np.ndarray]]:
+    row = 0
+    for block in _line_blocks(handle, progress):
+        rows = _json_rows(block, row)
+        row += block.count(b"\n")
+        if not rows:
+            continue
+        present = set().union(*rows).intersection(FIELDS)
+        try:
+            yield {
+                name: np.array([value.get(name, np.nan) for value in rows], dtype=np.float64)
+                for name in present
+            }
+        except (TypeError, ValueError) as exc:
+            raise ScenarioError(f"Rows up to {row}: {exc}") from None
+
+
+def _columnar_chunks(handle, progress: Progress) -> Iterator[Dict[str, np.ndarray]]:
+    size = os.fstat(handle.fileno()).st_size
+    data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    targets = None
+    error = None
+    try:
+        try:
+            targets = columnar.decode(data).targets
+        except ValueError as exc:
+            error = str(exc)
+        if error is not None:
+            raise ScenarioError(error)
+        count = len(targets["range_m"])
+        for start in range(0, count, CHUNK_ROWS):
+            end = min(count, start + CHUNK_ROWS)
+            chunk = {
+                name: targets[name][start:end].astype(np.float64)
+                for name in ("track_number", "range_m", "azimuth_deg", "radial_velocity_mps", "rcs_m2")
+            }
+            yield chunk
+            progress(0, size * end // count)
+    finally:
+        del targets
+        data.close()
+
+
+_READERS = {"jsonl": _jsonl_chunks, "csv": _csv_chunks, "columnar": _columnar_chunks}
+
+
+def _fill(values: Dict[str, np.ndarray], name: str, count: int, default=None) -> Optional[np.ndarray]:
+    column = values.get(name)
+    if column is None:
+        return None if default is None else np.broadcast_to(np.asarray(default, dtype=np.float64), count)
+    missing = np.isnan(column)
+    if missing.any():
+        if default is None:
+            return None
+        column = np.where(missing, default, column)
+    return column
+
+
+def _extend(
+    targets: TrackArrays,
+    values: Dict[str, np.ndarray],
+    sector_step_deg: int,
+    max_range_m: float,
+) -> int:
+    count = len(next(iter(values.values())))
+    range_m = _fill(values, "range_m", count)
+    azimuth_deg = _fill(values, "azimuth_deg", count)
+    if range_m is None or azimuth_deg is None:
+        x_m = _fill(values, "x_m", count)
+        y_m = _fill(values, "y_m", count)
+        if x_m is None or y_m is None:
+            raise ScenarioError("Every row needs range_m and azimuth_deg, or x_m and y_m")
+        range_m = np.hypot(x_m, y_m)
+        azimuth_deg = np.degrees(np.arctan2(y_m, x_m))
+    azimuth_deg = np.mod(azimuth_deg, 360.0)
+    first = targets.size + 1
+    track_number = _fill(values, "track_number", count, np.arange(first, first + count, dtype=np.float64))
+    targets.extend(
+        track_number=track_number.astype(np.int64),
+        sector_deg=np.floor(azimuth_deg / sector_step_deg) * sector_step_deg,
+        azimuth_deg=azimuth_deg,
+        range_m=np.clip(range_m, MIN_RANGE_M, max_range_m),
+        radial_velocity_mps=_fill(values, "radial_velocity_mps", count, 0.0),
+        rcs_m2=_fill(values, "rcs_m2", count, DEFAULT_RCS_M2),
+    )
+    return count
+
+
+def load_scenario(
+    path: str,
+    sector_step_deg: int,
+    max_range_m: float,
+    format: Optional[str] = None,
+    progress: Optional[Progress] = None,
+) -> TrackArrays:
+    format = format or detect_format(path)
+    if format not in FORMATS:
+        raise ScenarioError(f"format must be one of {', '.join(FORMATS)}")
+    progress = progress or (lambda rows, read: None)
+    targets = TrackArrays(CHUNK_ROWS)
+    with open(path, "rb") as handle:
+        for values in _READERS[format](handle, progress):
+            rows = _extend(targets, values, sector_step_deg, max_range_m)
+            metrics.SCENARIO_ROWS.inc(rows)
+            progress(rows, 0)
+    return targets
+
+
+class ScenarioLoader:
+    def __init__(self, apply: Callable[[TrackArrays], None], sector_step_deg: int, max_range_m: float) -> None:
+        self._apply = apply
+        self._sector_step_deg = sector_step_deg
+        self._max_range_m = max_range_m
+        self._thread: Optional[threading.Thread] = None
+        self._cancel = threading.Event()
+        self.path: Optional[str] = None
+        self._format: Optional[str] = None
+        self._state = "idle"
+        self._error: Optional[str] = None
+        self._rows = 0
+        self._bytes_read = 0
+        self._total_bytes = 0
+        self._started_at = 0.0
+        self._finished_at = 0.0
+
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, path: str, format: Optional[str] = None) -> None:
+        if self.running():
+            raise ScenarioError("A scenario is already loading")
+        self._format = format or detect_format(path)
+        self.path = path
+        self._state = "loading"
+        self._error = None
+        self._rows = 0
+        self._bytes_read = 0
+        self._total_bytes = os.path.getsize(path)
+        self._started_at = time.perf_counter()
+        self._finished_at = 0.0
+        self._cancel.clear()
+        self._thread = threading.Thread(target=self._run, name="scenario-loader", daemon=True)
+        self._thread.start()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stop(self) -> None:
+        self._cancel.set()
+        self.join(timeout=5.0)
+
+    def _progress(self, rows: int, read: int) -> None:
+        if self._cancel.is_set():
+            raise ScenarioError("Scenario load cancelled")
+        self._rows += rows
+        self._bytes_read = max(self._bytes_read, read)
+
+    def _run(self) -> None:
+        try:
+            targets = load_scenario(
+                self.path,
+                self._sector_step_deg,
+                self._max_range_m,
+                format=self._format,
+                progress=self._progress,
+            )
+            self._apply(targets)
+            self._state = "loaded"
+        except (OSError, ValueError) as exc:
+            self._state = "cancelled" if self._cancel.is_set() else "failed"
+            self._error = None if self._cancel.is_set() else str(exc)
+        finally:
+            self._finished_at = time.perf_counter()
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed_s = (self._finished_at or time.perf_counter()) - self._started_at if self._started_at else 0.0
+        return {
+            "running": self.running(),
+            "state": self._state,
+            "path": self.path,
+            "format": self._format,
+            "rows": self._rows,
+            "bytes_read": self._bytes_read,
+            "total_bytes": self._total_bytes,
+            "progress": self._bytes_read / self._total_bytes if self._total_bytes else (1.0 if self._state == "loaded" else 0.0),
+            "elapsed_s": elapsed_s,
+            "rows_per_s": self._rows / elapsed_s if elapsed_s > 0 else 0.0,
+            "error": self._error,
+        }
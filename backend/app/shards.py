@@ -0,0 +1,183 @@
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+import multiprocessing
+import random
+
+import numpy as np
+
+from .config import Settings, SiteConfig
+from .engine import TrackArrays, build_track_arrays
+
+
+SHARD_COLUMNS = (
+    "track_number",
+    "sector_deg",
+    "range_m",
+    "azimuth_deg",
+    "x_m",
+    "y_m",
+    "rcs_m2",
+    "radial_velocity_mps",
+)
+
+
+def site_target_count(settings: Settings, site: SiteConfig) -> int:
+    return len(range(0, 360, settings.sector_step_deg)) * site.targets_per_sector
+
+
+def _site_view(buffer, count: int) -> np.ndarray:
+    return np.ndarray((len(SHARD_COLUMNS), count), dtype=np.float64, buffer=buffer)
+
+
+def _publish(engine: TrackArrays, view: np.ndarray) -> None:
+    for row, name in enumerate(SHARD_COLUMNS):
+        view[row] = engine.view(name)
+
+
+def _shard_main(conn, settings: Settings, sites: List[Tuple[SiteConfig, str, int]]) -> None:
+    blocks = []
+    shards = []
+    for site, block_name, count in sites:
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        engine = build_track_arrays(
+            settings.sector_step_deg,
+            site.targets_per_sector,
+            site.max_range_km * 1000.0,
+            settings.rcs_m2_range,
+            random.Random(site.random_seed).uniform,
+        )
+        view = _site_view(block.buf, count)
+        _publish(engine, view)
+        shards.append((engine, view, site.max_range_km * 1000.0))
+    conn.send("ready")
+    try:
+        while True:
+            command, dt = conn.recv()
+            if command == "stop":
+                break
+            for engine, view, max_range_m in shards:
+                engine.step(dt, max_range_m)
+                _publish(engine, view)
+            conn.send("stepped")
+    finally:
+        shards.clear()
+        for block in blocks:
+            block.close()
+        conn.close()
+
+
+@dataclass
+class SiteShard:
+    site: SiteConfig
+    block: shared_memory.SharedMemory
+    count: int
+    offset: int
+
+    def view(self) -> np.ndarray:
+        return _site_view(self.block.buf, self.count)
+
+
+class ShardPool:
+    def __init__(self, settings: Settings, sites: List[SiteConfig], processes: int) -> None:
+        self.settings = settings
+        self.sites = sites
+        self._process_count = max(1, min(processes, len(sites)))
+        self._shards: List[SiteShard] = []
+        self._workers: List[Tuple[multiprocessing.Process, object]] = []
+        self._steps = 0
+        self._constant: Dict[str, np.ndarray] = {}
+        self.custom_site = self.site(settings.custom_track_site) or (sites[0] if sites else None)
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        offset = 0
+        for site in self.sites:
+            count = site_target_count(self.settings, site)
+            block = shared_memory.SharedMemory(create=True, size=max(1, len(SHARD_COLUMNS) * count * 8))
+            self._shards.append(SiteShard(site=site, block=block, count=count, offset=offset))
+            offset += count
+        self._constant = {
+            "track_offset": np.concatenate([np.full(s.count, s.offset, dtype=np.int64) for s in self._shards]),
+            "sac": np.concatenate([np.full(s.count, s.site.sac, dtype=np.int64) for s in self._shards]),
+            "sic": np.concatenate([np.full(s.count, s.site.sic, dtype=np.int64) for s in self._shards]),
+            "site_x_m": np.concatenate([np.full(s.count, s.site.x_m) for s in self._shards]),
+            "site_y_m": np.concatenate([np.full(s.count, s.site.y_m) for s in self._shards]),
+        }
+
+        context = multiprocessing.get_context("spawn")
+        for worker in range(self._process_count):
+            assigned = self._shards[worker :: self._process_count]
+            parent, child = context.Pipe()
+            process = context.Process(
+                target=_shard_main,
+                args=(child, self.settings, [(s.site, s.block.name, s.count) for s in assigned]),
+                name=f"site-shard-{worker}",
+                daemon=True,
+            )
+            process.start()
+            child.close()
+            self._workers.append((process, parent))
+        for _, conn in self._workers:
+            conn.recv()
+
+    def step(self, dt: float) -> None:
+        for _, conn in self._workers:
+            conn.send(("step", dt))
+        for _, conn in self._workers:
+            conn.recv()
+        self._steps += 1
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        if not self._shards:
+            columns = {name: np.zeros(0) for name in SHARD_COLUMNS + ("site_x_m", "site_y_m")}
+            columns.update(track_number=np.zeros(0, dtype=np.int64), sac=np.zeros(0, dtype=np.int64), sic=np.zeros(0, dtype=np.int64))
+            return columns
+        views = [shard.view() for shard in self._shards]
+        merged = {name: np.concatenate([view[row] for view in views]) for row, name in enumerate(SHARD_COLUMNS)}
+        merged["track_number"] = merged["track_number"].astype(np.int64) + self._constant["track_offset"]
+        merged["x_m"] += self._constant["site_x_m"]
+        merged["y_m"] += self._constant["site_y_m"]
+        for name in ("sac", "sic", "site_x_m", "site_y_m"):
+            merged[name] = self._constant[name]
+        return merged
+
+    def site(self, name: str) -> Optional[SiteConfig]:
+        for site in self.sites:
+            if site.name == name:
+                return site
+        return None
+
+    def close(self) -> None:
+        for process, conn in self._workers:
+            try:
+                conn.send(("stop", 0.0))
+            except (BrokenPipeError, OSError):
+                pass
+        for process, conn in self._workers:
+            process.join(timeout=5.0)
+            if process.is_alive():
+                process.terminate()
+            conn.close()
+        self._workers.clear()
+        for shard in self._shards:
+            shard.block.close()
+            shard.block.unlink()
+        self._shards.clear()
+
+    def stats(self) -> List[Dict[str, object]]:
+        return [
+            {
+                "name": shard.site.name,
+                "sac": shard.site.sac,
+                "sic": shard.site.sic,
+                "x_m": shard.site.x_m,
+                "y_m": shard.site.y_m,
+                "max_range_km": shard.site.max_range_km,
+                "targets": shard.count,
+                "first_track_number": shard.offset + 1,
+            }
+            for shard in self._shards
+        ]
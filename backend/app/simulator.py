@@ -1,14 +1,35 @@
-from dataclasses import dataclass
-from typing import List
-import base64
+from collections import deque
+from dataclasses import dataclass, replace
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
 import math
 import random
+import threading
 import time
 
-from .asterix48 import Asterix48Data, encode_record, rcs_m2_to_dbsm
+import numpy as np
+
+from . import metrics
 from .config import Settings
-from .models import AsterixRecord, CustomTarget, MasterTable, Target
+from .detection import DetectionModel
+from .engine import MIN_RANGE_M, CustomTrackArrays, TrackArrays, build_track_arrays, custom_track_columns
+from .frames import Frame
+from .models import MasterTable
+from .scan import AntennaScan
+from .shards import ShardPool
+from .spatial import PolarGrid
+from .trajectory import Trajectory
+
 
+TRACK_COLUMNS = (
+    "track_number",
+    "sector_deg",
+    "range_m",
+    "azimuth_deg",
+    "x_m",
+    "y_m",
+    "rcs_m2",
+    "radial_velocity_mps",
+)
 
 @dataclass
 class TrackState:
@@ -36,37 +57,112 @@ class CustomTrack:
     speed_mps: float
     rcs_m2: float | None
     created_time_s: float
+    trajectory: Optional[Trajectory] = None
 
 
 class Simulator:
-    def __init__(self, settings: Settings) -> None:
+    def __init__(self, settings: Settings, shards: Optional[ShardPool] = None, populate: bool = True) -> None:
         self.settings = settings
         self._rand = random.Random(settings.random_seed)
         self._tracks: List[TrackState] = []
         self._custom_tracks: List[CustomTrack] = []
+        self._engine: Optional[TrackArrays] = None
+        self._custom_engine: Optional[CustomTrackArrays] = None
+        self._shards = shards
+        self.detection = DetectionModel.from_settings(settings)
+        if settings.sim_engine == "numpy" or shards is not None:
+            self._engine = TrackArrays() if shards is None else None
+            self._custom_engine = CustomTrackArrays()
         self._frame_index = 0
         self._time_of_day_s = 0.0
         self._last_update = time.monotonic()
+        self._pending_s = 0.0
         self._motion_enabled = False
-        self._build_tracks()
+        self._lock = threading.RLock()
+        self._frame: Optional[Frame] = None
+        self._history: Deque[Frame] = deque(maxlen=settings.state_history_frames)
+        self._spatial: Optional[PolarGrid] = None
+        self._spatial_updates = 0
+        self._spatial_moved = 0
+        self._population = 0
+        if populate:
+            self._build_tracks()
+
+    def populate(self) -> None:
+        with self._lock:
+            self._build_tracks()
+            self._spatial = None
+            self._population += 1
+            self._invalidate()
 
     def set_motion(self, enabled: bool) -> None:
-        self._motion_enabled = enabled
+        with self._lock:
+            if enabled == self._motion_enabled:
+                return
+            self._last_update = time.monotonic()
+            self._pending_s = 0.0
+            self._motion_enabled = enabled
+            self._invalidate()
 
     def motion_enabled(self) -> bool:
         return self._motion_enabled
 
     def set_custom_tracks(self, tracks: List[CustomTrack]) -> None:
-        existing = {track.track_id: track for track in self._custom_tracks}
-        for track in tracks:
-            prior = existing.get(track.track_id)
-            if prior is None:
+        with self._lock:
+            existing = {track.track_id: track for track in self._custom_tracks}
+            for track in tracks:
+                prior = existing.get(track.track_id)
+                if prior is None:
+                    track.created_time_s = self._time_of_day_s
+                else:
+                    track.created_time_s = prior.created_time_s
+                self._start_trajectory(track)
+            self._custom_tracks = tracks
+            if self._custom_engine is not None:
+                self._custom_engine.load(tracks)
+            self._invalidate()
+
+    def update_custom_tracks(self, tracks: List[CustomTrack], removed_ids: Iterable[int] = ()) -> Tuple[int, int]:
+        with self._lock:
+            self._sync_custom_tracks()
+            removed = set(removed_ids)
+            updates = {track.track_id: track for track in tracks}
+            merged: List[CustomTrack] = []
+            removed_count = 0
+            for track in self._custom_tracks:
+                if track.track_id in removed:
+                    removed_count += 1
+                    continue
+                update = updates.pop(track.track_id, None)
+                if update is None:
+                    merged.append(track)
+                else:
+                    update.created_time_s = track.created_time_s
+                    self._start_trajectory(update)
+                    merged.append(update)
+            for track in updates.values():
                 track.created_time_s = self._time_of_day_s
-            else:
-                track.created_time_s = prior.created_time_s
-        self._custom_tracks = tracks
+                self._start_trajectory(track)
+                merged.append(track)
+            self._custom_tracks = merged
+            if self._custom_engine is not None:
+                self._custom_engine.load(merged)
+            self._invalidate()
+            return len(merged), removed_count
+
+    def _start_trajectory(self, track: CustomTrack) -> None:
+        if track.trajectory is not None:
+            track.trajectory = track.trajectory.started(self._time_of_day_s)
+
+    def _invalidate(self) -> None:
+        self._frame_index += 1
 
     def _build_tracks(self) -> None:
+        if self._shards is not None or self.settings.scenario_file:
+            return
+        if self._engine is not None:
+            self._build_track_arrays()
+            return
         self._tracks.clear()
         track_number = 1
         max_range_m = self.settings.max_range_km * 1000.0
@@ -87,34 +183,103 @@ class Simulator:
                         track_number=track_number,
                         sector_deg=sector,
                         azimuth_deg=azimuth % 360.0,
-                        range_m=max(200.0, min(max_range_m, range_m)),
+                        range_m=max(MIN_RANGE_M, min(max_range_m, range_m)),
                         radial_velocity_mps=velocity,
                         rcs_m2=rcs,
                     )
                 )
                 track_number += 1
 
+    def set_targets(self, targets: TrackArrays) -> None:
+        with self._lock:
+            if self._shards is not None:
+                raise ValueError("Scenario targets are not supported with sharded sites")
+            if self._engine is not None:
+                self._engine = targets
+            else:
+                self._tracks = [
+                    TrackState(
+                        target_id=f"T{track_number:04d}",
+                        track_number=track_number,
+                        sector_deg=sector_deg,
+                        azimuth_deg=azimuth_deg,
+                        range_m=range_m,
+                        radial_velocity_mps=radial_velocity_mps,
+                        rcs_m2=rcs_m2,
+                    )
+                    for track_number, sector_deg, range_m, azimuth_deg, _, _, rcs_m2, radial_velocity_mps in targets.rows()
+                ]
+            self._spatial = None
+            self._population += 1
+            self._invalidate()
+
+    def restore(
+        self,
+        frame_index: int,
+        time_of_day_s: float,
+        motion_enabled: bool,
+        targets: Optional[TrackArrays],
+        custom_tracks: List[CustomTrack],
+    ) -> None:
+        with self._lock:
+            if targets is not None and self._shards is None:
+                self.set_targets(targets)
+            self._custom_tracks = custom_tracks
+            if self._custom_engine is not None:
+                self._custom_engine.load(custom_tracks)
+            self._frame_index = frame_index
+            self._time_of_day_s = time_of_day_s
+            self._motion_enabled = motion_enabled
+            self._last_update = time.monotonic()
+            self._pending_s = 0.0
+            self._frame = None
+            self._history.clear()
+            self._spatial = None
+
+    def _build_track_arrays(self) -> None:
+        build_track_arrays(
+            self.settings.sector_step_deg,
+            self.settings.targets_per_sector,
+            self.settings.max_range_km * 1000.0,
+            self.settings.rcs_m2_range,
+            self._rand.uniform,
+            engine=self._engine,
+        )
+
     def _step_tracks(self, steps: int) -> None:
         if steps <= 0:
             return
+        started = time.perf_counter()
         max_range_m = self.settings.max_range_km * 1000.0
         dt = steps / self.settings.prf_hz
+        if self._shards is not None:
+            self._shards.step(dt)
+        if self._engine is not None:
+            self._engine.step(dt, max_range_m)
         for track in self._tracks:
             track.range_m += track.radial_velocity_mps * dt
-            if track.range_m < 200.0:
-                track.range_m = 200.0
+            if track.range_m < MIN_RANGE_M:
+                track.range_m = MIN_RANGE_M
                 track.radial_velocity_mps *= -1
             if track.range_m > max_range_m:
                 track.range_m = max_range_m
                 track.radial_velocity_mps *= -1
         self._time_of_day_s += dt
         self._frame_index += 1
+        metrics.SIM_STEP_SECONDS.observe(time.perf_counter() - started)
 
     def _step_custom_tracks(self, dt: float) -> None:
         if not self._custom_tracks:
             return
         max_range_m = self.settings.max_range_km * 1000.0
+        if self._custom_engine is not None:
+            self._custom_engine.step(dt, max_range_m, self._time_of_day_s)
+            return
         for track in self._custom_tracks:
+            if track.trajectory is not None:
+                for name, value in track.trajectory.state_at(self._time_of_day_s - track.trajectory.start_s).items():
+                    setattr(track, name, value)
+                continue
             heading_rad = math.radians(track.heading_deg)
             track.x_m += math.cos(heading_rad) * track.speed_mps * dt
             track.y_m += math.sin(heading_rad) * track.speed_mps * dt
@@ -127,105 +292,133 @@ class Simulator:
                 track.y_m = math.sin(heading_rad) * track.range_m
             track.azimuth_deg = (math.degrees(math.atan2(track.y_m, track.x_m)) + 360.0) % 360.0
 
-    def update(self) -> None:
-        now = time.monotonic()
-        delta = max(0.0, now - self._last_update)
-        steps = max(1, int(delta * self.settings.prf_hz))
-        dt = steps / self.settings.prf_hz
-        if self._motion_enabled:
+    def advance(self, elapsed_s: float) -> int:
+        with self._lock:
+            self._last_update = time.monotonic()
+            if not self._motion_enabled:
+                self._pending_s = 0.0
+                return 0
+            self._pending_s += max(0.0, elapsed_s)
+            steps = int(self._pending_s * self.settings.prf_hz)
+            metrics.SIM_UPDATE_LAG_SECONDS.observe(self._pending_s)
+            metrics.SIM_UPDATE_STEPS.observe(steps)
+            if steps < 1:
+                return 0
+            metrics.SIM_STEPS.inc(steps)
+            dt = steps / self.settings.prf_hz
+            self._pending_s -= dt
             self._step_tracks(steps)
             self._step_custom_tracks(dt)
-        self._last_update = now
+            return steps
 
-    def snapshot(self) -> MasterTable:
-        self.update()
-        targets: List[Target] = []
-        asterix: List[AsterixRecord] = []
-        custom_targets: List[CustomTarget] = []
+    def step(self, steps: int) -> None:
+        with self._lock:
+            if steps < 1:
+                return
+            self._step_tracks(steps)
+            self._step_custom_tracks(steps / self.settings.prf_hz)
 
+    def update(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._last_update
+            self._last_update = now
+            self.advance(elapsed)
+
+    def track_columns(self) -> Dict[str, np.ndarray]:
+        if self._shards is not None:
+            return self._shards.columns()
+        if self._engine is not None:
+            return {name: self._engine.view(name) for name in TRACK_COLUMNS}
+        x_m = []
+        y_m = []
         for track in self._tracks:
             azimuth_rad = math.radians(track.azimuth_deg)
-            x_m = math.cos(azimuth_rad) * track.range_m
-            y_m = math.sin(azimuth_rad) * track.range_m
-            targets.append(
-                Target(
-                    target_id=track.target_id,
-                    track_number=track.track_number,
-                    sector_deg=track.sector_deg,
-                    range_m=track.range_m,
-                    azimuth_deg=track.azimuth_deg,
-                    x_m=x_m,
-                    y_m=y_m,
-                    rcs_m2=track.rcs_m2,
-                    radial_velocity_mps=track.radial_velocity_mps,
-                )
-            )
+            x_m.append(math.cos(azimuth_rad) * track.range_m)
+            y_m.append(math.sin(azimuth_rad) * track.range_m)
+        return {
+            "track_number": np.array([t.track_number for t in self._tracks], dtype=np.int64),
+            "sector_deg": np.array([t.sector_deg for t in self._tracks], dtype=np.float64),
+            "range_m": np.array([t.range_m for t in self._tracks], dtype=np.float64),
+            "azimuth_deg": np.array([t.azimuth_deg for t in self._tracks], dtype=np.float64),
+            "x_m": np.array(x_m, dtype=np.float64),
+            "y_m": np.array(y_m, dtype=np.float64),
+            "rcs_m2": np.array([t.rcs_m2 for t in self._tracks], dtype=np.float64),
+            "radial_velocity_mps": np.array([t.radial_velocity_mps for t in self._tracks], dtype=np.float64),
+        }
 
-            rcs_dbsm = rcs_m2_to_dbsm(track.rcs_m2)
-            record = Asterix48Data(
-                sac=1,
-                sic=1,
-                time_of_day_s=self._time_of_day_s,
-                range_m=track.range_m,
-                azimuth_deg=track.azimuth_deg,
-                x_m=x_m,
-                y_m=y_m,
-                track_number=track.track_number,
-                rcs_dbsm=rcs_dbsm,
-            )
-            raw = encode_record(record)
-            asterix.append(
-                AsterixRecord(
-                    target_id=track.target_id,
-                    track_number=track.track_number,
+    def _frame_columns(self) -> Dict[str, np.ndarray]:
+        if self._shards is not None:
+            return self._shards.columns()
+        return {name: array.copy() for name, array in self.track_columns().items()}
+
+    def _sync_custom_tracks(self) -> None:
+        if self._custom_engine is not None:
+            self._custom_engine.store(self._custom_tracks)
+
+    def frame(self) -> Frame:
+        with self._lock:
+            self.update()
+            return self.current_frame()
+
+    def current_frame(self) -> Frame:
+        with self._lock:
+            if self._frame is None or self._frame.frame_index != self._frame_index:
+                if self._custom_engine is not None:
+                    custom_tracks = self._custom_tracks
+                    custom_columns = self._custom_engine.snapshot()
+                else:
+                    custom_tracks = [replace(track) for track in self._custom_tracks]
+                    custom_columns = None
+                started = time.perf_counter()
+                self._frame = Frame(
+                    frame_index=self._frame_index,
                     time_of_day_s=self._time_of_day_s,
-                    polar={"range_m": track.range_m, "azimuth_deg": track.azimuth_deg},
-                    cartesian={"x_m": x_m, "y_m": y_m},
-                    rcs_m2=track.rcs_m2,
-                    raw_hex=raw.hex(),
-                    raw_base64=base64.b64encode(raw).decode("ascii"),
+                    prf_hz=self.settings.prf_hz,
+                    motion_enabled=self._motion_enabled,
+                    columns=self._frame_columns(),
+                    custom_tracks=custom_tracks,
+                    custom_columns=custom_columns,
+                    detection=self.detection,
+                    custom_site=None if self._shards is None else self._shards.custom_site,
                 )
-            )
+                metrics.FRAME_BUILD_SECONDS.labels("columns").observe(time.perf_counter() - started)
+                if len(self._history) > 1:
+                    self._history[-2].retire()
+                self._history.append(self._frame)
+            return self._frame
 
-        for track in self._custom_tracks:
-            custom_time_s = max(0.0, self._time_of_day_s - track.created_time_s)
-            rcs_dbsm = rcs_m2_to_dbsm(track.rcs_m2) if track.rcs_m2 is not None else -64.0
-            record = Asterix48Data(
-                sac=1,
-                sic=1,
-                time_of_day_s=custom_time_s,
-                range_m=track.range_m,
-                azimuth_deg=track.azimuth_deg,
-                x_m=track.x_m,
-                y_m=track.y_m,
-                track_number=8000 + track.track_id,
-                rcs_dbsm=rcs_dbsm,
-            )
-            raw = encode_record(record)
-            custom_targets.append(
-                CustomTarget(
-                    track_id=track.track_id,
-                    platform_id=track.platform_id,
-                    platform_name=track.platform_name,
-                    profile_name=track.profile_name,
-                    range_m=track.range_m,
-                    azimuth_deg=track.azimuth_deg,
-                    x_m=track.x_m,
-                    y_m=track.y_m,
-                    altitude_m=track.altitude_m,
-                    heading_deg=track.heading_deg,
-                    speed_mps=track.speed_mps,
-                    rcs_m2=track.rcs_m2,
-                    time_of_day_s=custom_time_s,
-                    raw_hex=raw.hex(),
-                )
+    def history_frame(self, frame_index: int) -> Optional[Frame]:
+        with self._lock:
+            for frame in reversed(self._history):
+                if frame.frame_index == frame_index:
+                    return frame
+        return None
+
+    def scan(self, antenna: AntennaScan) -> Dict[str, np.ndarray]:
+        with self._lock:
+            if self._custom_engine is not None:
+                custom = self._custom_engine.snapshot(copy=False)
+            else:
+                custom = custom_track_columns(self._custom_tracks)
+            custom_site = None if self._shards is None else self._shards.custom_site
+            return antenna.sweep(self._time_of_day_s, self.track_columns(), custom, self._population, custom_site)
+
+    def spatial_index(self, frame: Frame) -> PolarGrid:
+        return frame.encoded("spatial", lambda: self._update_spatial(frame))
+
+    def _update_spatial(self, frame: Frame) -> PolarGrid:
+        with self._lock:
+            self._spatial, moved = PolarGrid.build(
+                frame,
+                sector_step_deg=self.settings.sector_step_deg,
+                range_bin_m=self.settings.spatial_range_bin_m,
+                max_range_m=self.settings.max_range_km * 1000.0,
+                previous=self._spatial,
             )
+            self._spatial_updates += 1
+            self._spatial_moved += moved
+            return self._spatial
 
-        return MasterTable(
-            prf_hz=self.settings.prf_hz,
-            frame_index=self._frame_index,
-            motion_enabled=self._motion_enabled,
-            targets=targets,
-            asterix48=asterix,
-            custom_targets=custom_targets,
-        )
+    def snapshot(self) -> MasterTable:
+        return self.frame().table
@@ -0,0 +1,232 @@
+from typing import Any, Dict, List, Optional, Tuple
+import math
+
+import numpy as np
+
+from .frames import Frame
+
+
+REBUILD_FRACTION = 0.125
+
+
+class PolarGrid:
+    def __init__(
+        self,
+        sector_step_deg: float,
+        range_bin_m: float,
+        max_range_m: float,
+        frame: Frame,
+        positions: Dict[str, np.ndarray],
+        cells: np.ndarray,
+        order: np.ndarray,
+        starts: np.ndarray,
+    ) -> None:
+        self.sector_step_deg = sector_step_deg
+        self.range_bin_m = range_bin_m
+        self.max_range_m = max_range_m
+        self.azimuth_bins = int(math.ceil(360.0 / sector_step_deg))
+        self.range_bins = int(math.ceil(max_range_m / range_bin_m)) + 1
+        self.frame = frame
+        self.positions = positions
+        self.cells = cells
+        self.order = order
+        self.starts = starts
+
+    @staticmethod
+    def _positions(frame: Frame) -> Dict[str, np.ndarray]:
+        columns = frame.columns
+        custom = frame.custom_columns()
+        x_m = np.concatenate([columns["x_m"], custom["x_m"]])
+        y_m = np.concatenate([columns["y_m"], custom["y_m"]])
+        if np.any(columns.get("site_x_m", 0.0)) or np.any(columns.get("site_y_m", 0.0)):
+            range_m = np.hypot(x_m, y_m)
+            azimuth_deg = (np.degrees(np.arctan2(y_m, x_m)) + 360.0) % 360.0
+        else:
+            range_m = np.concatenate([columns["range_m"], custom["range_m"]])
+            azimuth_deg = np.concatenate([columns["azimuth_deg"], custom["azimuth_deg"]])
+        return {"range_m": range_m, "azimuth_deg": azimuth_deg, "x_m": x_m, "y_m": y_m}
+
+    @staticmethod
+    def _cells(plots: Dict[str, np.ndarray], sector_step_deg: float, range_bin_m: float, max_range_m: float) -> np.ndarray:
+        azimuth_bins = int(math.ceil(360.0 / sector_step_deg))
+        range_bins = int(math.ceil(max_range_m / range_bin_m)) + 1
+        azimuth_bin = (np.floor(plots["azimuth_deg"] / sector_step_deg).astype(np.int64)) % azimuth_bins
+        range_bin = np.clip((plots["range_m"] // range_bin_m).astype(np.int64), 0, range_bins - 1)
+        return (azimuth_bin * range_bins + range_bin).astype(np.int32)
+
+    @classmethod
+    def build(
+        cls,
+        frame: Frame,
+        sector_step_deg: float,
+        range_bin_m: float,
+        max_range_m: float,
+        previous: Optional["PolarGrid"] = None,
+    ) -> Tuple["PolarGrid", int]:
+        positions = cls._positions(frame)
+        cells = cls._cells(positions, sector_step_deg, range_bin_m, max_range_m)
+        cell_count = int(math.ceil(360.0 / sector_step_deg)) * (int(math.ceil(max_range_m / range_bin_m)) + 1)
+        reusable = (
+            previous is not None
+            and len(previous.cells) == len(cells)
+            and previous.range_bin_m == range_bin_m
+            and previous.sector_step_deg == sector_step_deg
+            and previous.max_range_m == max_range_m
+        )
+        if reusable:
+            moved = np.flatnonzero(previous.cells != cells)
+            if len(moved) == 0:
+                return cls(sector_step_deg, range_bin_m, max_range_m, frame, positions, cells, previous.order, previous.starts), 0
+            if len(moved) <= REBUILD_FRACTION * len(cells):
+                stay = np.ones(len(cells), dtype=bool)
+                stay[moved] = False
+                kept = previous.order[stay[previous.order]]
+                moved = moved[np.argsort(cells[moved], kind="stable")]
+                positions = np.searchsorted(cells[kept], cells[moved], side="right")
+                order = np.insert(kept, positions, moved)
+                starts = np.zeros(cell_count + 1, dtype=np.int64)
+                np.cumsum(np.bincount(cells, minlength=cell_count), out=starts[1:])
+                return cls(sector_step_deg, range_bin_m, max_range_m, frame, positions, cells, order, starts), len(moved)
+        order = np.argsort(cells, kind="stable")
+        starts = np.zeros(cell_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=cell_count), out=starts[1:])
+        return cls(sector_step_deg, range_bin_m, max_range_m, frame, positions, cells, order, starts), len(cells)
+
+    def _range_bins(self, range_min_m: float, range_max_m: float) -> Tuple[int, int]:
+        low = max(0, int(range_min_m // self.range_bin_m))
+        high = min(self.range_bins - 1, int(range_max_m // self.range_bin_m))
+        return low, high
+
+    def _azimuth_bins(self, azimuth_min_deg: float, azimuth_max_deg: float) -> List[int]:
+        span = azimuth_max_deg - azimuth_min_deg
+        if span >= 360.0:
+            return list(range(self.azimuth_bins))
+        first = int(math.floor(azimuth_min_deg / self.sector_step_deg))
+        last = int(math.floor(azimuth_max_deg / self.sector_step_deg))
+        return [b % self.azimuth_bins for b in range(first, last + 1)]
+
+    def _candidates(self, azimuth_bins: List[int], range_low: int, range_high: int) -> np.ndarray:
+        if range_low > range_high:
+            return np.zeros(0, dtype=np.int64)
+        parts = []
+        for azimuth_bin in azimuth_bins:
+            base = azimuth_bin * self.range_bins
+            start = self.starts[base + range_low]
+            end = self.starts[base + range_high + 1]
+            if end > start:
+                parts.append(self.order[start:end])
+        if not parts:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate(parts)
+
+    def query_polar(
+        self,
+        azimuth_min_deg: float,
+        azimuth_max_deg: float,
+        range_min_m: float = 0.0,
+        range_max_m: float = math.inf,
+    ) -> np.ndarray:
+        range_low, range_high = self._range_bins(range_min_m, min(range_max_m, self.max_range_m + self.range_bin_m))
+        candidates = self._candidates(self._azimuth_bins(azimuth_min_deg, azimuth_max_deg), range_low, range_high)
+        plots = self.positions
+        range_m = plots["range_m"][candidates]
+        keep = (range_m >= range_min_m) & (range_m <= range_max_m)
+        if azimuth_max_deg - azimuth_min_deg < 360.0:
+            offset = (plots["azimuth_deg"][candidates] - azimuth_min_deg) % 360.0
+            keep &= offset <= azimuth_max_deg - azimuth_min_deg
+        return candidates[keep]
+
+    def query_sector(self, sector_deg: float, range_min_m: float = 0.0, range_max_m: float = math.inf) -> np.ndarray:
+        start = math.floor(sector_deg / self.sector_step_deg) * self.sector_step_deg
+        range_low, range_high = self._range_bins(range_min_m, min(range_max_m, self.max_range_m + self.range_bin_m))
+        azimuth_bin = int(start // self.sector_step_deg) % self.azimuth_bins
+        candidates = self._candidates([azimuth_bin], range_low, range_high)
+        range_m = self.positions["range_m"][candidates]
+        return candidates[(range_m >= range_min_m) & (range_m <= range_max_m)]
+
+    def query_bbox(self, x_min: float, y_min: float, x_max: float, y_max: float) -> np.ndarray:
+        corners = [(x_min, y_min), (x_min, y_max), (x_max, y_min), (x_max, y_max)]
+        nearest_x = min(max(0.0, x_min), x_max)
+        nearest_y = min(max(0.0, y_min), y_max)
+        range_min_m = math.hypot(nearest_x, nearest_y)
+        range_max_m = max(math.hypot(x, y) for x, y in corners)
+        if x_min <= 0.0 <= x_max and y_min <= 0.0 <= y_max:
+            azimuth_min_deg, azimuth_max_deg = 0.0, 360.0
+        else:
+            angles = sorted(math.degrees(math.atan2(y, x)) % 360.0 for x, y in corners)
+            gaps = [(angles[(i + 1) % 4] - angles[i]) % 360.0 for i in range(4)]
+            widest = max(range(4), key=gaps.__getitem__)
+            azimuth_min_deg = angles[(widest + 1) % 4]
+            azimuth_max_deg = azimuth_min_deg + (360.0 - gaps[widest])
+        candidates = self.query_polar(azimuth_min_deg, azimuth_max_deg, range_min_m, range_max_m)
+        plots = self.positions
+        x_m = plots["x_m"][candidates]
+        y_m = plots["y_m"][candidates]
+        return candidates[(x_m >= x_min) & (x_m <= x_max) & (y_m >= y_min) & (y_m <= y_max)]
+
+    def nearest(self, x_m: float, y_m: float, limit: int) -> Tuple[np.ndarray, np.ndarray]:
+        count = len(self.cells)
+        limit = min(limit, count)
+        if limit <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        plots = self.positions
+        radius = self.range_bin_m
+        reach = math.hypot(x_m, y_m) + self.max_range_m + self.range_bin_m
+        while True:
+            candidates = self.query_bbox(x_m - radius, y_m - radius, x_m + radius, y_m + radius)
+            distance = np.hypot(plots["x_m"][candidates] - x_m, plots["y_m"][candidates] - y_m)
+            inside = distance <= radius
+            if np.count_nonzero(inside) >= limit or radius >= reach:
+                candidates = candidates[inside]
+                distance = distance[inside]
+                best = np.argsort(distance, kind="stable")[:limit]
+                return candidates[best], distance[best]
+            radius *= 2.0
+
+    def rows(self, indices: np.ndarray, distances: Optional[np.ndarray] = None) -> Dict[str, List[Dict[str, Any]]]:
+        frame = self.frame
+        columns = frame.columns
+        target_count = len(columns["range_m"])
+        targets: List[Dict[str, Any]] = []
+        custom_targets: List[Dict[str, Any]] = []
+        custom = frame.custom_columns()
+        platform_names, profile_names = frame.custom_names()
+        custom_times = frame.custom_times()
+        for position, index in enumerate(indices.tolist()):
+            if index < target_count:
+                track_number = int(columns["track_number"][index])
+                row = {
+                    "target_id": f"T{track_number:04d}",
+                    "track_number": track_number,
+                    "sector_deg": float(columns["sector_deg"][index]),
+                    "range_m": float(columns["range_m"][index]),
+                    "azimuth_deg": float(columns["azimuth_deg"][index]),
+                    "x_m": float(columns["x_m"][index]),
+                    "y_m": float(columns["y_m"][index]),
+                    "rcs_m2": float(columns["rcs_m2"][index]),
+                    "radial_velocity_mps": float(columns["radial_velocity_mps"][index]),
+                }
+                section = targets
+            else:
+                j = index - target_count
+                rcs_m2 = float(custom["rcs_m2"][j])
+                row = {
+                    "track_id": int(custom["track_id"][j]),
+                    "platform_id": int(custom["platform_id"][j]),
+                    "platform_name": platform_names[j],
+                    "profile_name": profile_names[j],
+                    "range_m": float(custom["range_m"][j]),
+                    "azimuth_deg": float(custom["azimuth_deg"][j]),
+                    "x_m": float(custom["x_m"][j]),
+                    "y_m": float(custom["y_m"][j]),
+                    "altitude_m": float(custom["altitude_m"][j]),
+                    "heading_deg": float(custom["heading_deg"][j]),
+                    "speed_mps": float(custom["speed_mps"][j]),
+                    "rcs_m2": None if math.isnan(rcs_m2) else rcs_m2,
+                    "time_of_day_s": float(custom_times[j]),
+                }
+                section = custom_targets
+            if distances is not None:
+                row["distance_m"] = float(distances[position])
+            section.append(row)
+        return {"targets": targets, "custom_targets": custom_targets}
@@ -0,0 +1,140 @@
+from typing import Any, Callable, Dict, List, Optional
+import logging
+import threading
+import time
+
+import numpy as np
+
+from .frames import Frame
+from .scan import AntennaScan
+from .simulator import Simulator
+
+
+PlotListener = Callable[[Dict[str, np.ndarray]], None]
+
+logger = logging.getLogger(__name__)
+
+
+class FrameBuffer:
+    def __init__(self) -> None:
+        self._slots: list = [None, None]
+        self._front = 0
+
+    def publish(self, frame: Frame) -> None:
+        back = 1 - self._front
+        self._slots[back] = frame
+        self._front = back
+
+    def front(self) -> Optional[Frame]:
+        return self._slots[self._front]
+
+
+class TickLoop:
+    def __init__(self, simulator: Simulator, rate_hz: float, scan: Optional[AntennaScan] = None) -> None:
+        self._simulator = simulator
+        self._rate_hz = rate_hz
+        self._scan = scan
+        self._plot_listeners: List[PlotListener] = []
+        self._listener_errors = 0
+        self._tick_errors = 0
+        self._last_error: Optional[str] = None
+        self._buffer = FrameBuffer()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._ticks = 0
+        self._steps = 0
+        self._overruns = 0
+        self._late_ticks = 0
+        self._last_tick_s = 0.0
+        self._max_tick_s = 0.0
+        self._max_lag_s = 0.0
+
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self._rate_hz <= 0 or self.running():
+            return
+        self._buffer.publish(self._simulator.current_frame())
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sim-tick", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+        self._thread = None
+
+    def add_plot_listener(self, listener: PlotListener) -> None:
+        self._plot_listeners.append(listener)
+
+    def latest(self) -> Frame:
+        if not self.running():
+            return self._simulator.frame()
+        frame = self._buffer.front()
+        if frame is None:
+            return self._simulator.frame()
+        return frame
+
+    def _emit_plots(self) -> None:
+        plots = self._simulator.scan(self._scan)
+        if not len(plots["range_m"]):
+            return
+        for listener in self._plot_listeners:
+            try:
+                listener(plots)
+            except Exception:
+                self._listener_errors += 1
+
+    def _run(self) -> None:
+        period = 1.0 / self._rate_hz
+        last = time.perf_counter()
+        next_due = last + period
+        while not self._stop.is_set():
+            started = time.perf_counter()
+            elapsed = started - last
+            last = started
+            try:
+                self._steps += self._simulator.advance(elapsed)
+                if self._scan is not None:
+                    self._emit_plots()
+                self._buffer.publish(self._simulator.current_frame())
+            except Exception as exc:
+                self._tick_errors += 1
+                self._last_error = str(exc)
+                logger.exception("Simulation tick failed")
+            finished = time.perf_counter()
+
+            duration = finished - started
+            self._ticks += 1
+            self._last_tick_s = duration
+            self._max_tick_s = max(self._max_tick_s, duration)
+            if duration > period:
+                self._overruns += 1
+
+            delay = next_due - finished
+            if delay < 0:
+                self._late_ticks += 1
+                self._max_lag_s = max(self._max_lag_s, -delay)
+                next_due = finished + period
+                continue
+            next_due += period
+            self._stop.wait(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running(),
+            "rate_hz": self._rate_hz,
+            "ticks": self._ticks,
+            "steps": self._steps,
+            "overruns": self._overruns,
+            "late_ticks": self._late_ticks,
+            "last_tick_s": self._last_tick_s,
+            "max_tick_s": self._max_tick_s,
+            "max_lag_s": self._max_lag_s,
+            "scan": self._scan.stats() if self._scan is not None else None,
+            "listener_errors": self._listener_errors,
+            "tick_errors": self._tick_errors,
+            "last_error": self._last_error,
+        }
@@ -0,0 +1,235 @@
+from bisect import bisect_right
+from dataclasses import dataclass, replace
+from itertools import chain
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import math
+
+import numpy as np
+
+
+LEG_TYPES = ("straight", "speed", "climb", "turn", "waypoint")
+MAX_LEGS = 1000
+DEFAULT_ACCEL_MPS2 = 1.0
+DEFAULT_CLIMB_MPS = 10.0
+DEFAULT_TURN_DEG_S = 3.0
+
+SEGMENT_FIELDS = ("t0", "x0", "y0", "z0", "heading0", "v0", "accel", "omega", "climb")
+
+State = Tuple[float, float, float, float, float]
+
+
+class TrajectoryError(ValueError):
+    pass
+
+
+def _state_at(segment: Sequence[float], tau: float) -> State:
+    _, x0, y0, z0, heading0, v0, accel, omega, climb = segment
+    heading = heading0 + omega * tau
+    if omega:
+        x = x0 + v0 / omega * (math.sin(heading) - math.sin(heading0))
+        y = y0 - v0 / omega * (math.cos(heading) - math.cos(heading0))
+    else:
+        distance = v0 * tau + 0.5 * accel * tau * tau
+        x = x0 + math.cos(heading0) * distance
+        y = y0 + math.sin(heading0) * distance
+    return x, y, z0 + climb * tau, heading, v0 + accel * tau
+
+
+def _evaluate(segments: Dict[str, np.ndarray], tau: np.ndarray) -> Dict[str, np.ndarray]:
+    heading0 = segments["heading0"]
+    v0 = segments["v0"]
+    omega = segments["omega"]
+    accel = segments["accel"]
+    heading = heading0 + omega * tau
+    turning = omega != 0.0
+    radius = v0 / np.where(turning, omega, 1.0)
+    distance = v0 * tau + 0.5 * accel * tau * tau
+    x_m = segments["x0"] + np.where(turning, radius * (np.sin(heading) - np.sin(heading0)), np.cos(heading0) * distance)
+    y_m = segments["y0"] + np.where(turning, -radius * (np.cos(heading) - np.cos(heading0)), np.sin(heading0) * distance)
+    return {
+        "x_m": x_m,
+        "y_m": y_m,
+        "range_m": np.hypot(x_m, y_m),
+        "azimuth_deg": (np.degrees(np.arctan2(y_m, x_m)) + 360.0) % 360.0,
+        "altitude_m": segments["z0"] + segments["climb"] * tau,
+        "heading_deg": np.degrees(heading) % 360.0,
+        "speed_mps": v0 + accel * tau,
+    }
+
+
+def _number(leg: Dict[str, Any], name: str, default: Optional[float] = None) -> float:
+    value = leg.get(name, default)
+    if value is None:
+        raise TrajectoryError(f"{leg.get('type')} leg needs {name}")
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise TrajectoryError(f"{name} must be a number") from None
+    if not math.isfinite(value):
+        raise TrajectoryError(f"{name} must be finite")
+    return value
+
+
+def _positive(leg: Dict[str, Any], name: str, default: Optional[float] = None) -> float:
+    value = _number(leg, name, default)
+    if value <= 0:
+        raise TrajectoryError(f"{name} must be positive")
+    return value
+
+
+class _Compiler:
+    def __init__(self, x_m: float, y_m: float, altitude_m: float, heading_deg: float, speed_mps: float) -> None:
+        self.t = 0.0
+        self.state: State = (x_m, y_m, altitude_m, math.radians(heading_deg), max(0.0, speed_mps))
+        self.segments: List[Tuple[float, ...]] = []
+
+    def add(self, duration_s: float, accel: float = 0.0, omega: float = 0.0, climb: float = 0.0) -> None:
+        if duration_s <= 0:
+            return
+        x, y, z, heading, speed = self.state
+        segment = (self.t, x, y, z, heading, speed, accel, omega, climb)
+        self.segments.append(segment)
+        self.state = _state_at(segment, duration_s)
+        self.t += duration_s
+
+    def leg(self, leg: Dict[str, Any]) -> None:
+        kind = leg.get("type")
+        x, y, z, heading, speed = self.state
+        if kind == "straight":
+            self.add(_positive(leg, "duration_s"))
+        elif kind == "speed":
+            target = _number(leg, "speed_mps")
+            if target < 0:
+                raise TrajectoryError("speed_mps must not be negative")
+            accel = _positive(leg, "accel_mps2", DEFAULT_ACCEL_MPS2)
+            delta = target - speed
+            self.add(abs(delta) / accel, accel=math.copysign(accel, delta))
+            self.state = self.state[:4] + (target,)
+        elif kind == "climb":
+            target = _number(leg, "altitude_m")
+            rate = _positive(leg, "rate_mps", DEFAULT_CLIMB_MPS)
+            delta = target - z
+            self.add(abs(delta) / rate, climb=math.copysign(rate, delta))
+            self.state = self.state[:2] + (target,) + self.state[3:]
+        elif kind == "turn":
+            if "heading_deg" in leg:
+                turn_deg = (_number(leg, "heading_deg") - math.degrees(heading) + 180.0) % 360.0 - 180.0
+            else:
+                turn_deg = _number(leg, "turn_deg")
+            rate = math.radians(_positive(leg, "rate_deg_s", DEFAULT_TURN_DEG_S))
+            turn_rad = math.radians(turn_deg)
+            if speed <= 0:
+                self.state = self.state[:3] + (heading + turn_rad, speed)
+                return
+            self.add(abs(turn_rad) / rate, omega=math.copysign(rate, turn_rad))
+        elif kind == "waypoint":
+            if "x_m" in leg or "y_m" in leg:
+                target_x, target_y = _number(leg, "x_m"), _number(leg, "y_m")
+            else:
+                target_range = _number(leg, "range_m")
+                target_azimuth = math.radians(_number(leg, "azimuth_deg"))
+                target_x, target_y = target_range * math.cos(target_azimuth), target_range * math.sin(target_azimuth)
+            if "speed_mps" in leg:
+                speed = _positive(leg, "speed_mps")
+            if speed <= 0:
+                raise TrajectoryError("waypoint leg needs a positive speed")
+            distance = math.hypot(target_x - x, target_y - y)
+            target_z = _number(leg, "altitude_m", z)
+            if distance > 0:
+                heading = math.atan2(target_y - y, target_x - x)
+            self.state = (x, y, z, heading, speed)
+            duration = distance / speed
+            self.add(duration, climb=(target_z - z) / duration if duration > 0 else 0.0)
+            self.state = (target_x, target_y, target_z, heading, speed)
+        else:
+            raise TrajectoryError(f"unknown leg type {kind!r}; expected one of {', '.join(LEG_TYPES)}")
+
+    def finish(self) -> "Trajectory":
+        x, y, z, heading, speed = self.state
+        self.segments.append((self.t, x, y, z, heading, speed, 0.0, 0.0, 0.0))
+        return Trajectory(
+            segments=tuple(self.segments),
+            starts=tuple(segment[0] for segment in self.segments),
+            duration_s=self.t,
+        )
+
+
+@dataclass(frozen=True)
+class Trajectory:
+    segments: Tuple[Tuple[float, ...], ...]
+    starts: Tuple[float, ...]
+    duration_s: float
+    start_s: Optional[float] = None
+
+    def started(self, time_of_day_s: float) -> "Trajectory":
+        return self if self.start_s is not None else replace(self, start_s=time_of_day_s)
+
+    def state_at(self, elapsed_s: float) -> Dict[str, float]:
+        elapsed_s = max(0.0, elapsed_s)
+        segment = self.segments[bisect_right(self.starts, elapsed_s) - 1]
+        x, y, z, heading, speed = _state_at(segment, elapsed_s - segment[0])
+        return {
+            "x_m": x,
+            "y_m": y,
+            "range_m": math.hypot(x, y),
+            "azimuth_deg": (math.degrees(math.atan2(y, x)) + 360.0) % 360.0,
+            "altitude_m": z,
+            "heading_deg": math.degrees(heading) % 360.0,
+            "speed_mps": speed,
+        }
+
+
+def compile_trajectory(
+    legs: Sequence[Dict[str, Any]],
+    x_m: float,
+    y_m: float,
+    altitude_m: float,
+    heading_deg: float,
+    speed_mps: float,
+) -> Trajectory:
+    if not isinstance(legs, (list, tuple)):
+        raise TrajectoryError("trajectory must be a list of legs")
+    if len(legs) > MAX_LEGS:
+        raise TrajectoryError(f"trajectory has more than {MAX_LEGS} legs")
+    compiler = _Compiler(x_m, y_m, altitude_m, heading_deg, speed_mps)
+    for index, leg in enumerate(legs, start=1):
+        if not isinstance(leg, dict):
+            raise TrajectoryError(f"leg {index} must be an object")
+        try:
+            compiler.leg(leg)
+        except TrajectoryError as exc:
+            raise TrajectoryError(f"leg {index}: {exc}") from None
+    return compiler.finish()
+
+
+class TrajectorySet:
+    def __init__(self, rows: np.ndarray, trajectories: Sequence[Trajectory]) -> None:
+        self.rows = rows
+        counts = np.array([len(t.segments) for t in trajectories], dtype=np.int64)
+        self._first = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        values = chain.from_iterable(chain.from_iterable(t.segments for t in trajectories))
+        segments = np.fromiter(values, dtype=np.float64).reshape(-1, len(SEGMENT_FIELDS))
+        self._segments = {name: segments[:, index] for index, name in enumerate(SEGMENT_FIELDS)}
+        last_start = np.array([t.starts[-1] for t in trajectories], dtype=np.float64)
+        self._base = np.concatenate(([0.0], np.cumsum(last_start + 1.0)[:-1]))
+        self._last_start = last_start
+        self._keys = self._segments["t0"] + np.repeat(self._base, counts)
+        self._start_s = np.array([t.start_s or 0.0 for t in trajectories], dtype=np.float64)
+
+    @classmethod
+    def build(cls, tracks: Sequence[Any]) -> Optional["TrajectorySet"]:
+        rows = [index for index, track in enumerate(tracks) if getattr(track, "trajectory", None) is not None]
+        if not rows:
+            return None
+        return cls(np.array(rows, dtype=np.int64), [tracks[index].trajectory for index in rows])
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def evaluate(self, time_of_day_s: float) -> Dict[str, np.ndarray]:
+        elapsed = np.maximum(0.0, time_of_day_s - self._start_s)
+        keys = self._base + np.minimum(elapsed, self._last_start)
+        index = np.searchsorted(self._keys, keys, side="right") - 1
+        index = np.maximum(index, self._first)
+        segments = {name: values[index] for name, values in self._segments.items()}
+        return _evaluate(segments, elapsed - segments["t0"])
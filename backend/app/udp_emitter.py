@@ -0,0 +1,154 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import ipaddress
+import socket
+import threading
+import time
+
+import numpy as np
+
+from .asterix48 import encode_blocks
+from .asterix48_stream import COLUMNS, decode_buffer
+from .frames import Frame
+
+
+IP_UDP_OVERHEAD = 28
+LATE_TOLERANCE_S = 0.002
+
+
+def parse_target(value: str) -> Optional[Tuple[str, int]]:
+    if not value:
+        return None
+    host, _, port = value.rpartition(":")
+    if not host or not port:
+        raise ValueError(f"Invalid UDP target {value!r}, expected host:port")
+    return host.strip("[]"), int(port)
+
+
+class UdpEmitter:
+    def __init__(
+        self,
+        frame_source: Callable[[], Frame],
+        target: Tuple[str, int],
+        scan_period_s: float = 4.0,
+        mtu: int = 1500,
+        multicast_ttl: int = 1,
+        multicast_interface: str = "",
+    ) -> None:
+        self._frame_source = frame_source
+        self._target = target
+        self._scan_period_s = scan_period_s
+        self._payload_len = max(64, mtu - IP_UDP_OVERHEAD)
+        self._multicast_ttl = multicast_ttl
+        self._multicast_interface = multicast_interface
+        self._socket: Optional[socket.socket] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._scans = 0
+        self._datagrams_sent = 0
+        self._records_sent = 0
+        self._bytes_sent = 0
+        self._late_sends = 0
+        self._max_late_s = 0.0
+        self._send_errors = 0
+
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _open_socket(self) -> socket.socket:
+        family = socket.AF_INET6 if ":" in self._target[0] else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_DGRAM)
+        try:
+            is_multicast = ipaddress.ip_address(self._target[0]).is_multicast
+        except ValueError:
+            is_multicast = False
+        if is_multicast and family == socket.AF_INET:
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, self._multicast_ttl)
+            if self._multicast_interface:
+                sock.setsockopt(
+                    socket.IPPROTO_IP,
+                    socket.IP_MULTICAST_IF,
+                    socket.inet_aton(self._multicast_interface),
+                )
+        return sock
+
+    def start(self) -> None:
+        if self.running():
+            return
+        self._socket = self._open_socket()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="asterix-udp", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+        self._thread = None
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def scan_datagrams(self, frame: Frame) -> List[Tuple[memoryview, int]]:
+        columns = frame.radar_plots()
+        order = np.argsort(columns["azimuth_deg"], kind="stable")
+        return encode_blocks(self._payload_len, **{name: values[order] for name, values in columns.items()})
+
+    def send_plots(self, plots: Dict[str, np.ndarray]) -> None:
+        for block, records in encode_blocks(self._payload_len, **plots):
+            self.send_block(block, records)
+
+    def send_chunk(self, chunk) -> None:
+        decoded, _ = decode_buffer(chunk)
+        for block, records in encode_blocks(self._payload_len, **{name: getattr(decoded, name) for name, _ in COLUMNS}):
+            self.send_block(block, records)
+
+    def send_block(self, block, records: int = 0) -> None:
+        if self._socket is None:
+            self._socket = self._open_socket()
+        try:
+            self._socket.sendto(block, self._target)
+        except OSError:
+            self._send_errors += 1
+            return
+        self._datagrams_sent += 1
+        self._records_sent += records
+        self._bytes_sent += len(block)
+
+    def _run(self) -> None:
+        scan_start = time.perf_counter()
+        while not self._stop.is_set():
+            datagrams = self.scan_datagrams(self._frame_source())
+            spacing = self._scan_period_s / max(1, len(datagrams))
+            for index, (block, records) in enumerate(datagrams):
+                due = scan_start + index * spacing
+                delay = due - time.perf_counter()
+                if delay > 0 and self._stop.wait(delay):
+                    return
+                late = -delay
+                if late > LATE_TOLERANCE_S:
+                    self._late_sends += 1
+                    self._max_late_s = max(self._max_late_s, late)
+                self.send_block(block, records)
+            self._scans += 1
+            scan_start += self._scan_period_s
+            now = time.perf_counter()
+            if scan_start < now - self._scan_period_s:
+                scan_start = now
+            delay = scan_start - now
+            if delay > 0 and self._stop.wait(delay):
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running(),
+            "target": f"{self._target[0]}:{self._target[1]}",
+            "scan_period_s": self._scan_period_s,
+            "max_datagram_bytes": self._payload_len,
+            "scans": self._scans,
+            "datagrams_sent": self._datagrams_sent,
+            "records_sent": self._records_sent,
+            "bytes_sent": self._bytes_sent,
+            "late_sends": self._late_sends,
+            "max_late_s": self._max_late_s,
+            "send_errors": self._send_errors,
+        }
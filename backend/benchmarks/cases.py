@@ -0,0 +1,186 @@
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.asterix48 import Asterix48Data, decode_record, encode_columns, encode_record, encode_messages, rcs_m2_to_dbsm_array
+from app.asterix48_stream import decode_buffer
+from app.config import Settings
+from app.projection import Projection
+from app.simulator import CustomTrack, Simulator
+
+
+SECTOR_STEP_DEG = 10
+MAX_RANGE_KM = 120.0
+
+
+@dataclass
+class Case:
+    name: str
+    setup: Callable[[int, str], Callable[[], object]]
+    table: bool = False
+
+
+def make_settings(scale: int, engine: str, seed: int = 42) -> Settings:
+    sectors = 360 // SECTOR_STEP_DEG
+    return replace(
+        Settings.from_env(),
+        sector_step_deg=SECTOR_STEP_DEG,
+        targets_per_sector=max(1, -(-scale // sectors)),
+        max_range_km=MAX_RANGE_KM,
+        random_seed=seed,
+        sim_engine=engine,
+        sites=[],
+        state_history_frames=1,
+    )
+
+
+def make_custom_tracks(count: int, seed: int = 42) -> List[CustomTrack]:
+    rng = np.random.default_rng(seed)
+    range_m = rng.uniform(1000.0, MAX_RANGE_KM * 900.0, count)
+    azimuth_deg = rng.uniform(0.0, 360.0, count)
+    x_m = range_m * np.cos(np.radians(azimuth_deg))
+    y_m = range_m * np.sin(np.radians(azimuth_deg))
+    heading_deg = rng.uniform(0.0, 360.0, count)
+    speed_mps = rng.uniform(50.0, 300.0, count)
+    return [
+        CustomTrack(
+            track_id=index + 1,
+            platform_id=1,
+            platform_name="Bench",
+            profile_name="cruise",
+            x_m=x,
+            y_m=y,
+            range_m=r,
+            azimuth_deg=a,
+            altitude_m=9000.0,
+            heading_deg=h,
+            speed_mps=s,
+            rcs_m2=10.0,
+            created_time_s=0.0,
+        )
+        for index, (x, y, r, a, h, s) in enumerate(
+            zip(x_m.tolist(), y_m.tolist(), range_m.tolist(), azimuth_deg.tolist(), heading_deg.tolist(), speed_mps.tolist())
+        )
+    ]
+
+
+def make_simulator(scale: int, engine: str, custom: bool = True) -> Simulator:
+    simulator = Simulator(make_settings(scale, engine))
+    if custom:
+        simulator.set_custom_tracks(make_custom_tracks(scale))
+    return simulator
+
+
+def make_plot_columns(scale: int) -> Dict[str, np.ndarray]:
+    rng = np.random.default_rng(42)
+    range_m = rng.uniform(200.0, MAX_RANGE_KM * 1000.0, scale)
+    azimuth_deg = rng.uniform(0.0, 360.0, scale)
+    return {
+        "sac": 1,
+        "sic": 1,
+        "time_of_day_s": np.sort(rng.uniform(0.0, 86400.0, scale)),
+        "range_m": range_m,
+        "azimuth_deg": azimuth_deg,
+        "x_m": range_m * np.cos(np.radians(azimuth_deg)),
+        "y_m": range_m * np.sin(np.radians(azimuth_deg)),
+        "track_number": np.arange(1, scale + 1) % 4096,
+        "rcs_dbsm": rcs_m2_to_dbsm_array(rng.uniform(0.1, 100.0, scale)),
+    }
+
+
+def make_records(scale: int) -> List[Asterix48Data]:
+    columns = make_plot_columns(scale)
+    rows = zip(*(columns[name].tolist() for name in ("time_of_day_s", "range_m", "azimuth_deg", "x_m", "y_m", "track_number", "rcs_dbsm")))
+    return [Asterix48Data(1, 1, *row) for row in rows]
+
+
+def _encode_record(scale: int, engine: str) -> Callable[[], object]:
+    records = make_records(scale)
+    return lambda: [encode_record(record) for record in records]
+
+
+def _decode_record(scale: int, engine: str) -> Callable[[], object]:
+    messages = [encode_record(record) for record in make_records(scale)]
+    return lambda: [decode_record(message) for message in messages]
+
+
+def _encode_columns(scale: int, engine: str) -> Callable[[], object]:
+    columns = make_plot_columns(scale)
+    return lambda: encode_columns(**columns)
+
+
+def _decode_buffer(scale: int, engine: str) -> Callable[[], object]:
+    buffer = bytes(encode_messages(**make_plot_columns(scale)))
+    return lambda: decode_buffer(buffer)
+
+
+def _step_tracks(scale: int, engine: str) -> Callable[[], object]:
+    simulator = make_simulator(scale, engine, custom=False)
+    return lambda: simulator._step_tracks(1)
+
+
+def _step_custom_tracks(scale: int, engine: str) -> Callable[[], object]:
+    simulator = make_simulator(scale, engine)
+    dt = 1.0 / simulator.settings.prf_hz
+    return lambda: simulator._step_custom_tracks(dt)
+
+
+def _snapshot(scale: int, engine: str) -> Callable[[], object]:
+    simulator = make_simulator(scale, engine)
+
+    def run() -> object:
+        simulator._invalidate()
+        return simulator.snapshot()
+
+    return run
+
+
+def _frame_json(scale: int, engine: str) -> Callable[[], object]:
+    simulator = make_simulator(scale, engine)
+
+    def run() -> object:
+        simulator._invalidate()
+        return simulator.frame().json()
+
+    return run
+
+
+def _state_projection(scale: int, engine: str) -> Callable[[], object]:
+    simulator = make_simulator(scale, engine)
+    projection = Projection.parse("targets", "track_number,x_m,y_m")
+
+    def run() -> object:
+        simulator._invalidate()
+        return projection.payload(simulator.frame())
+
+    return run
+
+
+def _model_dump(scale: int, engine: str) -> Callable[[], object]:
+    table = make_simulator(scale, engine).snapshot()
+    return table.model_dump
+
+
+CASES = [
+    Case("encode_record", _encode_record),
+    Case("decode_record", _decode_record),
+    Case("encode_columns", _encode_columns),
+    Case("decode_buffer", _decode_buffer),
+    Case("step_tracks", _step_tracks),
+    Case("step_custom_tracks", _step_custom_tracks),
+    Case("snapshot", _snapshot, table=True),
+    Case("model_dump", _model_dump, table=True),
+    Case("frame_json", _frame_json, table=True),
+    Case("state_projection", _state_projection, table=True),
+]
+
+
+def find_cases(names: Optional[List[str]]) -> List[Case]:
+    if not names:
+        return list(CASES)
+    known = {case.name: case for case in CASES}
+    unknown = [name for name in names if name not in known]
+    if unknown:
+        raise ValueError(f"Unknown benchmark cases: {', '.join(unknown)}")
+    return [known[name] for name in names]
@@ -0,0 +1,212 @@
+from typing import Any, Dict, List, Optional
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from .cases import Case, find_cases
+
+
+DEFAULT_SCALES = (720, 10_000, 100_000, 1_000_000)
+DEFAULT_MAX_TABLE_SCALE = 100_000
+
+
+def _parse_scales(value: str) -> List[int]:
+    scales = []
+    for part in value.split(","):
+        part = part.strip().lower().replace("_", "")
+        if not part:
+            continue
+        multiplier = 1
+        if part.endswith("k"):
+            multiplier, part = 1_000, part[:-1]
+        elif part.endswith("m"):
+            multiplier, part = 1_000_000, part[:-1]
+        scales.append(int(float(part) * multiplier))
+    if not scales or min(scales) < 1:
+        raise argparse.ArgumentTypeError("scales must be positive integers")
+    return scales
+
+
+def measure(run, repeat: int, max_time_s: float) -> Dict[str, Any]:
+    run()
+    timings = []
+    budget_end = time.perf_counter() + max_time_s
+    gc_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+            if time.perf_counter() > budget_end:
+                break
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = run()
+        current, peak = tracemalloc.get_traced_memory()
+        del result
+    finally:
+        tracemalloc.stop()
+    return {
+        "runs": len(timings),
+        "best_s": min(timings),
+        "median_s": statistics.median(timings),
+        "peak_alloc_bytes": peak - before,
+        "retained_bytes": current - before,
+    }
+
+
+def run_case(case: Case, scale: int, engine: str, repeat: int, max_time_s: float) -> Dict[str, Any]:
+    result: Dict[str, Any] = {"case": case.name, "scale": scale}
+    runner = case.setup(scale, engine)
+    result.update(measure(runner, repeat, max_time_s))
+    result["items_per_s"] = scale / result["median_s"] if result["median_s"] > 0 else None
+    return result
+
+
+def run_suite(
+    cases: List[Case],
+    scales: List[int],
+    engine: str,
+    repeat: int,
+    max_time_s: float,
+    max_table_scale: int,
+    log=None,
+) -> Dict[str, Any]:
+    results = []
+    for case in cases:
+        for scale in scales:
+            if case.table and scale > max_table_scale:
+                results.append({"case": case.name, "scale": scale, "skipped": f"scale above --max-table-scale {max_table_scale}"})
+                continue
+            result = run_case(case, scale, engine, repeat, max_time_s)
+            results.append(result)
+            gc.collect()
+            if log is not None:
+                log(format_result(result))
+    return {
+        "meta": {
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "engine": engine,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    if "skipped" in result:
+        return f"{result['case']:<20} {result['scale']:>9}  skipped ({result['skipped']})"
+    return (
+        f"{result['case']:<20} {result['scale']:>9}  "
+        f"median {result['median_s'] * 1000:10.3f} ms  "
+        f"best {result['best_s'] * 1000:10.3f} ms  "
+        f"{result['items_per_s']:14,.0f} items/s  "
+        f"peak {result['peak_alloc_bytes'] / 1e6:9.2f} MB"
+    )
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    expected = {(row["case"], row["scale"]): row for row in baseline.get("results", []) if "skipped" not in row}
+    regressions = []
+    for row in results["results"]:
+        base = expected.get((row["case"], row["scale"]))
+        if base is None or "skipped" in row:
+            continue
+        for metric in ("median_s", "peak_alloc_bytes"):
+            if base[metric] <= 0:
+                continue
+            ratio = row[metric] / base[metric]
+            if ratio > 1.0 + threshold:
+                regressions.append(
+                    {
+                        "case": row["case"],
+                        "scale": row["scale"],
+                        "metric": metric,
+                        "baseline": base[metric],
+                        "current": row[metric],
+                        "ratio": ratio,
+                    }
+                )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run")
+    parser.add_argument("--scales", type=_parse_scales, default=list(DEFAULT_SCALES))
+    parser.add_argument("--cases", default="", help="comma-separated case names (default: all)")
+    parser.add_argument("--engine", choices=("numpy", "python"), default="numpy")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-time", type=float, default=10.0, help="stop repeating a case after this many seconds")
+    parser.add_argument("--max-table-scale", type=int, default=DEFAULT_MAX_TABLE_SCALE)
+    parser.add_argument("--output", default="", help="write results as JSON to this path")
+    parser.add_argument("--baseline", default="", help="compare against results JSON at this path")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown/growth ratio over the baseline")
+    parser.add_argument("--list", action="store_true")
+    args = parser.parse_args(argv)
+
+    try:
+        cases = find_cases([name.strip() for name in args.cases.split(",") if name.strip()])
+    except ValueError as exc:
+        parser.error(str(exc))
+    if args.list:
+        for case in cases:
+            print(case.name)
+        return 0
+    if args.baseline and not os.path.isfile(args.baseline):
+        parser.error(f"baseline {args.baseline} not found; run `make bench-baseline` to record one")
+
+    results = run_suite(
+        cases,
+        args.scales,
+        args.engine,
+        max(1, args.repeat),
+        args.max_time,
+        args.max_table_scale,
+        log=lambda line: print(line, flush=True),
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+            handle.write("\n")
+        print(f"Results written to {args.output}")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as handle:
+        baseline = json.load(handle)
+    regressions = compare(results, baseline, args.threshold)
+    for row in regressions:
+        print(
+            f"REGRESSION {row['case']} scale={row['scale']} {row['metric']}: "
+            f"{row['baseline']:.6g} -> {row['current']:.6g} ({row['ratio']:.2f}x)"
+        )
+    if regressions:
+        return 1
+    print(f"No regressions over {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
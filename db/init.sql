@@ -23,6 +23,23 @@ CREATE TABLE IF NOT EXISTS platform_profile (
 CREATE INDEX IF NOT EXISTS idx_platform_category ON platform(category);
 CREATE INDEX IF NOT EXISTS idx_platform_profile_platform ON platform_profile(platform_id);
 
+CREATE OR REPLACE FUNCTION notify_platform_catalog() RETURNS trigger AS $$
+BEGIN
+  PERFORM pg_notify('platform_catalog', TG_TABLE_NAME);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS platform_catalog_notify ON platform;
+CREATE TRIGGER platform_catalog_notify
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON platform
+  FOR EACH STATEMENT EXECUTE FUNCTION notify_platform_catalog();
+
+DROP TRIGGER IF EXISTS platform_profile_catalog_notify ON platform_profile;
+CREATE TRIGGER platform_profile_catalog_notify
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON platform_profile
+  FOR EACH STATEMENT EXECUTE FUNCTION notify_platform_catalog();
+
 INSERT INTO platform (name, category, role, source_url) VALUES
   ('F-16C Fighting Falcon', 'aircraft', 'multirole fighter', 'https://en.wikipedia.org/wiki/General_Dynamics_F-16_Fighting_Falcon'),
   ('F/A-18E Super Hornet', 'aircraft', 'multirole fighter', 'https://en.wikipedia.org/wiki/Boeing_F/A-18E/F_Super_Hornet'),
@@ -7,6 +7,33 @@ const formatNumber = (value, digits = 1) => {
   return Number(value).toFixed(digits);
 };
 
+const rowKeys = {
+  targets: "target_id",
+  asterix48: "target_id",
+  custom_targets: "track_id"
+};
+
+const applyDelta = (previous, delta) => {
+  if (!previous || previous.frame_index !== delta.base_frame_index) return null;
+  const next = {
+    ...previous,
+    prf_hz: delta.prf_hz,
+    frame_index: delta.frame_index,
+    motion_enabled: delta.motion_enabled
+  };
+  Object.entries(rowKeys).forEach(([section, key]) => {
+    const change = delta[section];
+    if (!change) return;
+    const removed = new Set(change.removed);
+    const updates = new Map(change.changed.map((row) => [row[key], row]));
+    next[section] = (previous[section] ?? [])
+      .filter((row) => !removed.has(row[key]))
+      .map((row) => (updates.has(row[key]) ? { ...row, ...updates.get(row[key]) } : row))
+      .concat(change.added);
+  });
+  return next;
+};
+
 const formatAzimuth = (value) => `${formatNumber(value, 1)} deg`;
 const formatRange = (value) => `${formatNumber(value / 1000, 2)} km`;
 
@@ -50,23 +77,76 @@ export default function App() {
 
   useEffect(() => {
     let mounted = true;
+    let socket = null;
+    let pollInterval = null;
+    let reconnectTimer = null;
+    let latest = null;
+
+    const applyState = (data) => {
+      if (!mounted) return;
+      latest = data;
+      setState(data);
+      setMotionEnabled(Boolean(data.motion_enabled));
+      setLastUpdated(new Date());
+    };
+
     const loadState = () => {
       fetch(`${apiBase}/api/state`)
         .then((res) => res.json())
-        .then((data) => {
-          if (!mounted) return;
-          setState(data);
-          setMotionEnabled(Boolean(data.motion_enabled));
-          setLastUpdated(new Date());
-        })
+        .then(applyState)
         .catch(() => null);
     };
 
-    loadState();
-    const interval = setInterval(loadState, 200);
+    const startPolling = () => {
+      if (pollInterval) return;
+      loadState();
+      pollInterval = setInterval(loadState, 200);
+    };
+
+    const stopPolling = () => {
+      clearInterval(pollInterval);
+      pollInterval = null;
+    };
+
+    const connect = () => {
+      const streamUrl = `${apiBase.replace(/^http/, "ws")}/api/stream?rate_hz=5&delta=true`;
+      try {
+        socket = new WebSocket(streamUrl);
+      } catch (error) {
+        startPolling();
+        return;
+      }
+      socket.onopen = stopPolling;
+      socket.onmessage = (event) => {
+        try {
+          const data = JSON.parse(event.data);
+          if (data.base_frame_index === undefined) {
+            applyState(data);
+            return;
+          }
+          const patched = applyDelta(latest, data);
+          if (patched) {
+            applyState(patched);
+          } else {
+            socket.close();
+          }
+        } catch (error) {
+          // ignore malformed frames
+        }
+      };
+      socket.onclose = () => {
+        if (!mounted) return;
+        startPolling();
+        reconnectTimer = setTimeout(connect, 2000);
+      };
+    };
+
+    connect();
     return () => {
       mounted = false;
-      clearInterval(interval);
+      stopPolling();
+      clearTimeout(reconnectTimer);
+      if (socket) socket.close();
     };
   }, [apiBase]);
 